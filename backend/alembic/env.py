@@ -20,9 +20,16 @@ if config.config_file_name is not None:
 from app.core.config import settings
 from app.core.db.database import Base
 import app.models
+from app.models.property import SQLITE_AUX_TABLE_NAMES
 
 target_metadata = Base.metadata
 
+def include_name(name, type_, parent_names):
+    # The SQLite full-text and R*Tree tables (and their shadow tables) are not declared on the models
+    if type_ == "table":
+        return not name.startswith(SQLITE_AUX_TABLE_NAMES)
+    return True
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -41,6 +48,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -71,6 +79,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection, 
             target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,69 @@
+"""Initial schema: users and properties
+
+Revision ID: 3c1f0a9b2d41
+Revises:
+Create Date: 2026-10-17 23:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0a9b2d41'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('role', sa.Enum('AGENT', 'ADMIN', name='userrole'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    op.create_table(
+        'properties',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('surface', sa.Float(), nullable=False),
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('street', sa.String(length=200), nullable=True),
+        sa.Column('address', sa.String(length=200), nullable=True),
+        sa.Column('property_type', sa.Enum('HOUSE', 'APARTMENT', 'CONDO', 'LAND', 'COMMERCIAL', name='propertytype'), nullable=False),
+        sa.Column('bedrooms', sa.Integer(), nullable=True),
+        sa.Column('bathrooms', sa.Integer(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('images', sa.JSON(), nullable=True),
+        sa.Column('status', sa.Enum('DRAFT', 'PUBLISHED', name='propertystatus'), nullable=True),
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['agent_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_properties_agent_id'), 'properties', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_properties_city'), 'properties', ['city'], unique=False)
+    op.create_index(op.f('ix_properties_id'), 'properties', ['id'], unique=False)
+    op.create_index(op.f('ix_properties_price'), 'properties', ['price'], unique=False)
+    op.create_index(op.f('ix_properties_status'), 'properties', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('properties')
+    op.drop_table('users')
+    sa.Enum(name='propertystatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='propertytype').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='userrole').drop(op.get_bind(), checkfirst=True)
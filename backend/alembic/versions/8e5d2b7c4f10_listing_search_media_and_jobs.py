@@ -0,0 +1,130 @@
+"""Listing search indexes, coordinates and image metadata; jobs, image blobs, map cells, rate limits
+
+Revision ID: 8e5d2b7c4f10
+Revises: 3c1f0a9b2d41
+Create Date: 2026-10-17 23:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.property import create_sqlite_aux_tables, drop_sqlite_aux_tables
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e5d2b7c4f10'
+down_revision: Union[str, None] = '3c1f0a9b2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same expression as app.models.property.search_vector(), which queries must match
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('english'::regconfig, coalesce(city, '')), 'B')"
+    " || setweight(to_tsvector('english'::regconfig, coalesce(street, '')), 'B')"
+    " || setweight(to_tsvector('english'::regconfig, coalesce(address, '')), 'B')"
+    " || setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C'))"
+)
+
+
+def upgrade() -> None:
+    op.add_column('properties', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('properties', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('properties', sa.Column('image_meta', sa.JSON(), nullable=True))
+    op.create_index(
+        'ix_properties_status_created_at_id', 'properties',
+        ['status', 'created_at', 'id', 'price', 'surface', 'bedrooms', 'bathrooms', 'property_type', 'city'],
+    )
+    op.create_index(
+        'ix_properties_status_price_id', 'properties',
+        ['status', 'price', 'id', 'created_at', 'surface', 'bedrooms', 'bathrooms', 'property_type', 'city'],
+    )
+    op.create_index('ix_properties_agent_created_at_id', 'properties', ['agent_id', 'created_at', 'id'])
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.create_index(
+            'ix_properties_search_vector', 'properties', [sa.text(SEARCH_VECTOR)], postgresql_using='gin',
+        )
+        op.create_index('ix_properties_status_lat_lng', 'properties', ['status', 'latitude', 'longitude'])
+    # Full-text and R*Tree tables, filled from the existing rows
+    create_sqlite_aux_tables(bind)
+
+    op.create_table(
+        'property_geo_cells',
+        sa.Column('zoom', sa.Integer(), nullable=False),
+        sa.Column('cell_x', sa.Integer(), nullable=False),
+        sa.Column('cell_y', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('lat_sum', sa.Float(), nullable=False),
+        sa.Column('lng_sum', sa.Float(), nullable=False),
+        sa.Column('min_price', sa.Float(), nullable=False),
+        sa.Column('max_price', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('zoom', 'cell_x', 'cell_y'),
+    )
+
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index('ix_jobs_status_type_run_at_id', 'jobs', ['status', 'type', 'run_at', 'id'])
+
+    op.create_table(
+        'image_blobs',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('ext', sa.String(length=8), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('placeholder', sa.String(), nullable=True),
+        sa.Column('widths', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('digest'),
+    )
+
+    op.create_table(
+        'rate_limit_counters',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('window_start', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key', 'window_start'),
+    )
+    op.create_index(op.f('ix_rate_limit_counters_expires_at'), 'rate_limit_counters', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_counters')
+    op.drop_table('image_blobs')
+    op.drop_table('jobs')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_table('property_geo_cells')
+
+    drop_sqlite_aux_tables(op.get_bind())
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_properties_status_lat_lng', table_name='properties')
+        op.drop_index('ix_properties_search_vector', table_name='properties')
+    op.drop_index('ix_properties_agent_created_at_id', table_name='properties')
+    op.drop_index('ix_properties_status_price_id', table_name='properties')
+    op.drop_index('ix_properties_status_created_at_id', table_name='properties')
+    with op.batch_alter_table('properties') as batch_op:
+        batch_op.drop_column('image_meta')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -1,12 +1,16 @@
 from fastapi import APIRouter
 from app.api.v1.auth import router as auth_router
 from app.api.v1.admin import router as admin_router
+from app.api.v1.jobs import router as jobs_router
 from app.api.v1.properties import router as properties_router
+from app.api.v1.storage import router as storage_router
 from app.api.v1.users import router as users_router
 
 router = APIRouter()
 
 router.include_router(auth_router, prefix="/v1/auth", tags=["auth"])
 router.include_router(admin_router, prefix="/v1/admin", tags=["admin"])
+router.include_router(jobs_router, prefix="/v1/jobs", tags=["jobs"])
 router.include_router(properties_router, prefix="/v1/properties", tags=["properties"])
+router.include_router(storage_router, prefix="/v1/storage", tags=["storage"])
 router.include_router(users_router, prefix="/v1/users", tags=["users"])
@@ -1,25 +1,41 @@
 from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import principal_cache
 from app.core.db.database import async_get_db
-from app.core.security import verify_token
+from app.core.rate_limit import RateLimiter
+from app.core.security import Principal, verify_token
 from app.models.user import User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/access-token")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/access-token", auto_error=False)
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: Annotated[AsyncSession, Depends(async_get_db)]
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def _get_principal(session: AsyncSession, user_id: int) -> Principal | None:
+    """Who a token was issued to, from the principal cache when possible."""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        row = (await session.execute(select(User.id, User.role, User.name).where(User.id == user_id))).one_or_none()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        principal_cache.store(principal)
+    return principal
+
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: Annotated[AsyncSession, Depends(async_get_db)]
+) -> Principal:
+    credentials_exception = _credentials_exception()
     
     user_id_str = verify_token(token)
     if user_id_str is None:
@@ -30,18 +46,27 @@ async def get_current_user(
     except ValueError:
         raise credentials_exception
     
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    principal = await _get_principal(session, user_id)
     
-    if user is None:
+    if principal is None:
         raise credentials_exception
         
+    return principal
+
+async def get_current_user_row(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(async_get_db)]
+) -> User:
+    """The authenticated user's full row, for handlers that need more than the principal."""
+    user = await session.get(User, current_user.id)
+    if user is None:
+        raise _credentials_exception()
     return user
 
 async def get_current_user_optional(
     token: Annotated[str | None, Depends(oauth2_scheme_optional)],
     session: Annotated[AsyncSession, Depends(async_get_db)]
-) -> User | None:
+) -> Principal | None:
     if not token:
         return None
     
@@ -55,14 +80,24 @@ async def get_current_user_optional(
         except ValueError:
             return None
         
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        return user
+        return await _get_principal(session, user_id)
     except Exception:
         return None
+def limit_by_client(limiter: RateLimiter):
+    """Dependency applying `limiter` to each client address."""
+    async def check(request: Request) -> None:
+        client = request.client.host if request.client else "unknown"
+        if not await limiter.hit(client):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(limiter.retry_after())},
+            )
+    return check
+
 async def get_current_admin(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)]
+) -> Principal:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,21 +1,32 @@
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.core.db.database import async_get_db
-from app.models.user import User, UserRole
+from app.core import property_io
+from app.core.db.database import async_get_db, async_get_session_maker
+from app.core.cache import response_cache
+from app.core.security import Principal, password_hasher
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+from app.models.property import PropertyStatus
+from app.models.user import UserRole
 from app.schemas.user import UserCreate, UserRead, UserUpdate
-from app.schemas.property import PropertyRead
+from app.schemas.property import PropertyBulkAction, PropertyBulkResult, PropertyRead
+from app.schemas.auth import PasswordHashStats
+from app.schemas.cache import CacheStats
+from app.schemas.job import JobTypeStats
 from app.api.dependencies import get_current_admin
-from app.crud import crud_users, crud_property
+from app.crud import crud_jobs, crud_users, crud_property, crud_property_rows
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE = 1000
+
 @router.post("/agents", response_model=UserRead)
 async def create_agent(
     user_in: UserCreate,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_admin: Annotated[User, Depends(get_current_admin)]
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
 ):
     # Check if user exists
     user = await crud_users.get_user_by_email(session, user_in.email)
@@ -32,7 +43,7 @@ async def create_agent(
 @router.get("/agents", response_model=List[UserRead])
 async def read_agents(
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_admin: Annotated[User, Depends(get_current_admin)]
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
 ):
     agents = await crud_users.get_all_agents(session)
     return agents
@@ -40,18 +51,121 @@ async def read_agents(
 @router.get("/properties", response_model=List[PropertyRead])
 async def read_all_properties(
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_admin: Annotated[User, Depends(get_current_admin)],
+    current_admin: Annotated[Principal, Depends(get_current_admin)],
     skip: int = 0,
     limit: int = 100,
+    cursor: Annotated[Optional[str], Query()] = None,
+):
+    try:
+        items = await crud_property_rows.get_multi_rows(session, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    headers = {}
+    next_cursor = crud_property.next_cursor(items, "id", limit)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=crud_property_rows.dump_rows(items), media_type="application/json", headers=headers)
+
+@router.get("/properties/export")
+async def export_properties(
+    session_maker: Annotated[async_sessionmaker, Depends(async_get_session_maker)],
+    current_admin: Annotated[Principal, Depends(get_current_admin)],
+    export_format: Annotated[str, Query(alias="format", pattern="^(ndjson|csv)$")] = "ndjson",
+    status: Annotated[Optional[PropertyStatus], Query()] = None,
+    after_id: Annotated[Optional[int], Query(ge=0)] = None,
+):
+    """
+    Stream the whole catalogue as NDJSON or CSV, in id order.
+
+    To resume an interrupted export, pass the last id received as `after_id`.
+    """
+    # The body is sent after the handler returns; the stream reads through its
+    # own session rather than one tied to the request's dependencies
+    async def chunks():
+        header = export_format == "csv"
+        async with session_maker() as session:
+            async for rows in crud_property_rows.stream_rows(
+                session, status=status.value if status else None, after_id=after_id, batch_size=EXPORT_BATCH_SIZE
+            ):
+                if export_format == "csv":
+                    yield property_io.encode_csv(rows, header=header)
+                    header = False
+                else:
+                    yield property_io.encode_ndjson(rows)
+        # An empty export still gets its CSV header
+        if header:
+            yield property_io.encode_csv([], header=True)
+
+    return StreamingResponse(
+        chunks(),
+        media_type=property_io.EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="properties.{export_format}"'},
+    )
+
+@router.post("/properties/bulk", response_model=PropertyBulkResult)
+async def bulk_update_properties(
+    bulk_in: PropertyBulkAction,
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    current_admin: Annotated[Principal, Depends(get_current_admin)],
 ):
-    return await crud_property.get_multi(session, skip=skip, limit=limit)
+    """
+    Publish, unpublish, reassign or delete many listings with a single statement.
+
+    Listings are selected by `ids` or by a non-empty `filter`.
+    """
+    if (bulk_in.ids is None) == (bulk_in.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or filter")
+    if bulk_in.filter is not None:
+        criteria = bulk_in.filter.model_dump(exclude_none=True)
+        if not criteria:
+            raise HTTPException(status_code=400, detail="Filter must have at least one criterion")
+        where = crud_property.bulk_filter(**{key: getattr(value, "value", value) for key, value in criteria.items()})
+    else:
+        where = crud_property.bulk_filter(ids=bulk_in.ids)
+
+    if bulk_in.action == "reassign":
+        if bulk_in.agent_id is None:
+            raise HTTPException(status_code=400, detail="agent_id is required to reassign")
+        agent = await crud_users.get_user_by_id(session, bulk_in.agent_id)
+        if not agent or agent.role != UserRole.AGENT:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        affected = await crud_property.bulk_reassign(session, where, agent.id)
+    elif bulk_in.action == "delete":
+        affected = await crud_property.bulk_delete(session, where)
+    else:
+        new_status = PropertyStatus.PUBLISHED if bulk_in.action == "publish" else PropertyStatus.DRAFT
+        affected = await crud_property.bulk_set_status(session, where, new_status)
+    return PropertyBulkResult(action=bulk_in.action, affected=affected)
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def read_cache_stats(
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
+):
+    return response_cache.stats()
+
+@router.get("/passwords/stats", response_model=PasswordHashStats)
+async def read_password_hash_stats(
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
+):
+    """Load and latency of the password hashing pool used by login and password changes."""
+    return password_hasher.stats()
+
+@router.get("/jobs/stats", response_model=List[JobTypeStats])
+async def read_job_stats(
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
+):
+    """Number of background jobs per type and status."""
+    counts = await crud_jobs.count_jobs(session)
+    return [JobTypeStats(type=job_type, **by_status) for job_type, by_status in sorted(counts.items())]
 
 @router.put("/agents/{agent_id}", response_model=UserRead)
 async def update_agent(
     agent_id: int,
     user_in: UserUpdate,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_admin: Annotated[User, Depends(get_current_admin)]
+    current_admin: Annotated[Principal, Depends(get_current_admin)]
 ):
     agent = await crud_users.get_user_by_id(session, agent_id)
     if not agent:
@@ -73,7 +187,9 @@ async def update_agent(
 async def delete_agent(
     agent_id: int,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_admin: Annotated[User, Depends(get_current_admin)]
+    current_admin: Annotated[Principal, Depends(get_current_admin)],
+    reassign_to: Annotated[Optional[int], Query(description="Agent taking over the listings")] = None,
+    delete_listings: Annotated[bool, Query(description="Delete the listings instead")] = False,
 ):
     agent = await crud_users.get_user_by_id(session, agent_id)
     if not agent:
@@ -81,5 +197,15 @@ async def delete_agent(
         
     if agent.role != UserRole.AGENT:
           raise HTTPException(status_code=400, detail="User is not an agent")
+
+    if reassign_to is not None and delete_listings:
+        raise HTTPException(status_code=400, detail="Pass either reassign_to or delete_listings=true, not both")
+    if reassign_to is not None:
+        new_agent = await crud_users.get_user_by_id(session, reassign_to)
+        if not new_agent or new_agent.role != UserRole.AGENT or new_agent.id == agent.id:
+            raise HTTPException(status_code=400, detail="Invalid agent to reassign listings to")
           
-    await crud_users.delete_user(session, agent)
+    try:
+        await crud_users.delete_user(session, agent, reassign_to=reassign_to, delete_listings=delete_listings)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Agent owns listings; pass reassign_to or delete_listings=true")
@@ -5,15 +5,27 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db.database import async_get_db
-from app.core.security import verify_password, create_access_token
+from app.core.security import PasswordHasherBusy, create_access_token, needs_rehash, password_hasher
 from app.core.rate_limit import login_rate_limiter
 from app.models.user import User
 from app.schemas.auth import Login, Token
 from app.schemas.user import UserRead
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user_row
+from app.crud import crud_users
 
 router = APIRouter()
 
+async def _rehash_if_needed(session: AsyncSession, user: User, password: str) -> None:
+    """Move a verified password to the current bcrypt cost, while we have it in clear."""
+    if not needs_rehash(user.password_hash):
+        return
+    try:
+        password_hash = await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        # Not worth failing the login for; the next one tries again
+        return
+    await crud_users.set_password_hash(session, user, password_hash)
+
 @router.post("/login", response_model=Token)
 async def login(
     login_data: Login,
@@ -30,7 +42,7 @@ async def login(
     result = await session.execute(select(User).where(User.email == login_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    if not user or not await password_hasher.verify(login_data.password, user.password_hash):
         # Record failed attempt
         await login_rate_limiter.record_failed_attempt(login_data.email)
         raise HTTPException(
@@ -39,6 +51,8 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    await _rehash_if_needed(session, user, login_data.password)
+
     # Reset attempts on successful login
     await login_rate_limiter.reset_attempts(login_data.email)
     
@@ -62,7 +76,7 @@ async def login_for_access_token(
     result = await session.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await password_hasher.verify(form_data.password, user.password_hash):
         # Record failed attempt
         await login_rate_limiter.record_failed_attempt(form_data.username)
         raise HTTPException(
@@ -71,6 +85,8 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    await _rehash_if_needed(session, user, form_data.password)
+
     # Reset attempts on successful login
     await login_rate_limiter.reset_attempts(form_data.username)
     
@@ -80,6 +96,6 @@ async def login_for_access_token(
 
 @router.get("/me", response_model=UserRead)
 async def read_users_me(
-    current_user: Annotated[User, Depends(get_current_user)]
+    current_user: Annotated[User, Depends(get_current_user_row)]
 ):
     return current_user
\ No newline at end of file
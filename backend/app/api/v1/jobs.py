@@ -0,0 +1,25 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db.database import async_get_db
+from app.core.security import Principal
+from app.models.user import UserRole
+from app.schemas.job import JobRead
+from app.api.dependencies import get_current_user
+from app.crud import crud_jobs
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobRead)
+async def read_job(
+    job_id: int,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(async_get_db)]
+):
+    """Status of a background job started by one of your requests."""
+    job = await crud_jobs.get_job(session, job_id)
+    # Other users' jobs are reported as missing rather than forbidden
+    if not job or (job.owner_id != current_user.id and current_user.role != UserRole.ADMIN):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,98 +1,431 @@
-import shutil
-import uuid
+import asyncio
+import io
+from functools import lru_cache
 from pathlib import Path
 from typing import Annotated, List, Optional
-from fastapi import APIRouter, Depends, status, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, Depends, status, UploadFile, File, HTTPException, Query, Request, Response
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm.attributes import flag_modified
+from starlette.concurrency import run_in_threadpool
 
+from app.core import geo, images, property_io, uploads
 from app.core.db.database import async_get_db
-from app.models.user import User, UserRole
-from app.schemas.property import PropertyCreate, PropertyRead, PropertyUpdate
-from app.crud import crud_property
-from app.api.dependencies import get_current_user, get_current_user_optional
+from app.core.cache import CachedResponse, response_cache
+from app.core.config import settings
+from app.core.facets import facet_counts
+from app.core.jobs import job_worker
+from app.core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+from app.core.rate_limit import published_rate_limiter
+from app.core.storage import StorageError, get_storage
+from app.core.uploads import StoredBlob, UploadTooLargeError
+from app.core.security import Principal
+from app.models.user import UserRole
+from app.models.property import PropertyType
+from app.schemas.property import (
+    PropertyCluster,
+    PropertyCreate,
+    PropertyFacets,
+    PropertyGeoResult,
+    PropertyImageUpload,
+    PropertyImportError,
+    PropertyImportResult,
+    PropertyRead,
+    PropertySearchFilters,
+    PropertySearchResult,
+    PropertyUpdate,
+    PresignedImageUpload,
+    property_projection,
+)
+from app.crud import crud_image_blobs, crud_jobs, crud_property, crud_property_rows, crud_geo_cells, crud_users
+from app.api.dependencies import get_current_user, get_current_user_optional, limit_by_client
+from app.jobs.names import RENDER_DERIVATIVES
 
 router = APIRouter()
 
 # Constants
-UPLOAD_DIR = Path("uploads")
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = settings.UPLOAD_MAX_FILE_SIZE
+# Read from direct uploads to check them; enough for the header and EXIF of any image
+PROBE_BYTES = 256 * 1024
+# Background job rendering the derivatives of an upload, see /jobs/{id}
+JOB_ID_HEADER = "X-Job-Id"
+IMPORT_BATCH_SIZE = 5000
+MAX_IMPORT_ERRORS = 100
+MAX_IMPORT_ROWS = 100_000
+MAX_IMPORT_BYTES = 100 * 1024 * 1024
+
+FIELDS_DESCRIPTION = 'Comma-separated PropertyRead fields, or "summary" for compact grid cards'
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+def _projection(fields: str | None) -> type[BaseModel] | None:
+    try:
+        return property_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _list_body(items, projection: type[BaseModel] | None) -> bytes:
+    adapter = _list_adapter(projection or PropertyRead)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+def _cached_response(request: Request, cached: CachedResponse) -> Response:
+    if is_not_modified(request, cached.headers["ETag"], None):
+        return not_modified(cached.headers)
+    return Response(content=cached.body, media_type="application/json", headers=cached.headers)
 
 @router.post("", response_model=PropertyRead, status_code=status.HTTP_201_CREATED)
 async def create_property(
     property_in: PropertyCreate,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(async_get_db)]
 ):
     return await crud_property.create_property(session, property_in, current_user.id)
 
+@router.post("/import", response_model=PropertyImportResult)
+async def import_properties(
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    import_format: Annotated[str, Query(alias="format", pattern="^(ndjson|csv)$")] = "ndjson",
+    agent_id: Annotated[Optional[int], Query(description="Owner of the imported listings (admins only)")] = None,
+):
+    """
+    Bulk-create listings from an NDJSON or CSV request body.
+
+    Each row is validated like `POST /properties`. Valid rows are inserted in
+    batches, one transaction per batch; invalid rows are skipped and reported.
+    Bodies over MAX_IMPORT_BYTES get a 413, and more than MAX_IMPORT_ROWS rows
+    or a row over property_io.MAX_RECORD_LENGTH characters a 400; batches
+    inserted before the limit was hit are kept.
+    """
+    if int(request.headers.get("content-length") or 0) > MAX_IMPORT_BYTES:
+        raise HTTPException(status_code=413, detail=f"Import larger than {MAX_IMPORT_BYTES} bytes")
+    owner_id = current_user.id
+    if agent_id is not None and agent_id != current_user.id:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Not authorized to import for another agent")
+        agent = await crud_users.get_user_by_id(session, agent_id)
+        if not agent or agent.role != UserRole.AGENT:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        owner_id = agent_id
+
+    created = 0
+    failed = 0
+    errors: list[PropertyImportError] = []
+    batch: list[PropertyCreate] = []
+    rows = property_io.IMPORT_READERS[import_format](property_io.limit_size(request.stream(), MAX_IMPORT_BYTES))
+    try:
+        async for row, data, error in rows:
+            if row > MAX_IMPORT_ROWS:
+                raise HTTPException(status_code=400, detail=f"Import has more than {MAX_IMPORT_ROWS} rows")
+            messages = [error] if error else []
+            if data is not None:
+                try:
+                    batch.append(PropertyCreate.model_validate(data))
+                except ValidationError as e:
+                    messages = [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+            if messages:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append(PropertyImportError(row=row, errors=messages))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                created += len(await crud_property.bulk_create_properties(session, batch, owner_id))
+                batch = []
+    except property_io.ImportTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except property_io.ImportLimitError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    created += len(await crud_property.bulk_create_properties(session, batch, owner_id))
+
+    return PropertyImportResult(created=created, failed=failed, errors=errors)
+
 @router.get("/mine", response_model=List[PropertyRead])
 async def read_my_properties(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(async_get_db)],
     status: Annotated[Optional[str], Query()] = None,
     sort: Annotated[Optional[str], Query()] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Annotated[Optional[str], Query()] = None,
+    fields: Annotated[Optional[str], Query(description=FIELDS_DESCRIPTION)] = None,
 ):
     """
     Get current user's properties.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page.
+    Send the `ETag` back as `If-None-Match` to get a 304 when nothing changed.
     """
-    return await crud_property.get_multi_by_owner(
-        session, 
-        owner_id=current_user.id, 
-        status=status, 
-        sort=sort,
-        skip=skip,
-        limit=limit
-    )
+    projection = _projection(fields)
+    count, last_modified = await crud_property.get_listing_version(session, owner_id=current_user.id, status=status)
+    etag = make_etag("mine", current_user.id, status, sort, skip, limit, cursor, fields, count, last_modified)
+    headers = validator_headers(etag, last_modified, private=True)
+    # Deletes don't move max(updated_at), so collections revalidate on the ETag only
+    if is_not_modified(request, etag, None):
+        return not_modified(headers)
+
+    try:
+        items = await crud_property.get_multi_by_owner(
+            session, 
+            owner_id=current_user.id, 
+            status=status, 
+            sort=sort,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@router.get("/published", response_model=List[PropertyRead])
+    next_cursor = crud_property.next_cursor(items, crud_property.owner_sort_key(sort), limit)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if projection:
+        return Response(content=_list_body(items, projection), media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return items
+
+@router.get(
+    "/published",
+    response_model=List[PropertyRead],
+    dependencies=[Depends(limit_by_client(published_rate_limiter))],
+)
 async def read_published_properties(
+    request: Request,
     session: Annotated[AsyncSession, Depends(async_get_db)],
     city: Annotated[Optional[str], Query()] = None,
     sort: Annotated[Optional[str], Query()] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Annotated[Optional[str], Query()] = None,
+    fields: Annotated[Optional[str], Query(description=FIELDS_DESCRIPTION)] = None,
 ):
     """
     Get all published properties (Public accessible).
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page.
+    Pages are served from the response cache until a listing they may contain changes.
+    Send the `ETag` back as `If-None-Match` to get a 304 when nothing changed.
+    """
+    projection = _projection(fields)
+    sort_key = crud_property.published_sort_key(sort)
+    cache_key = ("published", city, sort_key, limit, ("cursor", cursor) if cursor else ("skip", skip),
+                 projection and projection.__name__, projection and tuple(projection.model_fields))
+    cached = response_cache.get(cache_key)
+    if cached:
+        return _cached_response(request, cached)
+
+    generation = response_cache.generation
+    count, last_modified = await crud_property.get_listing_version(session, status="published", city=city)
+    etag = make_etag(*cache_key, count, last_modified)
+    headers = validator_headers(etag, last_modified)
+    # Unpublishing and deletes don't move max(updated_at) of the published set,
+    # so collections revalidate on the ETag only
+    if is_not_modified(request, etag, None):
+        return not_modified(headers)
+
+    try:
+        if projection:
+            items = await crud_property.get_multi_published(
+                session, 
+                city=city,
+                sort=sort,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                projection=projection,
+            )
+        else:
+            # Full listings take the Core + orjson path
+            items = await crud_property_rows.get_multi_published_rows(
+                session, city=city, sort=sort, skip=skip, limit=limit, cursor=cursor
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    next_cursor = crud_property.next_cursor(items, sort_key, limit)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    body = _list_body(items, projection) if projection else crud_property_rows.dump_rows(items)
+    tags = {f"published:city:{city}" if city else "published:all"}
+    tags.update(f"agent:{item.agent_id}" for item in items)
+    response_cache.store(cache_key, body, headers, tags, generation)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/published/facets", response_model=PropertyFacets)
+async def read_published_facets(
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+):
+    """
+    Published property counts per city, property type and price bucket (Public accessible).
+
+    Served from an in-process cache that listing writes keep up to date.
+    """
+    return await facet_counts.get(lambda: crud_property.count_published_facets(session))
+
+@router.get("/published/geo", response_model=List[PropertyGeoResult])
+async def read_published_properties_geo(
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    lng: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    radius_km: Annotated[Optional[float], Query(gt=0, le=500)] = None,
+    min_lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    min_lng: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    max_lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    max_lng: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+):
+    """
+    Published properties near a point or inside a map viewport, nearest first (Public accessible).
+
+    Give `lat`, `lng` and `radius_km` for a radius search, or `min_lat`,
+    `min_lng`, `max_lat` and `max_lng` for a bounding box. Distances are
+    measured from `lat`/`lng` when given, otherwise from the box center.
+    """
+    bbox_params = (min_lat, min_lng, max_lat, max_lng)
+    has_center = lat is not None and lng is not None
+    if all(v is not None for v in bbox_params):
+        if min_lat > max_lat or min_lng > max_lng:
+            raise HTTPException(status_code=400, detail="Bounding box minimums cannot exceed maximums")
+        bbox = bbox_params
+        center = (lat, lng) if has_center else ((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+    elif has_center and radius_km is not None:
+        bbox = geo.bounding_box(lat, lng, radius_km)
+        center = (lat, lng)
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide lat, lng and radius_km, or min_lat, min_lng, max_lat and max_lng",
+        )
+
+    return await crud_property.get_published_geo(
+        session, center=center, bbox=bbox, radius_km=radius_km if has_center else None, limit=limit
+    )
+
+@router.get("/published/clusters", response_model=List[PropertyCluster])
+async def read_published_clusters(
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    min_lat: Annotated[float, Query(ge=-90, le=90)],
+    min_lng: Annotated[float, Query(ge=-180, le=180)],
+    max_lat: Annotated[float, Query(ge=-90, le=90)],
+    max_lng: Annotated[float, Query(ge=-180, le=180)],
+    zoom: Annotated[int, Query(ge=0, le=22)],
+):
+    """
+    Clusters of published properties for a map viewport (Public accessible).
+
+    Each cluster reports its listing count, centroid and price range. The
+    aggregates are precomputed per grid cell, so this is one index lookup
+    whatever the number of listings in view.
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Bounding box minimums cannot exceed maximums")
+    return await crud_geo_cells.get_clusters(session, (min_lat, min_lng, max_lat, max_lng), zoom)
+
+@router.get("/search", response_model=List[PropertySearchResult])
+async def search_properties(
+    response: Response,
+    session: Annotated[AsyncSession, Depends(async_get_db)],
+    q: Annotated[Optional[str], Query(max_length=200)] = None,
+    city: Annotated[Optional[str], Query()] = None,
+    price_min: Annotated[Optional[float], Query(ge=0)] = None,
+    price_max: Annotated[Optional[float], Query(ge=0)] = None,
+    surface_min: Annotated[Optional[float], Query(ge=0)] = None,
+    surface_max: Annotated[Optional[float], Query(ge=0)] = None,
+    bedrooms_min: Annotated[Optional[int], Query(ge=0, le=20)] = None,
+    bathrooms_min: Annotated[Optional[int], Query(ge=0, le=10)] = None,
+    property_type: Annotated[Optional[List[PropertyType]], Query()] = None,
+    sort: Annotated[Optional[str], Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Annotated[Optional[str], Query()] = None,
+):
+    """
+    Search published properties by several criteria at once (Public accessible).
+
+    `q` matches words in the title, description and address; keyword results
+    are ranked by relevance unless `sort` is given and include a highlighted
+    `snippet`. `property_type` may be repeated. Pass the `X-Next-Cursor` response header
+    back as `cursor` to fetch the next page.
     """
-    return await crud_property.get_multi_published(
-        session, 
+    filters = PropertySearchFilters(
         city=city,
-        sort=sort,
-        skip=skip,
-        limit=limit
+        price_min=price_min,
+        price_max=price_max,
+        surface_min=surface_min,
+        surface_max=surface_max,
+        bedrooms_min=bedrooms_min,
+        bathrooms_min=bathrooms_min,
+        property_types=property_type,
     )
+    try:
+        items = await crud_property.search_published(
+            session, filters, q=q, sort=sort, cursor=cursor, limit=limit
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except crud_property.InvalidSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_cursor = crud_property.next_cursor(items, crud_property.search_sort_key(sort, q), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
 @router.get("/{property_id}", response_model=PropertyRead)
 async def read_property(
     property_id: int,
+    request: Request,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_user: Annotated[User | None, Depends(get_current_user_optional)] = None
+    current_user: Annotated[Principal | None, Depends(get_current_user_optional)] = None
 ):
-    property = await crud_property.get_property(session, property_id)
-    if not property:
+    # Anonymous visitors can only see published listings, so their responses
+    # are shared through the response cache
+    cache_key = ("property", property_id)
+    if current_user is None:
+        cached = response_cache.get(cache_key)
+        if cached:
+            return _cached_response(request, cached)
+
+    # Authorize and revalidate on a few columns before loading the listing
+    generation = response_cache.generation
+    version = await crud_property.get_property_version(session, property_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Property not found")
         
     # Check permissions
-    is_owner = current_user and property.agent_id == current_user.id
+    is_owner = current_user and version.agent_id == current_user.id
     is_admin = current_user and current_user.role == UserRole.ADMIN
-    is_published = property.status == "published"
+    is_published = version.status == "published"
     
     if not (is_published or is_owner or is_admin):
          raise HTTPException(status_code=404, detail="Property not found")
-         
-    return property
+
+    etag = make_etag("property", property_id, version.updated_at)
+    headers = validator_headers(etag, version.updated_at, private=not is_published)
+    if is_not_modified(request, etag, version.updated_at):
+        return not_modified(headers)
+
+    property = await crud_property.get_property(session, property_id)
+    if not property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    body = PropertyRead.model_validate(property).model_dump_json().encode("utf-8")
+    if current_user is None:
+        tags = {f"property:{property.id}", f"agent:{property.agent_id}"}
+        response_cache.store(cache_key, body, headers, tags, generation)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.patch("/{property_id}", response_model=PropertyRead)
 async def update_property(
     property_id: int,
     property_in: PropertyUpdate,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     property = await crud_property.get_property(session, property_id)
     if not property:
@@ -110,12 +443,12 @@ async def update_property(
 async def delete_property(
     property_id: int,
     session: Annotated[AsyncSession, Depends(async_get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """
     Delete a property.
     """
-    property = await crud_property.get_property(session, property_id)
+    property = await crud_property.get_property_version(session, property_id)
     if not property:
         raise HTTPException(status_code=404, detail="Property not found")
         
@@ -126,64 +459,214 @@ async def delete_property(
     await crud_property.delete_property(session, property_id)
     return {"detail": "Property deleted successfully"}
 
+async def _get_editable_property(session: AsyncSession, property_id: int, current_user: Principal):
+    property = await crud_property.get_property(session, property_id)
+    if not property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    # Owner or Admin
+    if property.agent_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to update this property")
+    return property
+
+def _image_extension(filename: str) -> str:
+    """Stored extension for an upload's file name; 400 for other file types."""
+    ext = Path(filename).suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"File type not allowed: {filename}")
+    return ".jpg" if ext == ".jpeg" else ext
+
+def _check_upload_count(count: int) -> None:
+    if count > settings.UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.UPLOAD_MAX_FILES} files per upload")
+
+async def _add_images(session: AsyncSession, property, blobs: list[StoredBlob], current_user: Principal, response: Response):
+    updated, unrendered = await crud_property.add_images(session, property, blobs)
+    if unrendered:
+        # Derivatives are rendered in the background
+        job = await crud_jobs.enqueue_job(
+            session,
+            RENDER_DERIVATIVES,
+            {"property_id": property.id, "digests": [blob.digest for blob in unrendered]},
+            owner_id=current_user.id,
+        )
+        job_worker.notify()
+        response.headers[JOB_ID_HEADER] = str(job.id)
+    return updated
+
+async def _probe_stored(blob: StoredBlob, filename: str) -> images.ProbedImage:
+    """Probe a file uploaded straight to storage from its first bytes (all of them if needed)."""
+    storage = get_storage()
+    head = await storage.read(blob.key, PROBE_BYTES)
+    try:
+        probed = await run_in_threadpool(images.probe, io.BytesIO(head), filename)
+    except images.InvalidImageError as e:
+        if blob.size <= PROBE_BYTES or isinstance(e, images.ImageTooLargeError):
+            raise
+        # Headers can be longer than usual (large EXIF or ICC profiles)
+        probed = await run_in_threadpool(images.probe, io.BytesIO(await storage.read(blob.key)), filename)
+    if probed.ext != blob.ext:
+        raise images.InvalidImageError(filename)
+    return probed
+
 @router.post("/{property_id}/images", response_model=PropertyRead)
 async def upload_property_images(
     property_id: int,
     files: List[UploadFile],
-    current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(async_get_db)]
 ):
-    # 1. Get Property
-    property = await crud_property.get_property(session, property_id)
-    if not property:
-        raise HTTPException(status_code=404, detail="Property not found")
-        
-    # 2. Check Authorization (Owner or Admin)
-    # Note: property.agent_id is an integer, current_user.id is an integer.
-    if property.agent_id != current_user.id and current_user.role != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Not authorized to update this property")
-        
-    # 3. Create upload directory
-    prop_upload_dir = UPLOAD_DIR / str(property_id)
-    prop_upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    new_images = []
-    
+    """
+    Upload images through the API. Prefer /images/presign with the S3
+    backend, which keeps image bytes off the API.
+    """
+    property = await _get_editable_property(session, property_id, current_user)
+
+    # Validate every file before writing any of them
+    _check_upload_count(len(files))
     for file in files:
-        # Validate Extension
-        ext = Path(file.filename).suffix.lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            # Clean up what we might have saved? No, we just skip/fail this request.
-            raise HTTPException(status_code=400, detail=f"File type not allowed: {file.filename}")
-            
-        # Generator unique filename
-        filename = f"{uuid.uuid4()}{ext}"
-        file_path = prop_upload_dir / filename
-        
-        # Save file
+        _image_extension(file.filename)
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+
+    # Receive all files concurrently, hashing them as they are written
+    staging_dir = get_storage().staging_dir
+    results = await asyncio.gather(
+        *(uploads.receive_upload(file, staging_dir, MAX_FILE_SIZE) for file in files),
+        return_exceptions=True,
+    )
+    received = [result for result in results if not isinstance(result, BaseException)]
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for staged in received:
+            staged.path.unlink(missing_ok=True)
+        error = errors[0]
+        if isinstance(error, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=f"File too large: {error}")
+        raise HTTPException(status_code=500, detail=f"Could not save file: {error}")
+
+    # The stored extension and the dimensions come from the content, read from the header only
+    blobs = []
+    try:
+        for file, upload in zip(files, received):
+            try:
+                probed = await run_in_threadpool(images.probe, str(upload.path), file.filename)
+            except images.ImageTooLargeError:
+                raise HTTPException(status_code=413, detail=f"Image dimensions too large: {file.filename}")
+            except images.InvalidImageError:
+                raise HTTPException(status_code=400, detail=f"Not a valid image: {file.filename}")
+            blobs.append(StoredBlob(upload.digest, probed.ext, upload.size, probed.width, probed.height))
+    except BaseException:
+        for staged in received:
+            staged.path.unlink(missing_ok=True)
+        raise
+
+    # Content already stored (same photo on another listing) is not stored twice
+    stored, reused = [], []
+    for blob, upload in zip(blobs, received):
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
-            
-        # Verify size after save (simple MVP approach)
-        if file_path.stat().st_size > MAX_FILE_SIZE:
-            file_path.unlink() # Delete too large file
-            raise HTTPException(status_code=400, detail=f"File too large: {file.filename}")
-            
-        new_images.append(f"uploads/{property_id}/{filename}")
-        
-    # 4. Update Database
-    if property.images is None:
-        property.images = []
-        
-    updated_images = list(property.images) + new_images
-    property.images = updated_images
-    flag_modified(property, "images")
-    
-    session.add(property)
-    await session.commit()
-    await session.refresh(property)
-    
-    return property
\ No newline at end of file
+            if await uploads.store_blob(upload.path, blob):
+                stored.append(blob)
+            else:
+                reused.append((blob, upload))
+        except StorageError as e:
+            for staged in received:
+                staged.path.unlink(missing_ok=True)
+            # Files this request already stored are collected unless referenced meanwhile
+            await crud_image_blobs.abandon_blobs(session, stored)
+            raise HTTPException(status_code=503, detail=f"Could not store file: {e}")
+
+    try:
+        updated = await _add_images(session, property, blobs, current_user, response)
+        # A reused blob collected before the references were committed lost its file; put back this copy
+        for blob, upload in reused:
+            await uploads.store_blob(upload.path, blob)
+    except StorageError as e:
+        raise HTTPException(status_code=503, detail=f"Could not store file: {e}")
+    finally:
+        for blob, upload in reused:
+            upload.path.unlink(missing_ok=True)
+    return updated
+
+@router.post("/{property_id}/images/presign", response_model=List[PresignedImageUpload])
+async def presign_property_images(
+    property_id: int,
+    files: List[PropertyImageUpload],
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(async_get_db)]
+):
+    """
+    Get URLs to upload images straight to storage.
+
+    Send each file's size and SHA-256 (hex); PUT its bytes to the returned
+    `url` with the returned `headers`, then call /images/complete with the
+    same list. Files whose content is already stored get no `url`.
+    """
+    await _get_editable_property(session, property_id, current_user)
+    _check_upload_count(len(files))
+    for file in files:
+        _image_extension(file.filename)
+        if file.size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+
+    blobs = [StoredBlob(file.sha256, _image_extension(file.filename), file.size) for file in files]
+    stored = {blob.digest for blob in await crud_image_blobs.get_blobs(session, [blob.digest for blob in blobs]) if blob.width}
+    pending = [blob for blob in blobs if blob.digest not in stored]
+    if pending:
+        await crud_image_blobs.reserve_blobs(session, pending)
+    storage = get_storage()
+    presigned = []
+    for blob in blobs:
+        if blob.digest in stored:
+            presigned.append(PresignedImageUpload(sha256=blob.digest))
+            continue
+        upload = storage.presign_upload(blob.key, blob.size, blob.digest, uploads.CONTENT_TYPES[blob.ext])
+        presigned.append(PresignedImageUpload(sha256=blob.digest, url=upload.url, method=upload.method, headers=upload.headers))
+    return presigned
+
+@router.post("/{property_id}/images/complete", response_model=PropertyRead)
+async def complete_property_images(
+    property_id: int,
+    files: List[PropertyImageUpload],
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(async_get_db)]
+):
+    """
+    Add images uploaded through /images/presign to the listing.
+
+    Only the stored files' headers are read, to check they are images.
+    """
+    property = await _get_editable_property(session, property_id, current_user)
+    _check_upload_count(len(files))
+    requested = [StoredBlob(file.sha256, _image_extension(file.filename), file.size) for file in files]
+    known = {blob.digest: blob for blob in await crud_image_blobs.get_blobs(session, [blob.digest for blob in requested])}
+    storage = get_storage()
+    blobs = []
+    for file, blob in zip(files, requested):
+        row = known.get(blob.digest)
+        if row is not None and row.width:
+            # Checked when it was first stored
+            blobs.append(StoredBlob(row.digest, row.ext, row.size, row.width, row.height))
+            continue
+        try:
+            size = await storage.size(blob.key)
+        except StorageError as e:
+            raise HTTPException(status_code=503, detail=f"Could not read file: {e}")
+        if size is None:
+            raise HTTPException(status_code=400, detail=f"Upload not found: {file.filename}")
+        if size != blob.size:
+            raise HTTPException(status_code=400, detail=f"Upload incomplete: {file.filename}")
+        try:
+            probed = await _probe_stored(blob, file.filename)
+        except images.InvalidImageError as e:
+            # Never referenced, so nothing else can be using it
+            await storage.delete([blob.key])
+            if isinstance(e, images.ImageTooLargeError):
+                raise HTTPException(status_code=413, detail=f"Image dimensions too large: {file.filename}")
+            raise HTTPException(status_code=400, detail=f"Not a valid image: {file.filename}")
+        except StorageError as e:
+            raise HTTPException(status_code=503, detail=f"Could not read file: {e}")
+        blobs.append(blob._replace(width=probed.width, height=probed.height))
+
+    return await _add_images(session, property, blobs, current_user, response)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.core import uploads
+from app.core.storage import LocalStorage, get_storage
+
+router = APIRouter()
+
+@router.put("/{key:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_presigned_upload(
+    key: str,
+    request: Request,
+    size: int,
+    sha256: str,
+    expires: int,
+    signature: str,
+):
+    """Receive a presigned direct upload, for the local storage backend.
+
+    The signature stands in for authentication, as it does with S3: it
+    covers the key, size, digest, content type and expiry.
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    content_type = request.headers.get("content-type", "")
+    if not storage.verify_upload(key, size, sha256, content_type, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload URL")
+    try:
+        received = await uploads.receive_stream(request.stream(), storage.staging_dir, size)
+    except uploads.UploadTooLargeError:
+        raise HTTPException(status_code=400, detail="Content does not match the upload URL")
+    if received.size != size or received.digest != sha256:
+        received.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Content does not match the upload URL")
+    await storage.put_file(key, received.path, content_type)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -5,21 +5,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db.database import async_get_db
 from app.models.user import User
 from app.schemas.user import UserRead, UserUpdate
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user_row
 from app.crud import crud_users
 
 router = APIRouter()
 
 @router.get('/me', response_model=UserRead)
 async def read_current_user(
-    current_user: Annotated[User, Depends(get_current_user)]
+    current_user: Annotated[User, Depends(get_current_user_row)]
 ):
     return current_user
 
 @router.patch('/me', response_model=UserRead)
 async def update_current_user(
     user_in: UserUpdate,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_row)],
     session: Annotated[AsyncSession, Depends(async_get_db)]
 ):
     # If updating email, check uniqueness
@@ -0,0 +1,169 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple
+
+from app.core.config import settings
+from app.core.events import ListingSnapshot, on_listing_change
+from app.core.security import Principal
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: dict[str, str]
+    expires_at: float
+    tags: frozenset[str]
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of serialized response bodies.
+
+    Entries carry tags (e.g. "property:12", "published:all") so writes can
+    drop exactly the entries that may contain the changed listing.
+
+    The cache is per process: invalidation only reaches the process that
+    handled the write, so other workers keep serving their copies until the
+    TTL expires. A response built while a write was being invalidated may
+    already be stale; readers take `generation` before querying and pass it
+    to `store`, which drops the entry if any invalidation happened since.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._keys_by_tag: dict[str, set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Changes on every invalidation."""
+        return self._generation
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(
+        self, key: Hashable, body: bytes, headers: dict[str, str], tags: set[str], generation: int | None = None,
+    ) -> None:
+        if not self.enabled or (generation is not None and generation != self._generation):
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CachedResponse(body, headers, time.monotonic() + self.ttl_seconds, frozenset(tags))
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate_tags(self, tags: set[str]) -> None:
+        self._generation += 1
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+class PrincipalCache:
+    """Bounded LRU + TTL cache of authenticated users' principals, keyed by user id.
+
+    Lets request authentication skip the user lookup; only the id, role and
+    name are kept, never the password hash. Writes to a user go through
+    crud_users, which invalidates the entry; the TTL bounds how long other
+    processes can serve a stale one.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[Principal, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Principal | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def store(self, principal: Principal) -> None:
+        self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+def listing_tags(listing: ListingSnapshot) -> set[str]:
+    """Tags of the cached public responses a listing can appear in."""
+    tags = {f"property:{listing.id}"}
+    if listing.status == "published":
+        tags.update({"published:all", f"published:city:{listing.city}"})
+    return tags
+
+def _invalidate_listing(before: ListingSnapshot | None, after: ListingSnapshot | None) -> None:
+    tags: set[str] = set()
+    for listing in (before, after):
+        if listing is not None:
+            tags |= listing_tags(listing)
+    response_cache.invalidate_tags(tags)
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
+on_listing_change(_invalidate_listing)
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
@@ -1,5 +1,6 @@
 import os
-from pydantic import SecretStr
+from typing import Annotated, Literal, Optional
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -21,6 +22,60 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: SecretStr = SecretStr("development_secret_key_change_in_production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    # bcrypt cost for new hashes (4-31, the range bcrypt accepts); pick it for the production
+    # hardware with scripts/tune_bcrypt.py. Hashes made at another cost are replaced on the next
+    # successful login, so lowering it also brings existing users back within the latency budget.
+    BCRYPT_ROUNDS: Annotated[int, Field(ge=4, le=31)] = 12
+    # bcrypt runs in this many threads; logins beyond MAX_PENDING waiting or running get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    
+    # Caching
+    FACETS_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+    # Authenticated users by id; bounds how long other processes see a changed or deleted user
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 4096
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    
+    # Rate limits: counters in the "database" (shared by all workers) or in "memory", per process,
+    # which multiplies every limit by the number of workers; use it only with a single worker
+    RATE_LIMIT_BACKEND: Literal["memory", "database"] = "database"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    LOGIN_RATE_LIMIT_ATTEMPTS: int = 5
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Per client address; behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    PUBLIC_RATE_LIMIT_REQUESTS: int = 300
+    PUBLIC_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    
+    # Uploads
+    UPLOAD_MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_MAX_FILES: int = 10
+    IMAGE_WORKERS: int = 2
+    # Unreferenced image files are deleted this long after their last use
+    IMAGE_BLOB_GC_DELAY_SECONDS: int = 3600
+    
+    # File storage: "local" (the uploads/ directory) or "s3" (any S3-compatible bucket)
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    # Lifetime of presigned direct-upload URLs
+    STORAGE_PRESIGN_EXPIRES_SECONDS: int = 900
+    S3_ENDPOINT_URL: str = "https://s3.amazonaws.com"
+    S3_BUCKET: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: SecretStr = SecretStr("")
+    # Public base URL of the bucket (website endpoint or CDN); /uploads redirects there
+    S3_PUBLIC_URL: Optional[str] = None
+    
+    # Background jobs
+    JOB_WORKERS: int = 4
+    JOB_POLL_SECONDS: float = 1.0
+    # A running job not finished within this time is presumed lost and rerun
+    JOB_LEASE_SECONDS: int = 600
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_RETRY_MAX_SECONDS: float = 600.0
+    JOB_SHUTDOWN_GRACE_SECONDS: float = 10.0
     
     # CORS
     CORS_ORIGINS: list[str] = [
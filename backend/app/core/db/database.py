@@ -26,4 +26,8 @@ async def create_tables():
 async def async_get_db():
     """Dependency for getting database session."""
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def async_get_session_maker():
+    """Dependency for work that outlives the request, such as streamed responses."""
+    return async_session_maker
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Callable, NamedTuple
+
+class ListingSnapshot(NamedTuple):
+    """The fields of a listing that in-process caches key on."""
+    id: int
+    agent_id: int
+    status: str
+    city: str
+    property_type: str
+    price: float
+    # Changes on every write, so any write counts as a change
+    updated_at: datetime | None
+
+ListingChangeHandler = Callable[[ListingSnapshot | None, ListingSnapshot | None], None]
+
+_handlers: list[ListingChangeHandler] = []
+
+def snapshot(prop) -> ListingSnapshot | None:
+    """Capture a Property before or after a write (None for "does not exist")."""
+    if prop is None:
+        return None
+    # Enum members and their plain values must compare (and hash) alike
+    status = getattr(prop.status, "value", prop.status)
+    property_type = getattr(prop.property_type, "value", prop.property_type)
+    return ListingSnapshot(
+        prop.id, prop.agent_id, status, prop.city, property_type, prop.price, prop.updated_at
+    )
+
+def on_listing_change(handler: ListingChangeHandler) -> ListingChangeHandler:
+    """Register a handler called after every committed listing write."""
+    _handlers.append(handler)
+    return handler
+
+def listing_changed(before: ListingSnapshot | None, after: ListingSnapshot | None) -> None:
+    """Notify handlers of a committed write; before/after are None for create/delete."""
+    if before == after:
+        return
+    for handler in _handlers:
+        handler(before, after)
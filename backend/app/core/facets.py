@@ -0,0 +1,85 @@
+import asyncio
+import time
+from bisect import bisect_right
+from collections import Counter
+
+from app.core.config import settings
+from app.core.events import ListingSnapshot, on_listing_change
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 100_000, 250_000, 500_000, 750_000, 1_000_000, 2_000_000)
+
+def price_bucket(price: float) -> int:
+    return max(bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+class FacetCounts:
+    """In-process counts of published listings per city, type and price bucket.
+
+    Loaded with grouped aggregate queries on first use, then kept current by
+    listing change events. The TTL bounds drift from writes this process
+    doesn't see (other workers, scripts).
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._cities: Counter = Counter()
+        self._types: Counter = Counter()
+        self._buckets: Counter = Counter()
+        self._loaded_at: float | None = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def _add(self, listing: ListingSnapshot, delta: int) -> None:
+        if listing.status != "published":
+            return
+        for counter, key in (
+            (self._cities, listing.city),
+            (self._types, listing.property_type),
+            (self._buckets, price_bucket(listing.price)),
+        ):
+            counter[key] += delta
+            if counter[key] <= 0:
+                del counter[key]
+
+    def apply(self, before: ListingSnapshot | None, after: ListingSnapshot | None) -> None:
+        self._generation += 1
+        if self._loaded_at is None:
+            return
+        if before is not None:
+            self._add(before, -1)
+        if after is not None:
+            self._add(after, 1)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+
+    async def get(self, load) -> dict:
+        """Current counts; `load` is an async callable returning fresh Counters."""
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    generation = self._generation
+                    self._cities, self._types, self._buckets = await load()
+                    # A write committed mid-load may or may not be in the
+                    # result; keep serving it but reload on the next request
+                    self._loaded_at = time.monotonic() if generation == self._generation else None
+
+        return {
+            "cities": [{"value": city, "count": n} for city, n in self._cities.most_common()],
+            "property_types": [{"value": t, "count": n} for t, n in self._types.most_common()],
+            "price_buckets": [
+                {
+                    "min": PRICE_BUCKETS[i],
+                    "max": PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+                    "count": self._buckets[i],
+                }
+                for i in range(len(PRICE_BUCKETS))
+            ],
+        }
+
+facet_counts = FacetCounts(ttl_seconds=settings.FACETS_CACHE_TTL_SECONDS)
+on_listing_change(facet_counts.apply)
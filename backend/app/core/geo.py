@@ -0,0 +1,56 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle, clamped to valid coordinates."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles; cap to avoid division by ~0
+    dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (
+        max(lat - dlat, -90.0),
+        max(lng - dlng, -180.0),
+        min(lat + dlat, 90.0),
+        min(lng + dlng, 180.0),
+    )
+
+def lng_scale(lat: float) -> float:
+    """Factor turning longitude degrees into latitude-degree lengths at `lat`."""
+    return math.cos(math.radians(lat))
+
+# Web Mercator tiles stop at this latitude
+MAX_MERCATOR_LAT = 85.05112878
+
+def tile_xy(lat: float, lng: float, zoom: int) -> tuple[int, int]:
+    """Web Mercator tile containing a point at `zoom` (2**zoom tiles per axis)."""
+    n = 2 ** zoom
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_pyramid(lat: float, lng: float, min_zoom: int, max_zoom: int) -> list[tuple[int, int, int]]:
+    """(zoom, x, y) of the tiles containing a point at every zoom in the range.
+
+    Projects once at `max_zoom`; a parent tile's index is its child's halved.
+    """
+    x, y = tile_xy(lat, lng, max_zoom)
+    return [(zoom, x >> (max_zoom - zoom), y >> (max_zoom - zoom)) for zoom in range(min_zoom, max_zoom + 1)]
+
+def tile_bounds(x: int, y: int, zoom: int) -> tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) covered by a tile."""
+    n = 2 ** zoom
+
+    def lat_at(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat_at(y + 1), x / n * 360.0 - 180.0, lat_at(y), (x + 1) / n * 360.0 - 180.0
@@ -0,0 +1,182 @@
+"""Serving of uploaded images at /uploads.
+
+Blobs and their derivatives are named by the SHA-256 of their content, so
+their URLs never change meaning: they are cached for a year as immutable
+and browsers never revalidate them. Anything else (uploads from before the
+blob store) is served with `no-cache` and revalidated with its ETag.
+
+Single byte ranges are honoured (206/416). The body is handed to the
+server with the ASGI zero-copy send extension when the server offers it,
+and read in large chunks in a worker thread otherwise.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from mimetypes import guess_type
+from typing import Callable
+
+import anyio
+from fastapi import Request
+from starlette.responses import RedirectResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.http_cache import http_date, is_not_modified, make_etag, not_modified
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+SEND_CHUNK_SIZE = 256 * 1024
+ZERO_COPY_SEND = "http.response.zerocopysend"
+
+# Blob originals and derivatives, relative to the upload directory
+_CONTENT_ADDRESSED = re.compile(r"^blobs/[0-9a-f]{2}/[0-9a-f]{64}(_[a-z]+)?\.[a-z]+$")
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+def is_content_addressed(key: str) -> bool:
+    """Whether `key` (a path below uploads/) names content that can never change."""
+    return _CONTENT_ADDRESSED.match(key) is not None
+
+def cache_control(key: str) -> str:
+    return IMMUTABLE_CACHE_CONTROL if is_content_addressed(key) else REVALIDATE_CACHE_CONTROL
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """First and last byte of a single-range `Range` header, or None to send everything.
+
+    Multiple ranges and malformed headers are ignored (RFC 9110 14.2), which
+    means a full 200 response. Raises RangeNotSatisfiable for ranges outside
+    the file.
+    """
+    if header is None:
+        return None
+    match = _BYTE_RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+class ImageFileResponse:
+    """Send `count` bytes of a file from `offset`, with prepared headers."""
+
+    def __init__(self, path: str, status_code: int, headers: dict[str, str], offset: int, count: int, send_body: bool):
+        self.path = path
+        self.status_code = status_code
+        self.headers = headers
+        self.offset = offset
+        self.count = count
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in self.headers.items()],
+        })
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if ZERO_COPY_SEND in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({"type": ZERO_COPY_SEND, "file": file, "offset": self.offset, "count": self.count})
+            return
+        # One thread hop per chunk: most images fit in a single chunk
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            offset, remaining = self.offset, self.count
+            while remaining:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(SEND_CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    # The file shrank under us; end the body rather than hang the client
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        finally:
+            os.close(fd)
+
+class ImageFiles(StaticFiles):
+    """StaticFiles with long-lived caching of content-addressed files and byte ranges."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200):
+        request = Request(scope)
+        relative = self.get_path(scope).replace(os.sep, "/")
+        size = stat_result.st_size
+        last_modified = datetime.utcfromtimestamp(stat_result.st_mtime)
+        headers = {"Accept-Ranges": "bytes", "Last-Modified": http_date(last_modified)}
+        headers["Cache-Control"] = cache_control(relative)
+        if is_content_addressed(relative):
+            # The name is the content: the ETag survives copies, restores and re-renders
+            headers["ETag"] = make_etag("blob", relative)
+            headers["Expires"] = http_date(datetime.utcnow() + timedelta(seconds=IMMUTABLE_MAX_AGE))
+        else:
+            headers["ETag"] = make_etag("file", relative, stat_result.st_mtime_ns, size)
+        if is_not_modified(request, headers["ETag"], last_modified):
+            return not_modified(headers)
+
+        headers["Content-Type"] = guess_type(str(full_path))[0] or "application/octet-stream"
+        byte_range = None
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range in (headers["ETag"], headers["Last-Modified"]):
+            try:
+                byte_range = parse_range(request.headers.get("range"), size)
+            except RangeNotSatisfiable:
+                headers["Content-Range"] = f"bytes */{size}"
+                headers["Content-Length"] = "0"
+                return ImageFileResponse(str(full_path), 416, headers, 0, 0, send_body=False)
+
+        offset, count = 0, size
+        if byte_range is not None:
+            status_code = 206
+            offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+            headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+        headers["Content-Length"] = str(count)
+        return ImageFileResponse(
+            str(full_path), status_code, headers, offset, count, send_body=scope["method"] != "HEAD",
+        )
+
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        # Uploads still being received are not served
+        if full_path.endswith(".part"):
+            return "", None
+        return full_path, stat_result
+
+class RedirectFiles:
+    """/uploads for remote storage: redirects to each file's public URL.
+
+    Content-addressed files get a permanent, immutable redirect, so browsers
+    go straight to storage the next time. Deployments can also route
+    /uploads to the bucket or CDN in the reverse proxy and skip the API.
+    """
+
+    def __init__(self, public_url: Callable[[str], str]):
+        self.public_url = public_url
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = scope["path"].lstrip("/")
+        if scope["method"] not in ("GET", "HEAD") or not key or ".." in key.split("/"):
+            response = Response(status_code=404)
+        elif is_content_addressed(key):
+            response = RedirectResponse(self.public_url(key), status_code=301, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+        else:
+            response = RedirectResponse(self.public_url(key), status_code=307)
+        await response(scope, receive, send)
@@ -0,0 +1,228 @@
+"""Responsive derivatives of uploaded listing images.
+
+Every stored image is rendered at a few widths, as WebP with a JPEG
+fallback, next to the original:
+
+    uploads/blobs/ab/<digest>.jpg -> uploads/blobs/ab/<digest>_card.webp, ..._card.jpg, ...
+
+Decoding and encoding run in a process pool so the event loop never touches
+pixel data. They work on local files; the image job moves them in and out of
+storage (app.core.storage). Each image is described by an entry kept on its ImageBlob and
+copied into `Property.image_meta` under its path:
+
+    {"width": 1600, "height": 1200,                     # from the header, on upload
+     "placeholder": "data:image/webp;base64,...",        # with the derivatives
+     "widths": {"card": 400, "gallery": 1024, "full": 1600}}
+
+so listings carry dimensions and a blurred placeholder inline, and `srcset`
+strings are built from the widths on the way out.
+"""
+import asyncio
+import base64
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, NamedTuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# Largest width of each derivative; smaller originals are never upscaled
+DERIVATIVE_WIDTHS = {"card": 400, "gallery": 1024, "full": 1920}
+# Output format -> file extension, in <picture> source order
+DERIVATIVE_FORMATS = {"webp": ".webp", "jpeg": ".jpg"}
+# Derivative used for <img src> and for listing card thumbnails
+FALLBACK_SIZE = "gallery"
+CARD_SIZE = "card"
+# Width of the inline placeholder; browsers scale it up behind a blur
+PLACEHOLDER_WIDTH = 16
+
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+class InvalidImageError(ValueError):
+    """Raised when an upload cannot be decoded as an image."""
+
+class ImageTooLargeError(InvalidImageError):
+    """Raised when an image declares more pixels than Pillow will decode."""
+
+def derivative_path(image: str, size: str, image_format: str) -> str:
+    """Path of one derivative of `image`, relative like the original."""
+    stem = image.rsplit(".", 1)[0]
+    return f"{stem}_{size}{DERIVATIVE_FORMATS[image_format]}"
+
+# Accepted upload formats (as detected from the content) -> stored extension
+IMAGE_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+class ProbedImage(NamedTuple):
+    ext: str
+    width: int
+    height: int
+
+def probe(source: str | IO[bytes], name: str) -> ProbedImage:
+    """Extension and display dimensions of an image file or its first bytes, from its header alone.
+
+    Nothing is decoded; the dimensions account for EXIF rotation. Images
+    over Pillow's pixel limit (MAX_IMAGE_PIXELS) raise ImageTooLargeError, so
+    they are refused before anything tries to render them. `name`
+    identifies the image in errors.
+    """
+    try:
+        with Image.open(source) as image:
+            image_format = image.format
+            width, height = image.size
+            if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(name) from e
+    except (OSError, SyntaxError) as e:
+        raise InvalidImageError(name) from e
+    if image_format not in IMAGE_EXTENSIONS:
+        raise InvalidImageError(name)
+    return ProbedImage(IMAGE_EXTENSIONS[image_format], width, height)
+
+def _placeholder(image: Image.Image) -> str:
+    """A few hundred bytes of low-quality WebP, as a data URI."""
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    buffer = io.BytesIO()
+    image.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR).save(buffer, "WEBP", quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def _save(image: Image.Image, path: str, options: dict) -> None:
+    """Save `image` to a temporary file next to `path`, then move it into place.
+
+    Derivatives are served as immutable, so a partly written one must never
+    be visible, even when a retried render replaces it.
+    """
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            image.save(out, **options)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+def render_derivatives(path: str) -> dict:
+    """Write every derivative of the image at `path`; returns its image_meta entry.
+
+    Runs in a worker process.
+    """
+    try:
+        with Image.open(path) as source:
+            image = ImageOps.exif_transpose(source).convert("RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(Path(path).name) from e
+
+    widths = {}
+    for size, max_width in DERIVATIVE_WIDTHS.items():
+        resized = image
+        if image.width > max_width:
+            resized = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        for image_format, options in _SAVE_OPTIONS.items():
+            _save(resized, derivative_path(path, size, image_format), options)
+        widths[size] = resized.width
+    # The smallest derivative is plenty to downscale from
+    return {"width": image.width, "height": image.height, "placeholder": _placeholder(resized), "widths": widths}
+
+_executor: ProcessPoolExecutor | None = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+async def generate_derivatives(paths: list[Path]) -> list[dict | BaseException]:
+    """Render the derivatives of several images in parallel in the process pool.
+
+    Failures are returned in place of the entries, like gather(return_exceptions=True).
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    return await asyncio.gather(
+        *(loop.run_in_executor(executor, render_derivatives, str(path)) for path in paths),
+        return_exceptions=True,
+    )
+
+def derivative_paths(image: str) -> list[str]:
+    """Paths of every derivative of `image`, in a fixed order."""
+    return [
+        derivative_path(image, size, image_format)
+        for size in DERIVATIVE_WIDTHS
+        for image_format in DERIVATIVE_FORMATS
+    ]
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+def _srcset(image: str, widths: dict[str, int], image_format: str) -> str:
+    candidates = []
+    seen = set()
+    for size, width in widths.items():
+        # Small originals yield several derivatives of the same width
+        if width not in seen:
+            seen.add(width)
+            candidates.append(f"{derivative_path(image, size, image_format)} {width}w")
+    return ", ".join(candidates)
+
+def _widths(entry: dict) -> dict[str, int] | None:
+    # Entries written before dimensions were recorded held the widths alone
+    return entry.get("widths") if "width" in entry else entry or None
+
+def image_set(image: str, meta: dict) -> dict:
+    """`src`, WebP and JPEG `srcset` strings, dimensions and placeholder of one image.
+
+    Images without derivatives (still rendering, or uploaded before they
+    existed) fall back to the original with empty srcsets. Dimensions and
+    placeholder are None where unknown.
+    """
+    entry = meta.get(image) or {}
+    widths = _widths(entry)
+    dimensions = {
+        "width": entry.get("width"),
+        "height": entry.get("height"),
+        "placeholder": entry.get("placeholder"),
+    }
+    if not widths:
+        return {"src": image, "webp_srcset": "", "jpeg_srcset": "", **dimensions}
+    return {
+        "src": derivative_path(image, FALLBACK_SIZE, "jpeg"),
+        "webp_srcset": _srcset(image, widths, "webp"),
+        "jpeg_srcset": _srcset(image, widths, "jpeg"),
+        **dimensions,
+    }
+
+def image_sets(images: list[str] | None, meta: dict | None) -> list[dict]:
+    return [image_set(image, meta or {}) for image in images or []]
+
+def card_image(images: list[str] | None, meta: dict | None) -> dict | None:
+    """Card-sized JPEG of the first image (or the original when there is none),
+    with its dimensions and placeholder."""
+    if not images:
+        return None
+    image = images[0]
+    entry = (meta or {}).get(image) or {}
+    widths = _widths(entry)
+    width, height = entry.get("width"), entry.get("height")
+    if widths:
+        card_width = widths[CARD_SIZE]
+        if width and height:
+            height = round(height * card_width / width)
+        width, image = card_width, derivative_path(image, CARD_SIZE, "jpeg")
+    return {"src": image, "width": width, "height": height, "placeholder": entry.get("placeholder")}
+
+def card_thumbnail(images: list[str] | None, meta: dict | None) -> str | None:
+    card = card_image(images, meta)
+    return card["src"] if card else None
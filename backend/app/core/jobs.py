@@ -0,0 +1,162 @@
+"""Durable background jobs.
+
+Jobs are rows of the `jobs` table, so they survive restarts and are shared
+by every process using the database. A JobWorker claims due jobs and runs
+their handlers as asyncio tasks, bounded overall by JOB_WORKERS and per job
+type by the concurrency given to @job_handler. Failed jobs are retried with
+exponential backoff until they run out of attempts.
+
+Handlers may run more than once (a worker can die after the work but before
+recording it), so they must be idempotent.
+"""
+import asyncio
+import logging
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db.database import async_session_maker
+from app.crud import crud_jobs
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AsyncSession, dict], Awaitable[None]]
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+@dataclass(frozen=True, slots=True)
+class JobType:
+    handler: JobHandler
+    concurrency: int
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure that retrying cannot fix."""
+
+_job_types: dict[str, JobType] = {}
+
+def job_handler(job_type: str, concurrency: int = 1):
+    """Register the coroutine run for jobs of `job_type`, at most `concurrency` at a time per worker."""
+    def register(handler: JobHandler) -> JobHandler:
+        _job_types[job_type] = JobType(handler, concurrency)
+        return handler
+    return register
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that has failed `attempts` times."""
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+
+class JobWorker:
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        max_workers: int,
+        poll_seconds: float,
+        lease_seconds: int,
+    ):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._running: dict[asyncio.Task, int] = {}
+        self._running_by_type: dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self, grace_seconds: float = 0) -> None:
+        """Stop claiming jobs, give running ones `grace_seconds` to finish and requeue the rest."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        self._dispatcher = None
+        if self._running and grace_seconds > 0:
+            await asyncio.wait(list(self._running), timeout=grace_seconds)
+        interrupted = dict(self._running)
+        for task in interrupted:
+            task.cancel()
+        await asyncio.gather(*interrupted, return_exceptions=True)
+        async with self.session_factory() as session:
+            for job_id in interrupted.values():
+                await crud_jobs.release_job(session, job_id)
+
+    def notify(self) -> None:
+        """Wake the dispatcher after queueing a job instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def _free_types(self) -> list[str]:
+        if len(self._running) >= self.max_workers:
+            return []
+        return [
+            name for name, job_type in _job_types.items()
+            if self._running_by_type.get(name, 0) < job_type.concurrency
+        ]
+
+    async def _claim(self):
+        free_types = self._free_types()
+        if not free_types:
+            return None
+        async with self.session_factory() as session:
+            return await crud_jobs.claim_job(session, free_types, self.lease_seconds)
+
+    async def _dispatch(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[task] = job.id
+            self._running_by_type[job.type] = self._running_by_type.get(job.type, 0) + 1
+            task.add_done_callback(lambda task, job_type=job.type: self._finished(task, job_type))
+
+    def _finished(self, task: asyncio.Task, job_type: str) -> None:
+        self._running.pop(task, None)
+        self._running_by_type[job_type] -= 1
+        self._wakeup.set()
+
+    async def _run(self, job) -> None:
+        try:
+            async with self.session_factory() as session:
+                await _job_types[job.type].handler(session, job.payload)
+        except Exception as e:
+            retry_in = None
+            if not isinstance(e, PermanentJobError) and job.attempts < job.max_attempts:
+                retry_in = retry_delay(job.attempts)
+            logger.warning("Job %s (%s) failed on attempt %s: %s", job.id, job.type, job.attempts, e)
+            async with self.session_factory() as session:
+                await crud_jobs.fail_job(session, job.id, f"{type(e).__name__}: {e}", retry_in)
+            return
+        async with self.session_factory() as session:
+            await crud_jobs.complete_job(session, job.id)
+
+    async def run_pending(self) -> int:
+        """Run due jobs one at a time until none are left; returns how many ran.
+
+        For scripts and tests that process the queue without starting the worker.
+        """
+        ran = 0
+        while (job := await self._claim()) is not None:
+            await self._run(job)
+            ran += 1
+        return ran
+
+job_worker = JobWorker(
+    async_session_maker,
+    max_workers=settings.JOB_WORKERS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+)
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Encode the sort key of the last row of a page into an opaque token."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, datetime_value: bool = False) -> tuple[Any, int]:
+    """Decode a token produced by encode_cursor for the given sort mode."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["s"] != sort:
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        value = payload["v"]
+        if datetime_value:
+            value = datetime.fromisoformat(value)
+        return value, int(payload["id"])
+    except InvalidCursorError:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
@@ -0,0 +1,148 @@
+import codecs
+import csv
+import io
+from typing import AsyncIterator
+
+import orjson
+
+from app.crud.crud_property_rows import PropertyRow
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = [name for name in PropertyRow.__slots__ if name != "agent"] + ["agent_name", "agent_email", "agent_phone"]
+# Image paths never contain spaces or "|"
+CSV_IMAGE_SEPARATOR = "|"
+
+def encode_ndjson(rows: list[PropertyRow]) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return CSV_IMAGE_SEPARATOR.join(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+def encode_csv(rows: list[PropertyRow], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        values = [_csv_value(getattr(row, name)) for name in CSV_COLUMNS[:-3]]
+        agent = row.agent
+        values += [agent.name, agent.email, agent.phone or ""] if agent else ["", "", ""]
+        writer.writerow(values)
+    return buffer.getvalue().encode("utf-8")
+
+class ImportLimitError(ValueError):
+    """Raised when an import exceeds one of its size limits."""
+
+class ImportTooLargeError(ImportLimitError):
+    """Raised when an import body is larger than allowed."""
+
+# Longest line (NDJSON) or record (CSV, across its lines) an import accepts, in characters
+MAX_RECORD_LENGTH = 64 * 1024
+
+async def limit_size(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass a byte stream through, failing once more than `max_bytes` have been read."""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise ImportTooLargeError(f"Import larger than {max_bytes} bytes")
+        yield chunk
+
+def _check_length(length: int) -> None:
+    if length > MAX_RECORD_LENGTH:
+        raise ImportLimitError(f"Row longer than {MAX_RECORD_LENGTH} characters")
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering more than one line.
+
+    Only new chunks are searched for line breaks, so a long line costs
+    linear time; one longer than MAX_RECORD_LENGTH raises ImportLimitError.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending: list[str] = []
+    pending_length = 0
+    async for chunk in chunks:
+        *lines, rest = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending, pending_length = [], 0
+            for line in lines:
+                _check_length(len(line))
+                yield line.rstrip("\r")
+        if rest:
+            pending.append(rest)
+            pending_length += len(rest)
+            _check_length(pending_length)
+    rest = "".join(pending) + decoder.decode(b"", final=True)
+    if rest:
+        _check_length(len(rest))
+        yield rest.rstrip("\r")
+
+async def read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """Yield (row number, object, error) for each non-blank line."""
+    row = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield row, None, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, data, None
+
+async def read_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """Yield (row number, record, error) for each CSV record after the header.
+
+    Empty cells are omitted so optional fields fall back to their defaults.
+    A record whose lines add up to more than MAX_RECORD_LENGTH characters
+    (e.g. after an unterminated quote) raises ImportLimitError.
+    """
+    header = None
+    row = 0
+    record: list[str] = []
+    record_length = 0
+    quotes = 0
+    async for line in _lines(chunks):
+        record.append(line)
+        record_length += len(line) + 1
+        _check_length(record_length - 1)
+        quotes += line.count('"')
+        # An odd number of quotes means a quoted field continues on the next line
+        if quotes % 2:
+            continue
+        text = "\n".join(record)
+        record, record_length, quotes = [], 0, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record:
+        row += 1
+        yield row, None, "Unterminated quoted field"
+
+IMPORT_READERS = {
+    "ndjson": read_ndjson,
+    "csv": read_csv,
+}
@@ -1,53 +1,246 @@
-from datetime import datetime, timedelta
-from typing import Dict
-from collections import defaultdict
-import asyncio
+"""Rate limiting with sliding-window counters.
+
+Each key keeps two numbers: its hits in the current fixed window and in
+the one before. The number of hits in the last `window_seconds` is
+estimated as the current count plus the previous one weighted by how much
+of the previous window still overlaps — O(1) time and memory per key,
+however many hits it takes.
+
+Counters live in a RateLimitStore chosen by RATE_LIMIT_BACKEND: in the
+database, where every worker process shares them, or in process memory
+(bounded, least recently used keys evicted), where each worker counts on
+its own.
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, NamedTuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db.database import async_session_maker
+from app.models.rate_limit import RateLimitCounter
+
+class WindowCounts(NamedTuple):
+    previous: int
+    current: int
+
+def _window_start(now: float, window_seconds: int) -> int:
+    return int(now // window_seconds) * window_seconds
+
+class RateLimitStore(ABC):
+    """Where hit counters are kept, per key and fixed window."""
+
+    @abstractmethod
+    async def hit(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        """Count a hit on `key`; returns the counts including it."""
+
+    @abstractmethod
+    async def counts(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        """Counts of the window containing `now` and the one before."""
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Forget every count of `key`."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Forget every count."""
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Counters in this process, at most `max_keys` of them.
+
+    Only the event loop touches the counters and no method awaits, so no
+    locking is needed. When the store is full its least recently used key is
+    dropped; idle keys are the ones that no longer limit anything.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> [window_start, current count, previous count], least recently used first
+        self._entries: OrderedDict[str, list[int]] = OrderedDict()
+
+    @staticmethod
+    def _roll(entry: list[int], window_start: int, window_seconds: int) -> None:
+        if entry[0] == window_start:
+            return
+        # One window on: the current count becomes the previous one; further on, both are stale
+        entry[2] = entry[1] if entry[0] == window_start - window_seconds else 0
+        entry[0], entry[1] = window_start, 0
+
+    async def hit(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        window_start = _window_start(now, window_seconds)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [window_start, 0, 0]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+            self._roll(entry, window_start, window_seconds)
+        entry[1] += 1
+        return WindowCounts(entry[2], entry[1])
+
+    async def counts(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        entry = self._entries.get(key)
+        if entry is None:
+            return WindowCounts(0, 0)
+        self._roll(entry, _window_start(now, window_seconds), window_seconds)
+        return WindowCounts(entry[2], entry[1])
+
+    async def reset(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """Counters in the rate_limit_counters table, shared by every process on the database.
+
+    A hit is one upsert and one read of the key's two windows. Expired rows
+    are deleted every CLEANUP_EVERY hits.
+    """
+
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = async_session_maker):
+        self.session_factory = session_factory
+        self._hits = 0
+
+    @staticmethod
+    async def _counts(session: AsyncSession, key: str, window_start: int, window_seconds: int) -> WindowCounts:
+        rows = dict((await session.execute(
+            select(RateLimitCounter.window_start, RateLimitCounter.count).where(
+                RateLimitCounter.key == key,
+                RateLimitCounter.window_start.in_([window_start - window_seconds, window_start]),
+            )
+        )).all())
+        return WindowCounts(rows.get(window_start - window_seconds, 0), rows.get(window_start, 0))
+
+    async def hit(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        window_start = _window_start(now, window_seconds)
+        async with self.session_factory() as session:
+            insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(RateLimitCounter).values(
+                key=key, window_start=window_start, count=1, expires_at=window_start + 2 * window_seconds,
+            )
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[RateLimitCounter.key, RateLimitCounter.window_start],
+                set_={"count": RateLimitCounter.count + 1},
+            ))
+            counts = await self._counts(session, key, window_start, window_seconds)
+            self._hits += 1
+            if self._hits % self.CLEANUP_EVERY == 0:
+                await session.execute(delete(RateLimitCounter).where(RateLimitCounter.expires_at <= int(now)))
+            await session.commit()
+        return counts
+
+    async def counts(self, key: str, window_seconds: int, now: float) -> WindowCounts:
+        async with self.session_factory() as session:
+            return await self._counts(session, key, _window_start(now, window_seconds), window_seconds)
+
+    async def reset(self, key: str) -> None:
+        async with self.session_factory() as session:
+            await session.execute(delete(RateLimitCounter).where(RateLimitCounter.key == key))
+            await session.commit()
+
+    async def clear(self) -> None:
+        async with self.session_factory() as session:
+            await session.execute(delete(RateLimitCounter))
+            await session.commit()
+
+def create_rate_limit_store() -> RateLimitStore:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    return DatabaseRateLimitStore()
+
+_rate_limit_store: RateLimitStore | None = None
+
+def get_rate_limit_store() -> RateLimitStore:
+    """The configured store, created on first use."""
+    global _rate_limit_store
+    if _rate_limit_store is None:
+        _rate_limit_store = create_rate_limit_store()
+    return _rate_limit_store
 
 class RateLimiter:
-    """In-memory rate limiter for tracking failed login attempts."""
-    
-    def __init__(self, max_attempts: int = 5, window_minutes: int = 15):
+    """At most `max_attempts` hits per key in any `window_seconds`.
+
+    `name` prefixes the keys, so limiters can share a store.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        window_seconds: int,
+        store: RateLimitStore | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
         self.max_attempts = max_attempts
-        self.window_minutes = window_minutes
-        self._attempts: Dict[str, list] = defaultdict(list)
-        self._lock = asyncio.Lock()
-    
-    async def is_rate_limited(self, email: str) -> bool:
-        """Check if an email is currently rate limited."""
-        async with self._lock:
-            now = datetime.utcnow()
-            cutoff_time = now - timedelta(minutes=self.window_minutes)
-            
-            if email in self._attempts:
-                self._attempts[email] = [
-                    ts for ts in self._attempts[email] if ts > cutoff_time
-                ]
-            
-            return len(self._attempts[email]) >= self.max_attempts
-    
-    async def record_failed_attempt(self, email: str) -> None:
-        """Record a failed login attempt for an email."""
-        async with self._lock:
-            now = datetime.utcnow()
-            self._attempts[email].append(now)
-    
-    async def reset_attempts(self, email: str) -> None:
-        """Reset failed attempts for an email."""
-        async with self._lock:
-            if email in self._attempts:
-                del self._attempts[email]
-    
-    async def get_attempt_count(self, email: str) -> int:
-        """Get current attempt count for an email."""
-        async with self._lock:
-            now = datetime.utcnow()
-            cutoff_time = now - timedelta(minutes=self.window_minutes)
-            
-            if email in self._attempts:
-                self._attempts[email] = [
-                    ts for ts in self._attempts[email] if ts > cutoff_time
-                ]
-                return len(self._attempts[email])
-            return 0
-
-login_rate_limiter = RateLimiter(max_attempts=5, window_minutes=1)
+        self.window_seconds = window_seconds
+        self._store = store
+        self.clock = clock
+
+    @property
+    def store(self) -> RateLimitStore:
+        return self._store if self._store is not None else get_rate_limit_store()
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _estimate(self, counts: WindowCounts, now: float) -> float:
+        elapsed = now - _window_start(now, self.window_seconds)
+        return counts.previous * (1 - elapsed / self.window_seconds) + counts.current
+
+    async def hit(self, key: str) -> bool:
+        """Count a hit; returns whether it is within the limit.
+
+        Hits over the limit count too, so a client that keeps trying stays limited.
+        """
+        now = self.clock()
+        counts = await self.store.hit(self._key(key), self.window_seconds, now)
+        return self._estimate(counts, now) <= self.max_attempts
+
+    def retry_after(self) -> int:
+        """Seconds until the next window, when a limited key is likely allowed again."""
+        now = self.clock()
+        return math.ceil(_window_start(now, self.window_seconds) + self.window_seconds - now)
+
+    async def is_rate_limited(self, key: str) -> bool:
+        """Whether `key` has used up its hits."""
+        return await self.get_attempt_count(key) >= self.max_attempts
+
+    async def record_failed_attempt(self, key: str) -> None:
+        await self.store.hit(self._key(key), self.window_seconds, self.clock())
+
+    async def reset_attempts(self, key: str) -> None:
+        await self.store.reset(self._key(key))
+
+    async def get_attempt_count(self, key: str) -> int:
+        """Estimated hits on `key` in the last `window_seconds`."""
+        now = self.clock()
+        counts = await self.store.counts(self._key(key), self.window_seconds, now)
+        return math.floor(self._estimate(counts, now))
+
+# Failed logins per email
+login_rate_limiter = RateLimiter(
+    "login",
+    max_attempts=settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+)
+# Public listing searches per client address
+published_rate_limiter = RateLimiter(
+    "published",
+    max_attempts=settings.PUBLIC_RATE_LIMIT_REQUESTS,
+    window_seconds=settings.PUBLIC_RATE_LIMIT_WINDOW_SECONDS,
+)
@@ -1,16 +1,36 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any, Union
+from typing import Callable, NamedTuple, Optional, Any, TypeVar, Union
 
 import bcrypt
 import jwt
 from pydantic import SecretStr
 
 from app.core.config import settings
+from app.models.user import UserRole
+
+class Principal(NamedTuple):
+    """Who a request is authenticated as; all that authorization checks need."""
+    id: int
+    role: UserRole
+    name: str
 
 SECRET_KEY: SecretStr = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Never tune below this, however slow the hardware
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+
+def bcrypt_rounds() -> int:
+    """Cost factor for new password hashes."""
+    return settings.BCRYPT_ROUNDS
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode('utf-8'),
@@ -18,9 +38,140 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=bcrypt_rounds())
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
+def hash_rounds(hashed_password: str) -> int:
+    """Cost factor a bcrypt hash was made with ("$2b$12$..." -> 12)."""
+    return int(hashed_password.split("$")[2])
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a verified hash was made at another cost than the configured one.
+
+    Both ways: a hash made before the cost was lowered for slower hardware
+    would otherwise keep its login over the latency budget.
+    """
+    return hash_rounds(hashed_password) != bcrypt_rounds()
+
+def time_bcrypt(rounds: int) -> float:
+    """Seconds to hash a password at `rounds` on this machine (best of three)."""
+    salt = bcrypt.gensalt(rounds=rounds)
+    timings = []
+    for _ in range(3):
+        t0 = time.perf_counter()
+        bcrypt.hashpw(b"calibration password", salt)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+def tune_bcrypt_rounds(target_ms: float) -> int:
+    """Highest cost whose hash takes at most `target_ms` here, but not below MIN_BCRYPT_ROUNDS.
+
+    Each extra round doubles the work, so the cost is extrapolated from one
+    measurement at MIN_BCRYPT_ROUNDS and then checked, stepping down while
+    the real timing is over budget.
+    """
+    base = time_bcrypt(MIN_BCRYPT_ROUNDS) * 1000
+    rounds = MIN_BCRYPT_ROUNDS
+    while rounds < MAX_BCRYPT_ROUNDS and base * 2 ** (rounds + 1 - MIN_BCRYPT_ROUNDS) <= target_ms:
+        rounds += 1
+    while rounds > MIN_BCRYPT_ROUNDS and time_bcrypt(rounds) * 1000 > target_ms:
+        rounds -= 1
+    return rounds
+
+T = TypeVar("T")
+
+# Latency percentiles are computed over this many recent calls
+LATENCY_SAMPLES = 1024
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised instead of queueing when the password hashing pool is saturated."""
+
+def _percentiles(samples: deque) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    def at(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": ordered[-1] * 1000}
+
+class PasswordHasher:
+    """bcrypt off the event loop, in a small thread pool.
+
+    bcrypt releases the GIL while it works, so the threads hash in parallel
+    and the loop keeps serving other requests. At most `max_pending` calls
+    are admitted at a time (running or queued); beyond that calls fail at
+    once with PasswordHasherBusy, so a burst of logins is answered with
+    quick 503s instead of queueing for seconds.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._queue_times: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _release(self, future: Future) -> None:
+        # A call stays admitted until its thread is done with it, even if the caller went away
+        with self._lock:
+            self.pending -= 1
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Password hashing is saturated")
+            self.pending += 1
+        submitted = time.perf_counter()
+
+        def timed() -> tuple[float, T]:
+            started = time.perf_counter()
+            return started, func(*args)
+
+        future = self._get_executor().submit(timed)
+        future.add_done_callback(self._release)
+        started, result = await asyncio.wrap_future(future)
+        self._queue_times.append(started - submitted)
+        self._run_times.append(time.perf_counter() - started)
+        self.completed += 1
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue": _percentiles(self._queue_times),
+            "hash": _percentiles(self._run_times),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
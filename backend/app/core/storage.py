@@ -0,0 +1,402 @@
+"""Where uploaded files are kept.
+
+Files are addressed by key: their path below `uploads/` in stored image
+URLs, e.g. "blobs/ab/<digest>.jpg". Two backends are available, picked by
+STORAGE_BACKEND:
+
+- LocalStorage keeps files in a directory, served by the API at /uploads.
+- S3Storage keeps them in an S3-compatible bucket (AWS S3, MinIO, R2, ...),
+  so API nodes share no disk. It talks to the S3 REST API over httpx with
+  its own Signature Version 4 signing, so no SDK is needed.
+
+Both issue presigned upload URLs, so clients can send image bytes straight
+to storage and the API only records the result.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple
+from urllib.parse import quote, urlencode, urlsplit
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.image_files import cache_control
+
+# Served at /uploads by the local backend
+UPLOAD_DIR = Path("uploads")
+# Where the local backend accepts presigned uploads
+LOCAL_UPLOAD_ENDPOINT = "/api/v1/storage"
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+
+class PresignedUpload(NamedTuple):
+    url: str  # absolute, or relative to the API for the local backend
+    method: str
+    # Must be sent exactly as given; they are part of the signature
+    headers: dict[str, str]
+
+class StorageError(RuntimeError):
+    """Raised when the storage backend fails a request."""
+
+def _check_key(key: str) -> str:
+    if not key or key.startswith("/") or ".." in key.split("/"):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+async def _file_chunks(path: Path) -> AsyncIterator[bytes]:
+    with await run_in_threadpool(open, path, "rb") as file:
+        while chunk := await run_in_threadpool(file.read, TRANSFER_CHUNK_SIZE):
+            yield chunk
+
+class Storage(ABC):
+    """Interface shared by the storage backends."""
+
+    # Local directory for files being received, rendered or downloaded
+    staging_dir: Path
+
+    @abstractmethod
+    async def size(self, key: str) -> int | None:
+        """Size of the file at `key`, or None when there is none."""
+
+    @abstractmethod
+    async def read(self, key: str, length: int | None = None) -> bytes:
+        """The first `length` bytes of the file (all of it when None)."""
+
+    @abstractmethod
+    def local_copy(self, key: str):
+        """Async context manager yielding a local path with the file's content.
+
+        Files written next to it can be stored with put_file while it is open.
+        """
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Path, content_type: str | None = None) -> None:
+        """Store the local file `path` at `key`, replacing any file there; `path` is consumed."""
+
+    @abstractmethod
+    async def delete(self, keys: list[str]) -> None:
+        """Delete files; missing ones are ignored."""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        """Delete every file whose key starts with `prefix`."""
+
+    @abstractmethod
+    def presign_upload(self, key: str, size: int, sha256: str, content_type: str) -> PresignedUpload:
+        """A URL that accepts exactly this content at `key` until STORAGE_PRESIGN_EXPIRES_SECONDS.
+
+        `sha256` is the hex digest of the content; storage rejects anything else.
+        """
+
+    async def close(self) -> None:
+        pass
+
+class LocalStorage(Storage):
+    def __init__(self, root: Path, upload_endpoint: str = LOCAL_UPLOAD_ENDPOINT):
+        self.root = root
+        self.upload_endpoint = upload_endpoint
+
+    @property
+    def staging_dir(self) -> Path:
+        # Inside the root, so stored files are moved into place atomically
+        return self.root / "tmp"
+
+    def path(self, key: str) -> Path:
+        return self.root / _check_key(key)
+
+    async def size(self, key: str) -> int | None:
+        try:
+            return (await run_in_threadpool(os.stat, self.path(key))).st_size
+        except FileNotFoundError:
+            return None
+
+    async def read(self, key: str, length: int | None = None) -> bytes:
+        def read() -> bytes:
+            with open(self.path(key), "rb") as file:
+                return file.read(-1 if length is None else length)
+        return await run_in_threadpool(read)
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        path = self.path(key)
+        if not await run_in_threadpool(path.exists):
+            raise FileNotFoundError(key)
+        yield path
+
+    async def put_file(self, key: str, path: Path, content_type: str | None = None) -> None:
+        target = self.path(key)
+        if path == target:
+            return
+
+        def move() -> None:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        await run_in_threadpool(move)
+
+    async def delete(self, keys: list[str]) -> None:
+        for key in keys:
+            await run_in_threadpool(self.path(key).unlink, missing_ok=True)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        path = self.path(prefix.rstrip("/"))
+        await run_in_threadpool(shutil.rmtree, path, ignore_errors=True)
+
+    def upload_signature(self, key: str, size: int, sha256: str, content_type: str, expires: int) -> str:
+        message = f"{key}\n{size}\n{sha256}\n{content_type}\n{expires}".encode()
+        return hmac.new(settings.SECRET_KEY.get_secret_value().encode(), message, hashlib.sha256).hexdigest()
+
+    def presign_upload(self, key: str, size: int, sha256: str, content_type: str) -> PresignedUpload:
+        expires = int(time.time()) + settings.STORAGE_PRESIGN_EXPIRES_SECONDS
+        query = urlencode({
+            "size": size, "sha256": sha256, "expires": expires,
+            "signature": self.upload_signature(_check_key(key), size, sha256, content_type, expires),
+        })
+        return PresignedUpload(f"{self.upload_endpoint}/{quote(key)}?{query}", "PUT", {"Content-Type": content_type})
+
+    def verify_upload(self, key: str, size: int, sha256: str, content_type: str, expires: int, signature: str) -> bool:
+        expected = self.upload_signature(key, size, sha256, content_type, expires)
+        return expires >= time.time() and hmac.compare_digest(expected, signature)
+
+# Signature Version 4, as used by S3 and its clones
+SIGV4_ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_PAYLOAD_HASH = hashlib.sha256(b"").hexdigest()
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+def sigv4_signature(
+    secret_access_key: str,
+    region: str,
+    amz_date: str,
+    method: str,
+    path: str,
+    query: dict[str, str],
+    headers: dict[str, str],
+    payload_hash: str,
+) -> str:
+    """Signature over a request, given its already-encoded `path` and the headers to sign."""
+    canonical_query = "&".join(
+        f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in sorted(query.items())
+    )
+    signed = sorted(name.lower() for name in headers)
+    values = {name.lower(): " ".join(str(value).split()) for name, value in headers.items()}
+    canonical_request = "\n".join([
+        method,
+        path,
+        canonical_query,
+        "".join(f"{name}:{values[name]}\n" for name in signed),
+        ";".join(signed),
+        payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        SIGV4_ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = _hmac(f"AWS4{secret_access_key}".encode(), amz_date[:8])
+    for part in (region, "s3", "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+class S3Storage(Storage):
+    """Files in an S3-compatible bucket, addressed path-style (endpoint/bucket/key)."""
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        public_url: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        # Where browsers fetch stored files (bucket website or CDN); /uploads redirects there
+        self.public_url = (public_url or f"{self.endpoint_url}/{bucket}").rstrip("/")
+        self.transport = transport
+        self.staging_dir = Path(tempfile.gettempdir()) / "realestate-uploads"
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(transport=self.transport, timeout=httpx.Timeout(30.0, read=120.0))
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _path(self, key: str = "") -> str:
+        return f"/{self.bucket}/{quote(_check_key(key), safe='/~')}" if key else f"/{self.bucket}"
+
+    def _credential(self, amz_date: str) -> str:
+        return f"{self.access_key_id}/{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+    async def _request(
+        self,
+        method: str,
+        key: str = "",
+        query: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content=None,
+        payload_hash: str = EMPTY_PAYLOAD_HASH,
+        stream: bool = False,
+    ) -> httpx.Response:
+        amz_date = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        path = self._path(key)
+        headers = {
+            **(headers or {}),
+            "Host": urlsplit(self.endpoint_url).netloc,
+            "x-amz-date": amz_date,
+            "x-amz-content-sha256": payload_hash,
+        }
+        signature = sigv4_signature(
+            self.secret_access_key, self.region, amz_date, method, path, query or {}, headers, payload_hash,
+        )
+        headers["Authorization"] = (
+            f"{SIGV4_ALGORITHM} Credential={self._credential(amz_date)}, "
+            f"SignedHeaders={';'.join(sorted(name.lower() for name in headers))}, Signature={signature}"
+        )
+        request = self.client.build_request(
+            method, f"{self.endpoint_url}{path}", params=query, headers=headers, content=content,
+        )
+        try:
+            return await self.client.send(request, stream=stream)
+        except httpx.HTTPError as e:
+            raise StorageError(f"{method} {key}: {e}") from e
+
+    @staticmethod
+    def _check(response: httpx.Response, key: str, *ok: int) -> httpx.Response:
+        if response.status_code not in (ok or (200,)):
+            raise StorageError(f"{response.request.method} {key}: HTTP {response.status_code}")
+        return response
+
+    async def size(self, key: str) -> int | None:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        return int(self._check(response, key).headers["content-length"])
+
+    async def read(self, key: str, length: int | None = None) -> bytes:
+        headers = {"Range": f"bytes=0-{length - 1}"} if length else None
+        response = await self._request("GET", key, headers=headers)
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        return self._check(response, key, 200, 206).content
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        # Keep the file name, so derivatives rendered next to it get theirs
+        directory = self.staging_dir / uuid.uuid4().hex
+        path = directory / key.rsplit("/", 1)[-1]
+        await run_in_threadpool(directory.mkdir, parents=True)
+        try:
+            response = await self._request("GET", key, stream=True)
+            try:
+                if response.status_code == 404:
+                    raise FileNotFoundError(key)
+                self._check(response, key)
+                with await run_in_threadpool(open, path, "wb") as out:
+                    async for chunk in response.aiter_bytes(TRANSFER_CHUNK_SIZE):
+                        await run_in_threadpool(out.write, chunk)
+            finally:
+                await response.aclose()
+            yield path
+        finally:
+            await run_in_threadpool(shutil.rmtree, directory, ignore_errors=True)
+
+    async def put_file(self, key: str, path: Path, content_type: str | None = None) -> None:
+        headers = {
+            "Content-Length": str((await run_in_threadpool(os.stat, path)).st_size),
+            "Cache-Control": cache_control(key),
+        }
+        if content_type:
+            headers["Content-Type"] = content_type
+        response = await self._request("PUT", key, headers=headers, content=_file_chunks(path), payload_hash=UNSIGNED_PAYLOAD)
+        self._check(response, key)
+        await run_in_threadpool(path.unlink, missing_ok=True)
+
+    async def delete(self, keys: list[str]) -> None:
+        async def delete(key: str) -> None:
+            self._check(await self._request("DELETE", key), key, 200, 204, 404)
+        await asyncio.gather(*(delete(key) for key in keys))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        query = {"list-type": "2", "prefix": _check_key(prefix)}
+        while True:
+            response = self._check(await self._request("GET", query=query), prefix)
+            root = ElementTree.fromstring(response.content)
+            namespace = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+            await self.delete([element.text for element in root.iter(f"{namespace}Key")])
+            token = root.findtext(f"{namespace}NextContinuationToken")
+            if not token:
+                return
+            query = {**query, "continuation-token": token}
+
+    def presign_upload(self, key: str, size: int, sha256: str, content_type: str) -> PresignedUpload:
+        amz_date = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        path = self._path(key)
+        # S3 checks the body against the signed checksum and rejects any mismatch
+        headers = {
+            "Content-Length": str(size),
+            "Content-Type": content_type,
+            "Cache-Control": cache_control(key),
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        query = {
+            "X-Amz-Algorithm": SIGV4_ALGORITHM,
+            "X-Amz-Credential": self._credential(amz_date),
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(settings.STORAGE_PRESIGN_EXPIRES_SECONDS),
+            "X-Amz-SignedHeaders": ";".join(sorted(["host", *(name.lower() for name in headers)])),
+        }
+        signed_headers = {**headers, "Host": urlsplit(self.endpoint_url).netloc}
+        query["X-Amz-Signature"] = sigv4_signature(
+            self.secret_access_key, self.region, amz_date, "PUT", path, query, signed_headers, UNSIGNED_PAYLOAD,
+        )
+        url = f"{self.endpoint_url}{path}?{urlencode(query, quote_via=quote)}"
+        # Content-Length is set by the client itself
+        return PresignedUpload(url, "PUT", {name: value for name, value in headers.items() if name != "Content-Length"})
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{quote(_check_key(key), safe='/~')}"
+
+def create_storage() -> Storage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY.get_secret_value(),
+            public_url=settings.S3_PUBLIC_URL,
+        )
+    return LocalStorage(UPLOAD_DIR)
+
+_storage: Storage | None = None
+
+def get_storage() -> Storage:
+    """The configured backend, created on first use."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -0,0 +1,179 @@
+import hashlib
+import re
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.storage import get_storage
+
+CHUNK_SIZE = 1024 * 1024
+
+# Originals are stored once per content, named by their SHA-256:
+# uploads/blobs/<first two hex digits>/<digest><ext>
+BLOB_URL_PREFIX = "uploads/blobs"
+_BLOB_URL = re.compile(r"^uploads/blobs/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.[a-z]+$")
+CONTENT_TYPES = {".jpg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded file passes the size limit."""
+
+class ReceivedUpload(NamedTuple):
+    path: Path  # temporary file, until stored with store_blob
+    digest: str
+    size: int
+
+class StoredBlob(NamedTuple):
+    digest: str
+    ext: str
+    size: int
+    # Display dimensions read from the header on upload, when known
+    width: int | None = None
+    height: int | None = None
+
+    @property
+    def url(self) -> str:
+        return blob_url(self.digest, self.ext)
+
+    @property
+    def key(self) -> str:
+        return storage_key(self.url)
+
+def blob_url(digest: str, ext: str) -> str:
+    return f"{BLOB_URL_PREFIX}/{digest[:2]}/{digest}{ext}"
+
+def blob_digest(url: str) -> str | None:
+    """Digest of a stored blob URL; None for other paths (e.g. pre-blob uploads)."""
+    match = _BLOB_URL.match(url)
+    return match["digest"] if match else None
+
+def storage_key(url: str) -> str:
+    """Storage key of a stored `uploads/...` path."""
+    return url.removeprefix("uploads/")
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+async def receive_stream(
+    chunks: AsyncIterator[bytes],
+    directory: Path,
+    max_size: int,
+    name: str | None = None,
+) -> ReceivedUpload:
+    """Copy a stream of bytes into a temporary file in `directory`, hashing it on the way.
+
+    Writes and hashing run in the thread pool, so the event loop is never
+    blocked. The copy stops as soon as more than `max_size` bytes have been
+    read and the partial file is removed.
+    """
+    await run_in_threadpool(directory.mkdir, parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4()}.part"
+    digest = hashlib.sha256()
+    written = 0
+    out = await run_in_threadpool(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > max_size:
+                raise UploadTooLargeError(name)
+            await run_in_threadpool(_write_chunk, out, digest, chunk)
+    except BaseException:
+        await run_in_threadpool(out.close)
+        path.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(out.close)
+    return ReceivedUpload(path, digest.hexdigest(), written)
+
+async def receive_upload(
+    file: UploadFile,
+    directory: Path,
+    max_size: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> ReceivedUpload:
+    """receive_stream for a multipart upload; rejects files that declare too large a size up front."""
+    if file.size is not None and file.size > max_size:
+        raise UploadTooLargeError(file.filename)
+
+    async def chunks():
+        while chunk := await file.read(chunk_size):
+            yield chunk
+    return await receive_stream(chunks(), directory, max_size, file.filename)
+
+async def store_blob(path: Path, blob: StoredBlob) -> bool:
+    """Move a received file into storage under its blob key; returns whether it was new.
+
+    When the content is already stored, the new copy is left at `path`.
+    """
+    storage = get_storage()
+    if await storage.size(blob.key) is not None:
+        return False
+    await storage.put_file(blob.key, path, CONTENT_TYPES[blob.ext])
+    return True
+
+async def write_blob(data: bytes, ext: str) -> StoredBlob:
+    """Store in-memory content (seeding, scripts)."""
+    storage = get_storage()
+    await run_in_threadpool(storage.staging_dir.mkdir, parents=True, exist_ok=True)
+    path = storage.staging_dir / f"{uuid.uuid4()}.part"
+    await run_in_threadpool(path.write_bytes, data)
+    blob = StoredBlob(hashlib.sha256(data).hexdigest(), ext, len(data))
+    if not await store_blob(path, blob):
+        await run_in_threadpool(path.unlink)
+    return blob
+
+class UploadSizeLimitMiddleware:
+    """Reject multipart request bodies larger than `max_body_size` up front.
+
+    Multipart forms are spooled in full before the endpoint runs, so the
+    limit is enforced here: on Content-Length before anything is read, and on
+    the bytes actually received for chunked bodies.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    def _is_multipart(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                return value.lower().startswith(b"multipart/form-data")
+        return False
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        body = b'{"detail":"Request body too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,222 @@
+from sqlalchemy import bindparam, case, column, delete, func, or_, select, table, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import geo
+from app.models.geo_cell import CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, CLUSTER_ZOOM_OFFSET, PropertyGeoCell
+from app.models.property import SQLITE_RTREE_TABLE, Property, PropertyStatus
+
+cells = PropertyGeoCell.__table__
+# Bulk removals larger than this recompute all cells instead
+REBUILD_THRESHOLD = 200
+
+def listing_point(prop: Property | None) -> tuple[float, float, float] | None:
+    """The (lat, lng, price) a listing contributes to map clusters, if any."""
+    if prop is None or prop.status != PropertyStatus.PUBLISHED:
+        return None
+    if prop.latitude is None or prop.longitude is None:
+        return None
+    return (prop.latitude, prop.longitude, prop.price)
+
+def published_in_bbox(dialect: str, bbox: tuple[float, float, float, float]) -> list:
+    """WHERE clauses for published listings inside a bounding box.
+
+    On SQLite the R*Tree hits drive the query; elsewhere the
+    (status, latitude, longitude) index narrows it to a latitude band.
+    """
+    min_lat, min_lng, max_lat, max_lng = bbox
+    clauses = []
+    if dialect == "sqlite":
+        rtree = table(
+            SQLITE_RTREE_TABLE, column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng")
+        )
+        clauses.append(Property.id.in_(
+            select(rtree.c.id).where(
+                rtree.c.max_lat >= min_lat,
+                rtree.c.min_lat <= max_lat,
+                rtree.c.max_lng >= min_lng,
+                rtree.c.min_lng <= max_lng,
+            )
+        ))
+    clauses += [
+        Property.status == PropertyStatus.PUBLISHED,
+        Property.latitude.between(min_lat, max_lat),
+        Property.longitude.between(min_lng, max_lng),
+    ]
+    return clauses
+
+def _cell_keys(lat: float, lng: float) -> list[dict]:
+    return [
+        {"b_zoom": zoom, "b_x": x, "b_y": y}
+        for zoom, x, y in geo.tile_pyramid(lat, lng, CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM)
+    ]
+
+_cell_match = (
+    cells.c.zoom == bindparam("b_zoom"),
+    cells.c.cell_x == bindparam("b_x"),
+    cells.c.cell_y == bindparam("b_y"),
+)
+
+def _aggregate(points, aggregates: dict | None = None) -> dict[tuple[int, int, int], list[float]]:
+    """Per-cell [count, lat_sum, lng_sum, min_price, max_price] of (lat, lng, price) points."""
+    if aggregates is None:
+        aggregates = {}
+    for lat, lng, price in points:
+        for key in geo.tile_pyramid(lat, lng, CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM):
+            agg = aggregates.get(key)
+            if agg is None:
+                aggregates[key] = [1, lat, lng, price, price]
+            else:
+                agg[0] += 1
+                agg[1] += lat
+                agg[2] += lng
+                agg[3] = min(agg[3], price)
+                agg[4] = max(agg[4], price)
+    return aggregates
+
+def _cell_rows(aggregates: dict[tuple[int, int, int], list[float]]) -> list[dict]:
+    return [
+        {
+            "zoom": zoom, "cell_x": x, "cell_y": y, "count": count,
+            "lat_sum": lat_sum, "lng_sum": lng_sum, "min_price": min_price, "max_price": max_price,
+        }
+        for (zoom, x, y), (count, lat_sum, lng_sum, min_price, max_price) in aggregates.items()
+    ]
+
+async def add_listing_points(session: AsyncSession, points: list[tuple[float, float, float]]) -> None:
+    """Add many listing_point() values with one upsert per touched cell.
+
+    For bulk writes; the caller flushes the listings first and commits.
+    """
+    if not points:
+        return
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(cells)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cells.c.zoom, cells.c.cell_x, cells.c.cell_y],
+        set_={
+            "count": cells.c.count + new.count,
+            "lat_sum": cells.c.lat_sum + new.lat_sum,
+            "lng_sum": cells.c.lng_sum + new.lng_sum,
+            "min_price": case((new.min_price < cells.c.min_price, new.min_price), else_=cells.c.min_price),
+            "max_price": case((new.max_price > cells.c.max_price, new.max_price), else_=cells.c.max_price),
+        },
+    )
+    await session.execute(stmt, _cell_rows(_aggregate(points)))
+
+async def _remove_point(session: AsyncSession, lat: float, lng: float, price: float) -> None:
+    keys = _cell_keys(lat, lng)
+    await session.execute(
+        update(cells).where(*_cell_match).values(
+            count=cells.c.count - 1,
+            lat_sum=cells.c.lat_sum - lat,
+            lng_sum=cells.c.lng_sum - lng,
+        ),
+        keys,
+    )
+    await session.execute(delete(cells).where(*_cell_match, cells.c.count <= 0), keys)
+
+    # Cells whose min or max was this listing's price need the extreme
+    # recomputed. The finest cell reads its few listings; every coarser cell
+    # then takes the extreme over its four children, bottom-up.
+    holds_extreme = or_(cells.c.min_price == price, cells.c.max_price == price)
+    finest = keys[-1]
+    in_cell = published_in_bbox(
+        session.bind.dialect.name, geo.tile_bounds(finest["b_x"], finest["b_y"], finest["b_zoom"])
+    )
+    await session.execute(
+        update(cells).where(*_cell_match, holds_extreme).values(
+            min_price=select(func.min(Property.price)).where(*in_cell).scalar_subquery(),
+            max_price=select(func.max(Property.price)).where(*in_cell).scalar_subquery(),
+        ),
+        [finest],
+    )
+
+    child = cells.alias("child")
+    in_children = (
+        child.c.zoom == bindparam("b_zoom") + 1,
+        child.c.cell_x.between(bindparam("b_x") * 2, bindparam("b_x") * 2 + 1),
+        child.c.cell_y.between(bindparam("b_y") * 2, bindparam("b_y") * 2 + 1),
+    )
+    # executemany runs the parameter sets in order, so list finest first
+    await session.execute(
+        update(cells).where(*_cell_match, holds_extreme).values(
+            min_price=select(func.min(child.c.min_price)).where(*in_children).scalar_subquery(),
+            max_price=select(func.max(child.c.max_price)).where(*in_children).scalar_subquery(),
+        ),
+        list(reversed(keys[:-1])),
+    )
+
+async def apply_listing_change(
+    session: AsyncSession,
+    before: tuple[float, float, float] | None,
+    after: tuple[float, float, float] | None,
+) -> None:
+    """Move a listing's contribution between cluster cells.
+
+    `before` and `after` are listing_point() values around a write that has
+    already been flushed; the caller commits.
+    """
+    if before == after:
+        return
+    if before is not None:
+        await _remove_point(session, *before)
+    if after is not None:
+        await add_listing_points(session, [after])
+
+async def _recompute_cells(session: AsyncSession) -> None:
+    result = await session.stream(
+        select(Property.latitude, Property.longitude, Property.price).where(
+            Property.status == PropertyStatus.PUBLISHED,
+            Property.latitude.is_not(None),
+            Property.longitude.is_not(None),
+        )
+    )
+    aggregates: dict[tuple[int, int, int], list[float]] = {}
+    async for partition in result.partitions(10_000):
+        _aggregate(partition, aggregates)
+
+    await session.execute(delete(cells))
+    rows = _cell_rows(aggregates)
+    if rows:
+        await session.execute(cells.insert(), rows)
+
+async def remove_listing_points(session: AsyncSession, points: list[tuple[float, float, float]]) -> None:
+    """Remove many listing_point() values after a bulk write.
+
+    Each removal can recompute min/max prices along its pyramid, so past
+    REBUILD_THRESHOLD points the cells are recomputed from scratch instead.
+    The caller flushes the listings first and commits.
+    """
+    if len(points) > REBUILD_THRESHOLD:
+        await _recompute_cells(session)
+        return
+    for point in points:
+        await _remove_point(session, *point)
+
+async def rebuild_geo_cells(session: AsyncSession) -> None:
+    """Recompute every cluster cell from the published listings."""
+    await _recompute_cells(session)
+    await session.commit()
+
+async def get_clusters(
+    session: AsyncSession,
+    bbox: tuple[float, float, float, float],
+    zoom: int,
+) -> list[PropertyGeoCell]:
+    """Precomputed clusters covering a map viewport at a map zoom level."""
+    grid = min(max(zoom + CLUSTER_ZOOM_OFFSET, CLUSTER_MIN_ZOOM), CLUSTER_MAX_ZOOM)
+    min_lat, min_lng, max_lat, max_lng = bbox
+    # Tile rows grow southwards, so the north-west corner has the lowest x and y
+    x0, y0 = geo.tile_xy(max_lat, min_lng, grid)
+    x1, y1 = geo.tile_xy(min_lat, max_lng, grid)
+    result = await session.execute(
+        select(PropertyGeoCell).where(
+            PropertyGeoCell.zoom == grid,
+            PropertyGeoCell.cell_x.between(x0, x1),
+            PropertyGeoCell.cell_y.between(y0, y1),
+            PropertyGeoCell.count > 0,
+        )
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,157 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.uploads import StoredBlob, blob_digest
+from app.crud import crud_jobs
+from app.jobs.names import COLLECT_BLOBS
+from app.models.image_blob import ImageBlob
+
+def image_entry(blob: ImageBlob) -> dict:
+    """The image_meta entry of a blob: dimensions, plus placeholder and widths once rendered."""
+    entry = {"width": blob.width, "height": blob.height}
+    if blob.widths:
+        entry.update(placeholder=blob.placeholder, widths=blob.widths)
+    return entry
+
+async def add_references(session: AsyncSession, blobs: list[StoredBlob]) -> dict[str, dict]:
+    """Count one reference per entry, recording new blobs; returns the image_meta entry of each digest.
+
+    Entries of blobs whose derivatives have not been rendered yet have no
+    "widths". Does not commit.
+    """
+    if not blobs:
+        return {}
+    counts = Counter(blob.digest for blob in blobs)
+    rows = {
+        blob.digest: {
+            "digest": blob.digest, "ext": blob.ext, "size": blob.size,
+            "width": blob.width, "height": blob.height, "refcount": counts[blob.digest],
+        }
+        for blob in blobs
+    }
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(ImageBlob)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImageBlob.digest],
+        set_={
+            "refcount": ImageBlob.refcount + stmt.excluded.refcount,
+            # Reserved blobs learn their dimensions once the upload is checked
+            "width": func.coalesce(ImageBlob.width, stmt.excluded.width),
+            "height": func.coalesce(ImageBlob.height, stmt.excluded.height),
+        },
+    )
+    await session.execute(stmt, list(rows.values()))
+    result = await session.execute(
+        select(ImageBlob.digest, ImageBlob.width, ImageBlob.height, ImageBlob.placeholder, ImageBlob.widths)
+        .where(ImageBlob.digest.in_(rows))
+    )
+    return {row.digest: image_entry(row) for row in result}
+
+async def _shift_refcounts(session: AsyncSession, images: list[str], sign: int) -> list[str]:
+    """Add `sign` per occurrence to the refcounts of the blob URLs in `images`; returns the URLs left unreferenced."""
+    # One UPDATE per distinct multiplicity, usually just one
+    urls = {blob_digest(image): image for image in images if blob_digest(image)}
+    counts = Counter(digest for digest in map(blob_digest, images) if digest)
+    by_count: dict[int, list[str]] = {}
+    for digest, count in counts.items():
+        by_count.setdefault(count, []).append(digest)
+    unreferenced = []
+    for count, digests in by_count.items():
+        result = await session.execute(
+            update(ImageBlob)
+            .where(ImageBlob.digest.in_(digests))
+            .values(refcount=ImageBlob.refcount + sign * count)
+            .returning(ImageBlob.digest, ImageBlob.refcount)
+            .execution_options(synchronize_session=False)
+        )
+        unreferenced += [urls[digest] for digest, refcount in result if refcount <= 0]
+    return unreferenced
+
+async def retain_references(session: AsyncSession, images: list[str]) -> None:
+    """Count one more reference per already stored blob URL in `images`. Does not commit."""
+    await _shift_refcounts(session, images, 1)
+
+async def release_references(session: AsyncSession, images: list[str]) -> None:
+    """Drop one reference per blob URL in `images`. Does not commit.
+
+    Blobs left without references are queued for collection after
+    IMAGE_BLOB_GC_DELAY_SECONDS, in the same transaction; a blob that is
+    uploaded again before then is kept.
+    """
+    unreferenced = await _shift_refcounts(session, images, -1)
+    await _queue_collection(session, unreferenced, settings.IMAGE_BLOB_GC_DELAY_SECONDS)
+
+async def _queue_collection(session: AsyncSession, urls: list[str], delay: float) -> None:
+    if urls:
+        await crud_jobs.add_jobs(session, [{
+            "type": COLLECT_BLOBS,
+            "payload": {"urls": sorted(urls)},
+            "run_at": datetime.utcnow() + timedelta(seconds=delay),
+        }])
+
+async def _add_unreferenced(session: AsyncSession, blobs: list[StoredBlob], delay: float) -> None:
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    await session.execute(
+        insert(ImageBlob).on_conflict_do_nothing(index_elements=[ImageBlob.digest]),
+        [{"digest": blob.digest, "ext": blob.ext, "size": blob.size, "refcount": 0} for blob in blobs],
+    )
+    await _queue_collection(session, [blob.url for blob in blobs], delay)
+    await session.commit()
+
+async def reserve_blobs(session: AsyncSession, blobs: list[StoredBlob]) -> None:
+    """Record blobs about to be uploaded straight to storage, without references, and commit.
+
+    They are collected (row and file) unless an upload completes and
+    references them in time, so abandoned uploads do not linger.
+    """
+    await _add_unreferenced(session, blobs, settings.STORAGE_PRESIGN_EXPIRES_SECONDS + settings.IMAGE_BLOB_GC_DELAY_SECONDS)
+
+async def abandon_blobs(session: AsyncSession, blobs: list[StoredBlob]) -> None:
+    """Record blobs stored by an upload that then failed, without references, and commit.
+
+    They are collected after IMAGE_BLOB_GC_DELAY_SECONDS unless another
+    upload of the same content references them first.
+    """
+    if blobs:
+        await _add_unreferenced(session, blobs, settings.IMAGE_BLOB_GC_DELAY_SECONDS)
+
+async def get_blobs(session: AsyncSession, digests: list[str]) -> list[ImageBlob]:
+    # Widths and dimensions are filled in with Core updates; always re-read them
+    result = await session.execute(
+        select(ImageBlob).where(ImageBlob.digest.in_(digests)).execution_options(populate_existing=True)
+    )
+    return list(result.scalars())
+
+async def set_renditions(session: AsyncSession, entries: dict[str, dict]) -> None:
+    """Record the image_meta entries returned by rendering, per digest, and commit."""
+    for digest, entry in entries.items():
+        await session.execute(
+            update(ImageBlob)
+            .where(ImageBlob.digest == digest)
+            .values(
+                width=entry["width"], height=entry["height"],
+                placeholder=entry["placeholder"], widths=entry["widths"],
+            )
+            .execution_options(synchronize_session=False)
+        )
+    await session.commit()
+
+async def collect_blobs(session: AsyncSession, digests: list[str]) -> set[str]:
+    """Forget the blobs among `digests` that are still unreferenced; returns their digests.
+
+    Does not commit: the caller deletes their files first, so an upload of
+    the same content waits for the commit and then finds no file to reuse.
+    Blobs referenced again in the meantime are kept.
+    """
+    result = await session.execute(
+        delete(ImageBlob)
+        .where(ImageBlob.digest.in_(digests), ImageBlob.refcount <= 0)
+        .returning(ImageBlob.digest)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars())
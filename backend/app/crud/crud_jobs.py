@@ -0,0 +1,113 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job, JobStatus
+
+async def add_jobs(session: AsyncSession, jobs: list[dict]) -> list[int]:
+    """Queue jobs in the caller's transaction; each dict holds Job column values.
+
+    Nothing is committed, so the jobs become visible together with the
+    write that produced them.
+    """
+    if not jobs:
+        return []
+    result = await session.execute(insert(Job).returning(Job.id), jobs)
+    return list(result.scalars())
+
+async def enqueue_job(
+    session: AsyncSession,
+    job_type: str,
+    payload: dict,
+    owner_id: int | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """Queue one job and commit."""
+    values = {"type": job_type, "payload": payload, "owner_id": owner_id}
+    if max_attempts is not None:
+        values["max_attempts"] = max_attempts
+    job = (await session.execute(insert(Job).values(**values).returning(Job))).scalar_one()
+    await session.commit()
+    return job
+
+async def get_job(session: AsyncSession, job_id: int) -> Job | None:
+    # Status is changed by the worker through Core updates; always re-read it
+    return await session.get(Job, job_id, populate_existing=True)
+
+async def claim_job(session: AsyncSession, job_types: list[str], lease_seconds: int):
+    """Mark the oldest due job of one of `job_types` as running and return its row.
+
+    Running jobs whose lease has expired (their worker died) are claimed
+    again. The select and the status change are a single UPDATE. On
+    PostgreSQL the subquery skips rows other workers have locked, and the
+    outer WHERE repeats the due condition: under READ COMMITTED a worker that
+    waited on a row re-checks it once the other commits, and then matches
+    nothing rather than claiming the same job twice.
+    """
+    if not job_types:
+        return None
+    now = datetime.utcnow()
+    is_due = and_(
+        Job.type.in_(job_types),
+        or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= now),
+            and_(Job.status == JobStatus.RUNNING, Job.started_at < now - timedelta(seconds=lease_seconds)),
+        ),
+    )
+    due = select(Job.id).where(is_due).order_by(Job.run_at, Job.id).limit(1)
+    if session.bind.dialect.name == "postgresql":
+        due = due.with_for_update(skip_locked=True)
+    job = (await session.execute(
+        update(Job)
+        .where(Job.id == due.scalar_subquery(), is_due)
+        .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1, started_at=now)
+        .returning(*Job.__table__.c)
+        .execution_options(synchronize_session=False)
+    )).one_or_none()
+    await session.commit()
+    return job
+
+async def complete_job(session: AsyncSession, job_id: int) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=JobStatus.SUCCEEDED, finished_at=datetime.utcnow(), last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+async def fail_job(session: AsyncSession, job_id: int, error: str, retry_in: float | None) -> JobStatus:
+    """Record a failed attempt: requeue after `retry_in` seconds, or give up when None."""
+    now = datetime.utcnow()
+    if retry_in is None:
+        values = {"status": JobStatus.FAILED, "finished_at": now}
+    else:
+        values = {"status": JobStatus.QUEUED, "run_at": now + timedelta(seconds=retry_in), "started_at": None}
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(last_error=error, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return values["status"]
+
+async def release_job(session: AsyncSession, job_id: int) -> None:
+    """Put back a job interrupted by shutdown, without counting the attempt."""
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+        .values(status=JobStatus.QUEUED, attempts=Job.attempts - 1, started_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+async def count_jobs(session: AsyncSession) -> dict[str, Counter]:
+    """Number of jobs per type and status."""
+    result = await session.execute(select(Job.type, Job.status, func.count()).group_by(Job.type, Job.status))
+    counts: dict[str, Counter] = {}
+    for job_type, status, count in result:
+        counts.setdefault(job_type, Counter())[status.value] = count
+    return counts
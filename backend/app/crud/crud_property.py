@@ -1,60 +1,241 @@
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload, joinedload
+import html
+import re
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import case, column, delete, func, insert, literal_column, select, table, tuple_, update
+from pydantic import BaseModel
+from sqlalchemy.orm import selectinload, joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.property import Property
-from app.schemas.property import PropertyCreate, PropertyUpdate
+from app.core import geo
+from app.core.events import ListingSnapshot, listing_changed, snapshot
+from app.core.facets import PRICE_BUCKETS
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.uploads import StoredBlob, blob_digest
+from app.crud import crud_image_blobs, crud_jobs
+from app.crud.crud_geo_cells import (
+    add_listing_points,
+    apply_listing_change,
+    listing_point,
+    published_in_bbox,
+    remove_listing_points,
+)
+from app.models.property import (
+    FULLTEXT_CONFIG,
+    SQLITE_FTS_TABLE,
+    SQLITE_FTS_WEIGHTS,
+    Property,
+    PropertyStatus,
+    PropertyType,
+    search_vector,
+)
+from app.jobs.names import DELETE_LISTING_FILES
+from app.models.user import User
+from app.schemas.property import PropertyCreate, PropertyUpdate, PropertySearchFilters
+
+# Sort modes -> (sort column, descending). Every mode is tie-broken on id so
+# that keyset pagination is stable; see the composite indexes on Property.
+SORT_KEYS = {
+    "newest": (Property.created_at, True),
+    "price_asc": (Property.price, False),
+    "price_desc": (Property.price, True),
+    "id": (Property.id, False),
+}
+
+def _apply_sort(stmt, sort: str, cursor: str | None, rank_column=None):
+    """Order by the sort key and, when a cursor is given, seek past it.
+
+    The "relevance" sort orders by `rank_column` (lower is better), which
+    only exists in full-text search queries.
+    """
+    if sort == "relevance":
+        column, descending = rank_column, False
+    else:
+        column, descending = SORT_KEYS[sort]
+    if column is Property.id:
+        if cursor:
+            _, last_id = decode_cursor(cursor, sort)
+            stmt = stmt.where(Property.id > last_id)
+        return stmt.order_by(Property.id.asc())
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort, datetime_value=column is Property.created_at)
+        key = tuple_(column, Property.id)
+        stmt = stmt.where(key < (last_value, last_id) if descending else key > (last_value, last_id))
+
+    if descending:
+        return stmt.order_by(column.desc(), Property.id.desc())
+    return stmt.order_by(column.asc(), Property.id.asc())
+
+def next_cursor(items: list[Property], sort: str, limit: int) -> str | None:
+    """Cursor for the page after `items`, or None when this was the last page."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if sort == "relevance":
+        return encode_cursor(sort, last.search_rank, last.id)
+    column, _ = SORT_KEYS[sort]
+    return encode_cursor(sort, getattr(last, column.key), last.id)
+
+# Columns writes return to update cluster cells and listing caches
+_CHANGE_RETURNING = (
+    Property.id, Property.agent_id, Property.status, Property.city,
+    Property.property_type, Property.price, Property.updated_at,
+    Property.latitude, Property.longitude,
+)
+
+async def _hydrate_agent(session: AsyncSession, prop: Property) -> Property:
+    """Attach the listing's agent without a query when it is already in the session.
+
+    Write endpoints authenticate the caller on the same session, so the
+    agent is usually in the identity map.
+    """
+    if "agent" not in prop.__dict__:
+        set_committed_value(prop, "agent", await session.get(User, prop.agent_id))
+    return prop
 
 async def create_property(session: AsyncSession, property_in: PropertyCreate, agent_id: int) -> Property:
-    db_obj = Property(
-        **property_in.model_dump(),
-        agent_id=agent_id,
-        images=[]  # Initialize with empty list
+    created_prop = await session.scalar(
+        insert(Property)
+        .values(**property_in.model_dump(), agent_id=agent_id, images=[])
+        .returning(Property)
     )
-    session.add(db_obj)
+    await apply_listing_change(session, None, listing_point(created_prop))
     await session.commit()
-    
-    # Re-fetch the property with the agent eagerly loaded to ensure it's available for the response model
-    query = select(Property).options(joinedload(Property.agent)).where(Property.id == db_obj.id)
-    result = await session.execute(query)
-    created_prop = result.scalar_one()
-    
+    await _hydrate_agent(session, created_prop)
+    listing_changed(None, snapshot(created_prop))
     return created_prop
 
+async def bulk_create_properties(
+    session: AsyncSession, properties_in: list[PropertyCreate], agent_id: int
+) -> list[int]:
+    """Insert a batch of listings in one executemany and one transaction.
+
+    Returns the new ids. They are not guaranteed to follow input order:
+    asking for that makes SQLAlchemy fall back to one INSERT per row. Unlike
+    create_property nothing is re-selected; cluster cells and listing caches
+    are updated for the whole batch.
+    """
+    if not properties_in:
+        return []
+    rows = [{**property_in.model_dump(), "agent_id": agent_id, "images": []} for property_in in properties_in]
+    result = await session.execute(insert(Property).returning(*_CHANGE_RETURNING), rows)
+    created = result.all()
+    await add_listing_points(session, [point for point in map(listing_point, created) if point])
+    await session.commit()
+    for row in created:
+        listing_changed(None, snapshot(row))
+    return [row.id for row in created]
+
 async def get_property(session: AsyncSession, property_id: int) -> Property | None:
     result = await session.execute(
-        select(Property).options(selectinload(Property.agent)).where(Property.id == property_id)
+        select(Property).options(joinedload(Property.agent)).where(Property.id == property_id)
     )
     return result.scalar_one_or_none()
 
+async def get_property_version(session: AsyncSession, property_id: int):
+    """Columns needed to authorize and revalidate a listing, without loading it."""
+    result = await session.execute(
+        select(Property.id, Property.status, Property.agent_id, Property.updated_at).where(Property.id == property_id)
+    )
+    return result.one_or_none()
+
+async def get_listing_version(
+    session: AsyncSession,
+    owner_id: int | None = None,
+    status: str | None = None,
+    city: str | None = None,
+) -> tuple[int, datetime | None]:
+    """(count, max(updated_at)) of a listing collection.
+
+    Every write bumps updated_at and deletes change the count, so the pair
+    changes whenever any page of the collection could. The index that serves
+    the collection's first page narrows the rows both aggregates read.
+    """
+    stmt = select(func.count(), func.max(Property.updated_at))
+    if owner_id is not None:
+        stmt = stmt.where(Property.agent_id == owner_id)
+    if status:
+        stmt = stmt.where(Property.status == status)
+    if city:
+        stmt = stmt.where(Property.city == city)
+    count, last_modified = (await session.execute(stmt)).one()
+    return count, last_modified
+
 async def get_multi(
     session: AsyncSession,
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
 ) -> list[Property]:
-    query = select(Property).options(selectinload(Property.agent)).offset(skip).limit(limit)
-    result = await session.execute(query)
+    query = _apply_sort(select(Property).options(selectinload(Property.agent)), "id", cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await session.execute(query.limit(limit))
     return result.scalars().all()
 
+# Columns every page needs for keyset cursors and the identity map
+_PAGE_COLUMNS = {"id", "agent_id", "created_at", "price"}
+# Schema fields computed from other columns
+_DERIVED_COLUMNS = {
+    "thumbnail": ("images", "image_meta"),
+    "thumbnail_width": ("images", "image_meta"),
+    "thumbnail_height": ("images", "image_meta"),
+    "thumbnail_placeholder": ("images", "image_meta"),
+    "image_sets": ("images", "image_meta"),
+}
+
+def _load_options(projection: type[BaseModel] | None, agent_loader=selectinload) -> list:
+    """Loader options for a page: everything, or only what `projection` serializes.
+
+    The agent relationship is only loaded when the projection includes it.
+    """
+    if projection is None:
+        return [agent_loader(Property.agent)]
+    fields = projection.model_fields.keys()
+    columns = set(_PAGE_COLUMNS)
+    for name in fields:
+        for column in _DERIVED_COLUMNS.get(name, (name,)):
+            if column in Property.__table__.c:
+                columns.add(column)
+    options = [load_only(*(getattr(Property, name) for name in sorted(columns)))]
+    if "agent" in fields:
+        options.append(agent_loader(Property.agent))
+    return options
+
+def owner_sort_key(sort: str | None) -> str:
+    # The dashboard only offers "price" (highest first); default to newest
+    return "price_desc" if sort == "price" else "newest"
+
+def published_sort_key(sort: str | None) -> str:
+    return sort if sort in ("price_asc", "price_desc") else "newest"
+
+def search_sort_key(sort: str | None, q: str | None) -> str:
+    # Keyword searches rank by relevance unless another order is asked for
+    if sort in ("price_asc", "price_desc", "newest"):
+        return sort
+    return "relevance" if q else "newest"
+
 async def get_multi_by_owner(
     session: AsyncSession, 
     owner_id: int, 
     status: str | None = None, 
     sort: str | None = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: str | None = None,
+    projection: type[BaseModel] | None = None,
 ) -> list[Property]:
-    stmt = select(Property).options(selectinload(Property.agent)).where(Property.agent_id == owner_id)
+    stmt = select(Property).options(*_load_options(projection)).where(Property.agent_id == owner_id)
     
     if status:
         stmt = stmt.where(Property.status == status)
         
-    if sort == "price":
-        stmt = stmt.order_by(Property.price.desc())
-    else:
-        # Default to created_at descending
-        stmt = stmt.order_by(Property.created_at.desc())
-        
-    stmt = stmt.offset(skip).limit(limit)
+    stmt = _apply_sort(stmt, owner_sort_key(sort), cursor)
+    if not cursor:
+        stmt = stmt.offset(skip)
+    stmt = stmt.limit(limit)
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
@@ -63,25 +244,272 @@ async def get_multi_published(
     city: str | None = None,
     sort: str | None = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: str | None = None,
+    projection: type[BaseModel] | None = None,
 ) -> list[Property]:
-    stmt = select(Property).options(joinedload(Property.agent)).where(Property.status == "published")
+    stmt = select(Property).options(*_load_options(projection, joinedload)).where(Property.status == "published")
     
     if city:
         stmt = stmt.where(Property.city == city)
 
-    if sort == "price_asc":
-        stmt = stmt.order_by(Property.price.asc())
-    elif sort == "price_desc":
-        stmt = stmt.order_by(Property.price.desc())
-    else:
-        # Default to created_at descending
-        stmt = stmt.order_by(Property.created_at.desc())
-        
-    stmt = stmt.offset(skip).limit(limit)
+    stmt = _apply_sort(stmt, published_sort_key(sort), cursor)
+    if not cursor:
+        stmt = stmt.offset(skip)
+    stmt = stmt.limit(limit)
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
+class InvalidSearchError(ValueError):
+    """Raised when a search combines filters that can never match."""
+
+def normalize_search_filters(filters: PropertySearchFilters) -> PropertySearchFilters:
+    """Reject contradictory ranges and drop predicates that match every row.
+
+    No-op predicates are removed so they don't steer the planner away from
+    the composite index that serves the remaining filters and the sort.
+    """
+    data = filters.model_dump()
+    for low, high in (("price_min", "price_max"), ("surface_min", "surface_max")):
+        if data[low] is not None and data[high] is not None and data[low] > data[high]:
+            raise InvalidSearchError(f"{low} cannot be greater than {high}")
+
+    for field in ("price_min", "surface_min", "bedrooms_min", "bathrooms_min"):
+        if data[field] is not None and data[field] <= 0:
+            data[field] = None
+
+    if data["property_types"] is not None:
+        types = set(data["property_types"])
+        data["property_types"] = None if types == set(PropertyType) else sorted(types)
+
+    return PropertySearchFilters(**data)
+
+def _apply_search_filters(stmt, filters: PropertySearchFilters):
+    # Equality filters lead the composite indexes, so they go first
+    if filters.city:
+        stmt = stmt.where(Property.city == filters.city)
+    if filters.property_types:
+        if len(filters.property_types) == 1:
+            stmt = stmt.where(Property.property_type == filters.property_types[0])
+        else:
+            stmt = stmt.where(Property.property_type.in_(filters.property_types))
+    if filters.price_min is not None:
+        stmt = stmt.where(Property.price >= filters.price_min)
+    if filters.price_max is not None:
+        stmt = stmt.where(Property.price <= filters.price_max)
+    if filters.surface_min is not None:
+        stmt = stmt.where(Property.surface >= filters.surface_min)
+    if filters.surface_max is not None:
+        stmt = stmt.where(Property.surface <= filters.surface_max)
+    if filters.bedrooms_min is not None:
+        stmt = stmt.where(Property.bedrooms >= filters.bedrooms_min)
+    if filters.bathrooms_min is not None:
+        stmt = stmt.where(Property.bathrooms >= filters.bathrooms_min)
+    return stmt
+
+async def _load_page(session: AsyncSession, ids: list[int]) -> list[Property]:
+    """Load full rows (with agent) for a page of ids, keeping their order."""
+    result = await session.execute(
+        select(Property).options(joinedload(Property.agent)).where(Property.id.in_(ids))
+    )
+    by_id = {prop.id: prop for prop in result.scalars().all()}
+    return [by_id[prop_id] for prop_id in ids if prop_id in by_id]
+
+# Highlight markers are swapped for <mark> tags after the snippet text has
+# been HTML-escaped, so listing text can never inject markup.
+_SNIPPET_START, _SNIPPET_END = "\x02", "\x03"
+
+def _fts5_query(q: str) -> str | None:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def _text_match(dialect: str, q: str):
+    """Subquery of (id, rank) for listings matching `q`; lower rank is better."""
+    if dialect == "sqlite":
+        fts_query = _fts5_query(q)
+        if fts_query is None:
+            return None
+        fts = table(SQLITE_FTS_TABLE, column("rowid"))
+        return (
+            select(
+                fts.c.rowid.label("id"),
+                func.bm25(literal_column(SQLITE_FTS_TABLE), *SQLITE_FTS_WEIGHTS).label("rank"),
+            )
+            .where(literal_column(SQLITE_FTS_TABLE).op("MATCH")(fts_query))
+            .subquery("text_match")
+        )
+
+    ts_query = func.websearch_to_tsquery(FULLTEXT_CONFIG, q)
+    vector = search_vector()
+    return (
+        select(Property.id.label("id"), (-func.ts_rank_cd(vector, ts_query)).label("rank"))
+        .where(vector.op("@@")(ts_query))
+        .subquery("text_match")
+    )
+
+def _snippet_query(dialect: str, q: str, ids: list[int]):
+    if dialect == "sqlite":
+        fts = table(SQLITE_FTS_TABLE, column("rowid"))
+        return (
+            select(
+                fts.c.rowid,
+                func.snippet(literal_column(SQLITE_FTS_TABLE), -1, _SNIPPET_START, _SNIPPET_END, "…", 16),
+            )
+            .where(literal_column(SQLITE_FTS_TABLE).op("MATCH")(_fts5_query(q)))
+            .where(fts.c.rowid.in_(ids))
+        )
+
+    options = f"StartSel={_SNIPPET_START}, StopSel={_SNIPPET_END}, MaxWords=24, MinWords=8"
+    return select(
+        Property.id,
+        func.ts_headline(
+            FULLTEXT_CONFIG,
+            func.coalesce(Property.description, Property.title),
+            func.websearch_to_tsquery(FULLTEXT_CONFIG, q),
+            options,
+        ),
+    ).where(Property.id.in_(ids))
+
+def _render_snippet(raw: str | None) -> str | None:
+    if raw is None:
+        return None
+    escaped = html.escape(raw)
+    return escaped.replace(_SNIPPET_START, "<mark>").replace(_SNIPPET_END, "</mark>")
+
+def build_search_query(
+    filters: PropertySearchFilters,
+    sort: str,
+    cursor: str | None,
+    limit: int,
+    text_match=None,
+):
+    """Id-only query over published listings.
+
+    The status and sort key select a keyset index on Property that also
+    holds every filtered column, so the query is answered from the index
+    without touching table rows. With a `text_match` subquery the rank is
+    selected too and only matches are kept.
+    """
+    if text_match is not None:
+        stmt = select(Property.id, text_match.c.rank).join(text_match, text_match.c.id == Property.id)
+    else:
+        stmt = select(Property.id)
+    stmt = stmt.where(Property.status == PropertyStatus.PUBLISHED)
+    stmt = _apply_search_filters(stmt, filters)
+    rank_column = text_match.c.rank if text_match is not None else None
+    return _apply_sort(stmt, sort, cursor, rank_column=rank_column).limit(limit)
+
+async def search_published(
+    session: AsyncSession,
+    filters: PropertySearchFilters,
+    q: str | None = None,
+    sort: str | None = None,
+    cursor: str | None = None,
+    limit: int = 20,
+) -> list[Property]:
+    """Search published listings.
+
+    With a keyword query `q`, results carry `search_rank` and an HTML-safe
+    `search_snippet` with matches wrapped in <mark> tags.
+    """
+    filters = normalize_search_filters(filters)
+    dialect = session.bind.dialect.name
+    text_match = _text_match(dialect, q) if q else None
+    if q and text_match is None:
+        return []
+
+    sort_key = search_sort_key(sort, q)
+    result = await session.execute(build_search_query(filters, sort_key, cursor, limit, text_match))
+    rows = result.all()
+    if not rows:
+        return []
+    ids = [row.id for row in rows]
+    items = await _load_page(session, ids)
+
+    if text_match is not None:
+        ranks = {row.id: row.rank for row in rows}
+        snippets = dict((await session.execute(_snippet_query(dialect, q, ids))).all())
+        for prop in items:
+            prop.search_rank = ranks[prop.id]
+            prop.search_snippet = _render_snippet(snippets.get(prop.id))
+    return items
+
+async def get_published_geo(
+    session: AsyncSession,
+    center: tuple[float, float],
+    bbox: tuple[float, float, float, float],
+    radius_km: float | None = None,
+    limit: int = 50,
+) -> list[Property]:
+    """Published listings inside `bbox` (and `radius_km` of `center`), nearest first.
+
+    The spatial index narrows the search to the box, so only candidates in
+    it are sorted. Results carry `distance_km` from `center`.
+    """
+    lat, lng = center
+    min_lat, min_lng, max_lat, max_lng = bbox
+    scale = geo.lng_scale(lat)
+    # Equirectangular distance in latitude degrees, squared: monotonic with
+    # the real distance over listing-sized areas and needs no trig in SQL
+    dist_sq = (
+        (Property.latitude - lat) * (Property.latitude - lat)
+        + (Property.longitude - lng) * scale * (Property.longitude - lng) * scale
+    ).label("dist_sq")
+
+    stmt = select(Property.id, dist_sq).where(*published_in_bbox(session.bind.dialect.name, bbox))
+    if radius_km is not None:
+        stmt = stmt.where(dist_sq <= (radius_km / geo.KM_PER_DEGREE_LAT) ** 2)
+    stmt = stmt.order_by(dist_sq, Property.id).limit(limit)
+
+    ids = list((await session.execute(stmt)).scalars().all())
+    if not ids:
+        return []
+    items = await _load_page(session, ids)
+    for prop in items:
+        prop.distance_km = round(geo.haversine_km(lat, lng, prop.latitude, prop.longitude), 3)
+    return items
+
+
+async def count_published_facets(session: AsyncSession) -> tuple[Counter, Counter, Counter]:
+    """Published listing counts per city, property type and price bucket."""
+    published = Property.status == PropertyStatus.PUBLISHED
+    cities = await session.execute(
+        select(Property.city, func.count()).where(published).group_by(Property.city)
+    )
+    types = await session.execute(
+        select(Property.property_type, func.count()).where(published).group_by(Property.property_type)
+    )
+    # Bucket index = number of bucket edges above the first that the price reaches
+    bucket = sum(
+        (case((Property.price >= edge, 1), else_=0) for edge in PRICE_BUCKETS[1:]),
+        start=literal_column("0"),
+    ).label("bucket")
+    buckets = await session.execute(select(bucket, func.count()).where(published).group_by(bucket))
+    return (
+        Counter(dict(cities.all())),
+        Counter({prop_type.value: n for prop_type, n in types.all()}),
+        Counter(dict(buckets.all())),
+    )
+
+
+async def _update_returning(session: AsyncSession, db_obj: Property, values: dict) -> Property:
+    """UPDATE one listing and refresh it from RETURNING in the same statement."""
+    row = (await session.execute(
+        update(Property)
+        .where(Property.id == db_obj.id)
+        .values(**values)
+        .returning(*Property.__table__.c)
+        .execution_options(synchronize_session=False)
+    )).one()
+    # Loaded as if just read, so nothing is left dirty or expired
+    for key, value in row._mapping.items():
+        set_committed_value(db_obj, key, value)
+    return db_obj
 
 async def update_property(
     session: AsyncSession,
@@ -92,23 +520,185 @@ async def update_property(
         update_data = obj_in
     else:
         update_data = obj_in.model_dump(exclude_unset=True)
+    values = {field: value for field, value in update_data.items() if field in Property.__table__.c}
+    if not values:
+        return db_obj
         
-    for field in update_data:
-        if hasattr(db_obj, field):
-            setattr(db_obj, field, update_data[field])
-            
-    session.add(db_obj)
+    before_point = listing_point(db_obj)
+    before_snapshot = snapshot(db_obj)
+    before_images = list(db_obj.images or [])
+    updated_prop = await _update_returning(session, db_obj, values)
+    await apply_listing_change(session, before_point, listing_point(updated_prop))
+    if "images" in values:
+        before, after = Counter(before_images), Counter(updated_prop.images or [])
+        await crud_image_blobs.retain_references(session, list((after - before).elements()))
+        await crud_image_blobs.release_references(session, list((before - after).elements()))
     await session.commit()
-    await session.refresh(db_obj)
-    
-    # Ensure agent is loaded
-    q = select(Property).options(joinedload(Property.agent)).where(Property.id == db_obj.id)
-    result = await session.execute(q)
-    return result.scalar_one()
-
-async def delete_property(session: AsyncSession, property_id: int) -> Property | None:
-    db_obj = await get_property(session, property_id)
-    if db_obj:
-        await session.delete(db_obj)
-        await session.commit()
+    await _hydrate_agent(session, updated_prop)
+    listing_changed(before_snapshot, snapshot(updated_prop))
+    return updated_prop
+
+async def add_images(session: AsyncSession, db_obj: Property, blobs: list[StoredBlob]) -> tuple[Property, list[StoredBlob]]:
+    """Append stored images to a listing, counting a reference to each blob.
+
+    Dimensions are known right away; blobs rendered for an earlier upload
+    also bring their derivatives and placeholder along. Returns the listing
+    and the blobs whose derivatives still need rendering.
+    """
+    before_snapshot = snapshot(db_obj)
+    entries = await crud_image_blobs.add_references(session, blobs)
+    image_meta = {blob.url: entries[blob.digest] for blob in blobs}
+    updated_prop = await _update_returning(session, db_obj, {
+        "images": list(db_obj.images or []) + [blob.url for blob in blobs],
+        "image_meta": {**(db_obj.image_meta or {}), **image_meta},
+    })
+    await session.commit()
+    await _hydrate_agent(session, updated_prop)
+    listing_changed(before_snapshot, snapshot(updated_prop))
+    unrendered = {blob.digest: blob for blob in blobs if "widths" not in entries[blob.digest]}
+    return updated_prop, list(unrendered.values())
+
+async def set_image_meta(session: AsyncSession, property_id: int, image_meta: dict[str, dict]) -> Property | None:
+    """Merge image_meta entries into a listing's; None if the listing is gone.
+
+    Jobs for several uploads to one listing can finish together, so the
+    merge only applies if the listing is unchanged since it was read.
+    """
+    while True:
+        db_obj = (await session.execute(
+            select(Property).where(Property.id == property_id).execution_options(populate_existing=True)
+        )).scalar_one_or_none()
+        if db_obj is None:
+            return None
+        before_snapshot = snapshot(db_obj)
+        row = (await session.execute(
+            update(Property)
+            .where(Property.id == property_id, Property.updated_at == db_obj.updated_at)
+            .values(image_meta={**(db_obj.image_meta or {}), **image_meta})
+            .returning(*Property.__table__.c)
+            .execution_options(synchronize_session=False)
+        )).one_or_none()
+        if row is not None:
+            break
+        await session.rollback()
+    for key, value in row._mapping.items():
+        set_committed_value(db_obj, key, value)
+    await session.commit()
+    listing_changed(before_snapshot, snapshot(db_obj))
     return db_obj
+
+async def _release_files(session: AsyncSession, deleted) -> None:
+    # In the deleting transaction, so files go if and only if the rows do
+    images = [image for row in deleted for image in row.images or []]
+    await crud_image_blobs.release_references(session, images)
+    # Uploads from before blob storage live in a directory per listing
+    legacy = [row.id for row in deleted if any(blob_digest(image) is None for image in row.images or [])]
+    if legacy:
+        await crud_jobs.add_jobs(session, [{"type": DELETE_LISTING_FILES, "payload": {"property_ids": legacy}}])
+
+async def delete_property(session: AsyncSession, property_id: int) -> bool:
+    """Delete a listing with one DELETE ... RETURNING; False if it did not exist."""
+    deleted = (await session.execute(
+        delete(Property)
+        .where(Property.id == property_id)
+        .returning(*_CHANGE_RETURNING, Property.images)
+        .execution_options(synchronize_session="fetch")
+    )).one_or_none()
+    if deleted is None:
+        return False
+    await apply_listing_change(session, listing_point(deleted), None)
+    await _release_files(session, [deleted])
+    await session.commit()
+    listing_changed(snapshot(deleted), None)
+    return True
+
+def bulk_filter(
+    ids: list[int] | None = None,
+    agent_id: int | None = None,
+    city: str | None = None,
+    status: str | None = None,
+    property_type: str | None = None,
+) -> list:
+    """WHERE clauses selecting the listings a bulk operation applies to."""
+    clauses = []
+    if ids is not None:
+        clauses.append(Property.id.in_(ids))
+    if agent_id is not None:
+        clauses.append(Property.agent_id == agent_id)
+    if city:
+        clauses.append(Property.city == city)
+    if status:
+        clauses.append(Property.status == status)
+    if property_type:
+        clauses.append(Property.property_type == property_type)
+    return clauses
+
+async def bulk_set_status(session: AsyncSession, where: list, status: PropertyStatus) -> int:
+    """Publish or unpublish every matching listing in one UPDATE; returns the number changed."""
+    other = PropertyStatus.DRAFT if status == PropertyStatus.PUBLISHED else PropertyStatus.PUBLISHED
+    result = await session.execute(
+        update(Property)
+        .where(*where, Property.status != status)
+        .values(status=status)
+        .returning(*_CHANGE_RETURNING)
+        .execution_options(synchronize_session="fetch")
+    )
+    changed = result.all()
+    points = [(row.latitude, row.longitude, row.price) for row in changed
+              if row.latitude is not None and row.longitude is not None]
+    if status == PropertyStatus.PUBLISHED:
+        await add_listing_points(session, points)
+    else:
+        await remove_listing_points(session, points)
+    await session.commit()
+    for row in changed:
+        after = snapshot(row)
+        listing_changed(after._replace(status=other.value, updated_at=None), after)
+    return len(changed)
+
+ListingChange = tuple[ListingSnapshot | None, ListingSnapshot | None]
+
+def announce_changes(changes: list[ListingChange]) -> None:
+    """Notify listing change handlers, once the changes are committed."""
+    for before, after in changes:
+        listing_changed(before, after)
+
+async def bulk_reassign_uncommitted(session: AsyncSession, where: list, agent_id: int) -> list[ListingChange]:
+    """bulk_reassign without the commit; announce the returned changes once committed."""
+    result = await session.execute(
+        update(Property)
+        .where(*where, Property.agent_id != agent_id)
+        .values(agent_id=agent_id)
+        .returning(*_CHANGE_RETURNING)
+        .execution_options(synchronize_session="fetch")
+    )
+    # UPDATE ... RETURNING only sees the new agent; no listing cache keys on it
+    return [(after._replace(updated_at=None), after) for after in map(snapshot, result.all())]
+
+async def bulk_reassign(session: AsyncSession, where: list, agent_id: int) -> int:
+    """Move every matching listing to another agent in one UPDATE; returns the number moved."""
+    changes = await bulk_reassign_uncommitted(session, where, agent_id)
+    await session.commit()
+    announce_changes(changes)
+    return len(changes)
+
+async def bulk_delete_uncommitted(session: AsyncSession, where: list) -> list[ListingChange]:
+    """bulk_delete without the commit; announce the returned changes once committed."""
+    result = await session.execute(
+        delete(Property)
+        .where(*where)
+        .returning(*_CHANGE_RETURNING, Property.images)
+        .execution_options(synchronize_session="fetch")
+    )
+    deleted = result.all()
+    points = [point for point in map(listing_point, deleted) if point]
+    await remove_listing_points(session, points)
+    await _release_files(session, deleted)
+    return [(snapshot(row), None) for row in deleted]
+
+async def bulk_delete(session: AsyncSession, where: list) -> int:
+    """Delete every matching listing in one DELETE; returns the number deleted."""
+    changes = await bulk_delete_uncommitted(session, where)
+    await session.commit()
+    announce_changes(changes)
+    return len(changes)
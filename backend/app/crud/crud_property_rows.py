@@ -0,0 +1,125 @@
+"""Core read path for high-volume listing pages.
+
+Rows are selected with Core, packed into slotted dataclasses and serialized
+with orjson, skipping the identity map, relationship loading and pydantic
+validation. The JSON is identical to a list of PropertyRead; use this path
+only for read-only pages that go straight to the response body.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.images import image_sets
+from app.crud.crud_property import _apply_sort, published_sort_key
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User
+
+@dataclass(slots=True)
+class PropertyAgentRow:
+    id: int
+    name: str
+    email: str
+    phone: str | None
+
+# Field order matches PropertyRead so both paths emit the same JSON
+@dataclass(slots=True)
+class PropertyRow:
+    title: str
+    price: float
+    surface: float
+    city: str
+    street: str | None
+    address: str | None
+    property_type: PropertyType
+    bedrooms: int | None
+    bathrooms: int | None
+    description: str | None
+    latitude: float | None
+    longitude: float | None
+    id: int
+    images: list[str]
+    image_sets: list[dict]
+    status: PropertyStatus
+    agent_id: int
+    created_at: datetime
+    updated_at: datetime
+    agent: PropertyAgentRow | None
+
+# image_sets is computed from images and image_meta, selected last
+_COMPUTED = {"agent", "image_sets"}
+_PROPERTY_COLUMNS = [getattr(Property, name) for name in PropertyRow.__slots__ if name not in _COMPUTED]
+_IMAGES = PropertyRow.__slots__.index("images")
+
+def _row_select():
+    # An outer join, like the ORM's joinedload, so both paths get the same plan and rows
+    return select(
+        *_PROPERTY_COLUMNS, Property.image_meta, User.id, User.name, User.email, User.phone,
+    ).outerjoin(User, User.id == Property.agent_id)
+
+def _to_rows(result) -> list[PropertyRow]:
+    split = len(_PROPERTY_COLUMNS)
+    rows = []
+    for row in result:
+        values = list(row[:split])
+        images = values[_IMAGES] = values[_IMAGES] or []
+        values.insert(_IMAGES + 1, image_sets(images, row[split]))
+        agent = row[split + 1:]
+        rows.append(PropertyRow(*values, PropertyAgentRow(*agent) if agent[0] is not None else None))
+    return rows
+
+async def get_multi_rows(
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> list[PropertyRow]:
+    """Same page as crud_property.get_multi, as PropertyRow objects."""
+    stmt = _apply_sort(_row_select(), "id", cursor)
+    if not cursor:
+        stmt = stmt.offset(skip)
+    return _to_rows(await session.execute(stmt.limit(limit)))
+
+async def get_multi_published_rows(
+    session: AsyncSession,
+    city: str | None = None,
+    sort: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> list[PropertyRow]:
+    """Same page as crud_property.get_multi_published, as PropertyRow objects."""
+    stmt = _row_select().where(Property.status == "published")
+    if city:
+        stmt = stmt.where(Property.city == city)
+    stmt = _apply_sort(stmt, published_sort_key(sort), cursor)
+    if not cursor:
+        stmt = stmt.offset(skip)
+    return _to_rows(await session.execute(stmt.limit(limit)))
+
+def dump_rows(rows: list[PropertyRow]) -> bytes:
+    return orjson.dumps(rows)
+
+async def stream_rows(
+    session: AsyncSession,
+    status: str | None = None,
+    after_id: int | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[list[PropertyRow]]:
+    """Yield every listing in id order, `batch_size` rows at a time.
+
+    Rows come from a server-side cursor, so memory use does not grow with
+    the size of the table. Pass the last id received as `after_id` to resume.
+    """
+    stmt = _row_select()
+    if status:
+        stmt = stmt.where(Property.status == status)
+    if after_id is not None:
+        stmt = stmt.where(Property.id > after_id)
+    stmt = stmt.order_by(Property.id).execution_options(yield_per=batch_size)
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        yield _to_rows(partition)
@@ -1,26 +1,36 @@
+from datetime import datetime
 from typing import Sequence
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
+from app.core.cache import principal_cache, response_cache
+from app.core.security import password_hasher
+from app.crud import crud_property
+from app.models.property import Property
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserUpdate
 
+# User fields shown on the listings they own (see PropertyAgent)
+LISTING_AGENT_FIELDS = {"name", "email", "phone"}
+
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
     result = await session.execute(select(User).where(User.email == email))
     return result.scalar_one_or_none()
 
 async def create_user(session: AsyncSession, user_in: UserCreate, role: UserRole = UserRole.AGENT) -> User:
-    db_user = User(
-        email=user_in.email,
-        password_hash=get_password_hash(user_in.password),
-        name=user_in.name,
-        phone=user_in.phone,
-        role=role
+    db_user = await session.scalar(
+        insert(User)
+        .values(
+            email=user_in.email,
+            password_hash=await password_hasher.hash(user_in.password),
+            name=user_in.name,
+            phone=user_in.phone,
+            role=role,
+        )
+        .returning(User)
     )
-    session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
     return db_user
 
 async def get_all_agents(session: AsyncSession) -> Sequence[User]:
@@ -31,23 +41,77 @@ async def update_user(session: AsyncSession, db_user: User, user_in: UserUpdate)
     if not update_data:
         return db_user
         
-    if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
-        del update_data["password"]
-        db_user.password_hash = hashed_password
-        
-    for field, value in update_data.items():
-        if hasattr(db_user, field):
-            setattr(db_user, field, value)
-            
-    session.add(db_user)
+    if "password" in update_data:
+        password = update_data.pop("password")
+        if password:
+            update_data["password_hash"] = await password_hasher.hash(password)
+
+    values = {field: value for field, value in update_data.items() if field in User.__table__.c}
+    if not values:
+        return db_user
+    profile_changed = any(
+        field in LISTING_AGENT_FIELDS and getattr(db_user, field) != value for field, value in values.items()
+    )
+
+    row = (await session.execute(
+        update(User)
+        .where(User.id == db_user.id)
+        .values(**values)
+        .returning(*User.__table__.c)
+        .execution_options(synchronize_session=False)
+    )).one()
+    for key, value in row._mapping.items():
+        set_committed_value(db_user, key, value)
+    principal_cache.invalidate(db_user.id)
+    if profile_changed:
+        # Listings embed the agent, so their ETags must change with the profile
+        await session.execute(
+            update(Property)
+            .where(Property.agent_id == db_user.id)
+            .values(updated_at=datetime.utcnow())
+        )
     await session.commit()
-    await session.refresh(db_user)
+    # Cached listings embed the agent's name and contact details
+    response_cache.invalidate_tags({f"agent:{db_user.id}"})
     return db_user
 
-async def delete_user(session: AsyncSession, db_user: User) -> None:
+async def set_password_hash(session: AsyncSession, db_user: User, password_hash: str) -> None:
+    """Store a new hash of the same password, e.g. at a new bcrypt cost."""
+    await session.execute(
+        update(User)
+        .where(User.id == db_user.id)
+        .values(password_hash=password_hash)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    set_committed_value(db_user, "password_hash", password_hash)
+    principal_cache.invalidate(db_user.id)
+
+async def delete_user(
+    session: AsyncSession, db_user: User, reassign_to: int | None = None, delete_listings: bool = False,
+) -> None:
+    """Delete a user with their listings moved to `reassign_to` or, if `delete_listings`, deleted.
+
+    Without either, the user must own no listings; ValueError otherwise.
+    Everything happens in one transaction, so a failure leaves both the user
+    and their listings as they were.
+    """
+    if reassign_to is not None and delete_listings:
+        raise ValueError("Pass at most one of reassign_to and delete_listings")
+    owned = crud_property.bulk_filter(agent_id=db_user.id)
+    if reassign_to is not None:
+        changes = await crud_property.bulk_reassign_uncommitted(session, owned, reassign_to)
+    elif delete_listings:
+        changes = await crud_property.bulk_delete_uncommitted(session, owned)
+    else:
+        if (await session.execute(select(Property.id).where(*owned).limit(1))).first():
+            raise ValueError("User still owns listings")
+        changes = []
     await session.delete(db_user)
     await session.commit()
+    crud_property.announce_changes(changes)
+    principal_cache.invalidate(db_user.id)
+    response_cache.invalidate_tags({f"agent:{db_user.id}"})
 
 async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
     result = await session.execute(select(User).where(User.id == user_id))
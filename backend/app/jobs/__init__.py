@@ -0,0 +1 @@
+"""Background job handlers; importing a module registers its handlers."""
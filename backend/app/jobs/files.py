@@ -0,0 +1,27 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import images, uploads
+from app.core.jobs import job_handler
+from app.core.storage import get_storage
+from app.crud import crud_image_blobs
+from app.jobs.names import COLLECT_BLOBS, DELETE_LISTING_FILES
+
+@job_handler(COLLECT_BLOBS, concurrency=1)
+async def collect_blobs(session: AsyncSession, payload: dict) -> None:
+    """Delete the files of blobs that are still unreferenced, with their derivatives."""
+    urls = payload["urls"]
+    collected = await crud_image_blobs.collect_blobs(session, [uploads.blob_digest(url) for url in urls])
+    keys = []
+    for url in urls:
+        if uploads.blob_digest(url) in collected:
+            key = uploads.storage_key(url)
+            keys += [*images.derivative_paths(key), key]
+    # Rows are only forgotten once their files are gone
+    await get_storage().delete(keys)
+    await session.commit()
+
+@job_handler(DELETE_LISTING_FILES, concurrency=1)
+async def delete_listing_files(session: AsyncSession, payload: dict) -> None:
+    """Remove the per-listing upload directories of deleted listings (pre-blob uploads)."""
+    for property_id in payload["property_ids"]:
+        await get_storage().delete_prefix(f"{property_id}/")
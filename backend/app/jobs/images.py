@@ -0,0 +1,39 @@
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import images, uploads
+from app.core.config import settings
+from app.core.jobs import job_handler
+from app.core.storage import get_storage
+from app.crud import crud_image_blobs, crud_property
+from app.jobs.names import RENDER_DERIVATIVES
+
+@job_handler(RENDER_DERIVATIVES, concurrency=settings.IMAGE_WORKERS)
+async def render_derivatives(session: AsyncSession, payload: dict) -> None:
+    """Render the responsive derivatives of newly stored blobs and show them on a listing."""
+    storage = get_storage()
+    blobs = await crud_image_blobs.get_blobs(session, payload["digests"])
+    urls = [uploads.blob_url(blob.digest, blob.ext) for blob in blobs]
+    keys = [uploads.storage_key(url) for url in urls]
+    entries = {}
+    async with AsyncExitStack() as stack:
+        # Rendering needs local files; remote storage is downloaded for the duration
+        paths = [await stack.enter_async_context(storage.local_copy(key)) for key in keys]
+        results = await images.generate_derivatives(paths)
+        for blob, key, path, result in zip(blobs, keys, paths, results):
+            # Undecodable files keep serving the original; anything else is retried
+            if isinstance(result, images.InvalidImageError):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            for derivative_key, derivative in zip(images.derivative_paths(key), images.derivative_paths(str(path))):
+                await storage.put_file(derivative_key, Path(derivative), uploads.CONTENT_TYPES[Path(derivative).suffix])
+            entries[blob.digest] = result
+    if not entries:
+        return
+    await crud_image_blobs.set_renditions(session, entries)
+    meta = {url: entries[blob.digest] for blob, url in zip(blobs, urls) if blob.digest in entries}
+    # The listing may be gone by now; the blobs are collected with their derivatives
+    await crud_property.set_image_meta(session, payload["property_id"], meta)
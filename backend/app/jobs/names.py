@@ -0,0 +1,4 @@
+# Job types, importable by the code that queues them without loading the handlers
+RENDER_DERIVATIVES = "images.render_derivatives"
+COLLECT_BLOBS = "files.collect_blobs"
+DELETE_LISTING_FILES = "files.delete_listing"
@@ -1,15 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 
 from app.api import router as api_router
+from app.core import images
 from app.core.config import settings
+from app.core.image_files import ImageFiles, RedirectFiles
+from app.core.jobs import job_worker
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.core.storage import LocalStorage, get_storage
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.jobs import files as file_jobs, images as image_jobs  # noqa: F401 - registers job handlers
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs left queued or running by the previous process are picked up here
+    job_worker.start()
+    yield
+    await job_worker.stop(grace_seconds=settings.JOB_SHUTDOWN_GRACE_SECONDS)
+    images.shutdown_executor()
+    password_hasher.shutdown()
+    await get_storage().close()
 
 app = FastAPI(
     title=settings.APP_NAME, 
     version=settings.APP_VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -21,12 +41,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Job-Id", "ETag", "Last-Modified", "Retry-After"],
+)
+
+# Reject oversized image uploads before the multipart body is spooled
+# (per-file limit times file count, plus room for the part headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=settings.UPLOAD_MAX_FILES * (settings.UPLOAD_MAX_FILE_SIZE + 64 * 1024),
 )
 
-# Static files for uploads (creating directory if not exists is good practice)
-import os
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Shed logins and password changes while bcrypt is saturated; clients retry shortly
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+# Uploaded images: content-hashed blobs are cached as immutable, with byte-range support.
+# With remote storage, /uploads redirects to the bucket instead.
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    storage.root.mkdir(parents=True, exist_ok=True)
+    app.mount("/uploads", ImageFiles(directory=storage.root), name="uploads")
+else:
+    app.mount("/uploads", RedirectFiles(storage.url), name="uploads")
 
 # Health Check
 @app.get("/api/health", tags=["health"])
@@ -1,2 +1,6 @@
 from .user import User, UserRole
-from .property import Property, PropertyType, PropertyStatus
\ No newline at end of file
+from .property import Property, PropertyType, PropertyStatus
+from .geo_cell import PropertyGeoCell
+from .job import Job, JobStatus
+from .image_blob import ImageBlob
+from .rate_limit import RateLimitCounter
\ No newline at end of file
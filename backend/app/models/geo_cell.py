@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Float
+
+from app.core.db.database import Base
+
+# Grid levels (Web Mercator tile zooms) that keep precomputed cluster cells
+CLUSTER_MIN_ZOOM = 3
+CLUSTER_MAX_ZOOM = 16
+# A map at zoom z is clustered on the grid at z + offset, i.e. 8x8 cells per
+# 256px tile, which keeps clusters about 32px apart on screen
+CLUSTER_ZOOM_OFFSET = 3
+
+class PropertyGeoCell(Base):
+    """Aggregate of the published listings inside one map tile."""
+    __tablename__ = "property_geo_cells"
+
+    zoom = Column(Integer, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    lat_sum = Column(Float, nullable=False, default=0.0)
+    lng_sum = Column(Float, nullable=False, default=0.0)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+
+    @property
+    def latitude(self) -> float:
+        return self.lat_sum / self.count
+
+    @property
+    def longitude(self) -> float:
+        return self.lng_sum / self.count
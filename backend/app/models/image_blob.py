@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+
+from app.core.db.database import Base
+
+class ImageBlob(Base):
+    """One stored image file, shared by every listing that uses the same content."""
+    __tablename__ = "image_blobs"
+
+    # SHA-256 of the file; the stored path is derived from it and `ext`
+    digest = Column(String(64), primary_key=True)
+    ext = Column(String(8), nullable=False)
+    size = Column(Integer, nullable=False)
+    # Number of listing image slots pointing at this blob; the files are
+    # collected some time after it drops to zero
+    refcount = Column(Integer, nullable=False, default=0)
+    # Display dimensions, from the header on upload
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Inline blurred preview (data URI) and derivative widths per size, once
+    # rendered (see app.core.images)
+    placeholder = Column(String, nullable=True)
+    widths = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, JSON, Index
+
+from app.core.db.database import Base
+
+class JobStatus(str, PyEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(Base):
+    """Unit of background work, run by the worker pool in app.core.jobs."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming: the oldest due job of a type with free capacity
+        Index("ix_jobs_status_type_run_at_id", "status", "type", "run_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(50), nullable=False)
+    payload = Column(JSON, default=dict)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    # Earliest time the job may (re)run; pushed back after each failure
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set while running; a stale value means the worker died mid-job
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
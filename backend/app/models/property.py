@@ -1,9 +1,11 @@
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Enum, ForeignKey, JSON, Index, event, func, literal_column
+from sqlalchemy.dialects import postgresql  # noqa: F401 - registers the typed tsvector functions
 from sqlalchemy.orm import relationship
 
 from app.core.db.database import Base
+from app.core.images import card_image, card_thumbnail, image_sets
 
 class PropertyType(str, PyEnum):
     HOUSE = "house"
@@ -18,6 +20,17 @@ class PropertyStatus(str, PyEnum):
 
 class Property(Base):
     __tablename__ = "properties"
+    __table_args__ = (
+        # Keyset pagination: equality filter first, then the sort key and id,
+        # so a page is a range read in order. The search filter columns trail
+        # the published-listing indexes, so filters are checked on the index
+        # entry without reading the (wide) table row; see test_search.
+        Index("ix_properties_status_created_at_id", "status", "created_at", "id",
+              "price", "surface", "bedrooms", "bathrooms", "property_type", "city"),
+        Index("ix_properties_status_price_id", "status", "price", "id",
+              "created_at", "surface", "bedrooms", "bathrooms", "property_type", "city"),
+        Index("ix_properties_agent_created_at_id", "agent_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -30,11 +43,152 @@ class Property(Base):
     bedrooms = Column(Integer, nullable=True)
     bathrooms = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     images = Column(JSON, default=list)  # List of image filenames
+    # Dimensions, placeholder and derivative widths per image path, see app.core.images
+    image_meta = Column(JSON, default=dict)
     status = Column(Enum(PropertyStatus), default=PropertyStatus.DRAFT, index=True)
     agent_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship
-    agent = relationship("User", back_populates="properties")
\ No newline at end of file
+    agent = relationship("User", back_populates="properties")
+
+    @property
+    def thumbnail(self) -> str | None:
+        return card_thumbnail(self.images, self.image_meta)
+
+    # Let listing grids reserve the card's space and paint its placeholder
+    @property
+    def thumbnail_width(self) -> int | None:
+        return (card_image(self.images, self.image_meta) or {}).get("width")
+
+    @property
+    def thumbnail_height(self) -> int | None:
+        return (card_image(self.images, self.image_meta) or {}).get("height")
+
+    @property
+    def thumbnail_placeholder(self) -> str | None:
+        return (card_image(self.images, self.image_meta) or {}).get("placeholder")
+
+    @property
+    def image_sets(self) -> list[dict]:
+        return image_sets(self.images, self.image_meta)
+
+    # Set on full-text and geo search results only; not persisted
+    search_rank = None
+    search_snippet = None
+    distance_km = None
+
+# Full-text search over the listing text. Postgres maintains a weighted GIN
+# expression index on its own; SQLite gets an external-content FTS5 table kept
+# in sync by triggers, so every insert/update/delete re-indexes only its row.
+FULLTEXT_CONFIG = literal_column("'english'::regconfig")
+
+def search_vector():
+    """Weighted tsvector over the searchable columns (Postgres only)."""
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(FULLTEXT_CONFIG, func.coalesce(column, literal_column("''"))), weight)
+
+    return (
+        weighted(Property.title, literal_column("'A'"))
+        .op("||")(weighted(Property.city, literal_column("'B'")))
+        .op("||")(weighted(Property.street, literal_column("'B'")))
+        .op("||")(weighted(Property.address, literal_column("'B'")))
+        .op("||")(weighted(Property.description, literal_column("'C'")))
+    )
+
+Property.__table__.append_constraint(
+    Index("ix_properties_search_vector", search_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+)
+
+SQLITE_FTS_TABLE = "properties_fts"
+SQLITE_FTS_COLUMNS = ("title", "description", "city", "street", "address")
+# bm25() weights, in SQLITE_FTS_COLUMNS order
+SQLITE_FTS_WEIGHTS = (10.0, 1.0, 4.0, 4.0, 4.0)
+
+def _sqlite_fts_ddl() -> list[str]:
+    cols = ", ".join(SQLITE_FTS_COLUMNS)
+    new_values = ", ".join(f"new.{c}" for c in SQLITE_FTS_COLUMNS)
+    old_values = ", ".join(f"old.{c}" for c in SQLITE_FTS_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5({cols}, "
+        f"content='properties', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER properties_fts_ai AFTER INSERT ON properties BEGIN {insert_new} END",
+        f"CREATE TRIGGER properties_fts_ad AFTER DELETE ON properties BEGIN {delete_old} END",
+        f"CREATE TRIGGER properties_fts_au AFTER UPDATE OF {cols} ON properties "
+        f"BEGIN {delete_old} {insert_new} END",
+        # Index rows that existed before the FTS table was added
+        f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+# Spatial index. SQLite gets an R*Tree of listing points kept in sync by
+# triggers; elsewhere a (status, latitude, longitude) B-tree narrows a
+# bounding box to a latitude band.
+SQLITE_RTREE_TABLE = "properties_rtree"
+
+Property.__table__.append_constraint(
+    Index("ix_properties_status_lat_lng", "status", "latitude", "longitude").ddl_if(dialect="postgresql")
+)
+
+def _sqlite_rtree_ddl() -> list[str]:
+    has_point = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+    insert_new = (
+        f"INSERT INTO {SQLITE_RTREE_TABLE} SELECT new.id, new.latitude, new.latitude, "
+        f"new.longitude, new.longitude WHERE {has_point};"
+    )
+    delete_old = f"DELETE FROM {SQLITE_RTREE_TABLE} WHERE id = old.id;"
+    return [
+        f"CREATE VIRTUAL TABLE {SQLITE_RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+        f"CREATE TRIGGER properties_rtree_ai AFTER INSERT ON properties BEGIN {insert_new} END",
+        f"CREATE TRIGGER properties_rtree_ad AFTER DELETE ON properties BEGIN {delete_old} END",
+        f"CREATE TRIGGER properties_rtree_au AFTER UPDATE OF latitude, longitude ON properties "
+        f"BEGIN {delete_old} {insert_new} END",
+        # Index rows that existed before the R*Tree was added
+        f"INSERT INTO {SQLITE_RTREE_TABLE} SELECT id, latitude, latitude, longitude, longitude "
+        f"FROM properties WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+    ]
+
+# Virtual tables and triggers that create_all knows nothing about
+_SQLITE_AUX_TABLES = {
+    SQLITE_FTS_TABLE: _sqlite_fts_ddl,
+    SQLITE_RTREE_TABLE: _sqlite_rtree_ddl,
+}
+# Also the prefix of their shadow tables
+SQLITE_AUX_TABLE_NAMES = tuple(_SQLITE_AUX_TABLES)
+
+def create_sqlite_aux_tables(connection) -> None:
+    """Create the virtual tables and triggers that are missing (SQLite only)."""
+    if connection.dialect.name != "sqlite":
+        return
+    for name, ddl in _SQLITE_AUX_TABLES.items():
+        exists = connection.exec_driver_sql(
+            f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{name}'"
+        ).first()
+        if not exists:
+            for statement in ddl():
+                connection.exec_driver_sql(statement)
+
+def drop_sqlite_aux_tables(connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    for name in _SQLITE_AUX_TABLES:
+        # The triggers live on properties, which may outlive the virtual table
+        for trigger in ("ai", "ad", "au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}_{trigger}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {name}")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_sqlite_aux_tables(target, connection, **kw):
+    create_sqlite_aux_tables(connection)
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_sqlite_aux_tables(target, connection, **kw):
+    drop_sqlite_aux_tables(connection)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+
+from app.core.db.database import Base
+
+class RateLimitCounter(Base):
+    """Hits on one rate-limit key in one fixed window (see app.core.rate_limit)."""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    # Unix time the window starts at, a multiple of the limiter's window length
+    window_start = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # Once the following window is over too, the row no longer counts
+    expires_at = Column(Integer, nullable=False, index=True)
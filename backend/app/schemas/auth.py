@@ -9,4 +9,19 @@ class TokenData(BaseModel):
 
 class Login(BaseModel):
     email: EmailStr
-    password: str
\ No newline at end of file
+    password: str
+
+class LatencyPercentiles(BaseModel):
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+class PasswordHashStats(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    completed: int
+    rejected: int
+    queue: LatencyPercentiles  # wait for a free thread
+    hash: LatencyPercentiles  # bcrypt itself
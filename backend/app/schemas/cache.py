@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+class CacheStats(BaseModel):
+    enabled: bool
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
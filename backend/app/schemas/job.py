@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+from app.models.job import JobStatus
+
+class JobRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    type: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    # Next attempt, while queued
+    run_at: datetime
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+class JobTypeStats(BaseModel):
+    type: str
+    queued: int = 0
+    running: int = 0
+    succeeded: int = 0
+    failed: int = 0
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Annotated, Optional, List
-from pydantic import BaseModel, ConfigDict, Field
+from functools import lru_cache
+from typing import Annotated, Dict, Literal, Optional, List
+from pydantic import BaseModel, ConfigDict, Field, create_model
 
 from app.models.property import PropertyType, PropertyStatus
 
@@ -16,6 +17,8 @@ class PropertyBase(BaseModel):
     bedrooms: Annotated[Optional[int], Field(ge=0, le=20, examples=[3])] = None
     bathrooms: Annotated[Optional[int], Field(ge=0, le=10, examples=[2])] = None
     description: Annotated[Optional[str], Field(max_length=5000)] = None
+    latitude: Annotated[Optional[float], Field(ge=-90, le=90, examples=[30.2672])] = None
+    longitude: Annotated[Optional[float], Field(ge=-180, le=180, examples=[-97.7431])] = None
 
 # Schema for creating properties (API input)
 class PropertyCreate(PropertyBase):
@@ -30,15 +33,131 @@ class PropertyAgent(BaseModel):
     phone: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
+# Responsive variants of one image, ready for <picture>/<img srcset>
+class PropertyImageSet(BaseModel):
+    src: str  # JPEG fallback, or the original when no derivatives exist
+    webp_srcset: str
+    jpeg_srcset: str
+    # Display size of the original, for width/height attributes (None if unknown)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # Tiny blurred preview as a data URI, to paint before the image loads
+    placeholder: Optional[str] = None
+
+# Direct-to-storage uploads: the client hashes each file, asks for upload URLs,
+# PUTs the bytes and then completes the upload with the same list
+class PropertyImageUpload(BaseModel):
+    filename: Annotated[str, Field(min_length=1, max_length=255)]
+    size: Annotated[int, Field(gt=0)]
+    sha256: Annotated[str, Field(pattern=r"^[0-9a-f]{64}$")]  # lowercase hex
+
+class PresignedImageUpload(BaseModel):
+    sha256: str
+    # None when the content is already stored and there is nothing to upload
+    url: Optional[str] = None
+    method: str = "PUT"
+    # Send exactly these headers with the upload
+    headers: Dict[str, str] = {}
+
 class PropertyRead(PropertyBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
     images: List[str]
+    image_sets: List[PropertyImageSet] = []
     status: PropertyStatus
     agent_id: int
     created_at: datetime
     updated_at: datetime
-    agent: PropertyAgent
+    # None when the listing's agent no longer exists
+    agent: Optional[PropertyAgent] = None
+
+# Compact card for listing grids: no description, agent or image list
+class PropertySummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: str
+    price: float
+    surface: float
+    city: str
+    property_type: PropertyType
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    thumbnail: Optional[str] = None
+    thumbnail_width: Optional[int] = None
+    thumbnail_height: Optional[int] = None
+    thumbnail_placeholder: Optional[str] = None
+    created_at: datetime
+
+SUMMARY_FIELDSET = "summary"
+
+@lru_cache(maxsize=64)
+def _sparse_schema(fields: tuple[str, ...]) -> type[BaseModel]:
+    return create_model(
+        "PropertyFields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (PropertyRead.model_fields[name].annotation, PropertyRead.model_fields[name]) for name in fields},
+    )
+
+def property_projection(fields: str | None) -> type[BaseModel] | None:
+    """Schema for a `fields=` query value: None (full PropertyRead), "summary",
+    or a comma-separated list of PropertyRead fields.
+
+    Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return None
+    if fields == SUMMARY_FIELDSET:
+        return PropertySummary
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - PropertyRead.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not names:
+        return None
+    return _sparse_schema(tuple(name for name in PropertyRead.model_fields if name in names))
+
+class PropertyImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class PropertyImportResult(BaseModel):
+    created: int
+    failed: int
+    # Capped; `failed` has the full count
+    errors: List[PropertyImportError]
+
+# Search results; `snippet` is HTML-escaped text with matches in <mark> tags
+class PropertySearchResult(PropertyRead):
+    snippet: Optional[str] = Field(default=None, validation_alias="search_snippet")
+
+# Geo search results; `distance_km` is measured from the search center
+class PropertyGeoResult(PropertyRead):
+    distance_km: Optional[float] = None
+
+# Precomputed map cluster; latitude/longitude is the centroid of its listings
+class PropertyCluster(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    count: int
+    latitude: float
+    longitude: float
+    min_price: float
+    max_price: float
+
+# Filter-bar counts over published listings
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class PriceBucketCount(BaseModel):
+    min: float
+    max: Optional[float] = None  # None for the open-ended top bucket
+    count: int
+
+class PropertyFacets(BaseModel):
+    cities: List[FacetCount]
+    property_types: List[FacetCount]
+    price_buckets: List[PriceBucketCount]
+
 # Schema for updating properties
 class PropertyUpdate(BaseModel):
     title: Optional[str] = None
@@ -51,5 +170,38 @@ class PropertyUpdate(BaseModel):
     bedrooms: Optional[int] = None
     bathrooms: Optional[int] = None
     description: Optional[str] = None
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
     status: Optional[PropertyStatus] = None
     images: Optional[List[str]] = None
+
+# Filters accepted by the published listings search
+class PropertySearchFilters(BaseModel):
+    city: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    surface_min: Optional[float] = None
+    surface_max: Optional[float] = None
+    bedrooms_min: Optional[int] = None
+    bathrooms_min: Optional[int] = None
+    property_types: Optional[List[PropertyType]] = None
+
+# Admin bulk operations: select listings by `ids` or by `filter`, not both
+class PropertyBulkFilter(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    agent_id: Optional[int] = None
+    city: Optional[str] = None
+    status: Optional[PropertyStatus] = None
+    property_type: Optional[PropertyType] = None
+
+class PropertyBulkAction(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    action: Literal["publish", "unpublish", "reassign", "delete"]
+    ids: Annotated[Optional[List[int]], Field(min_length=1, max_length=10000)] = None
+    filter: Optional[PropertyBulkFilter] = None
+    # New owner, for "reassign" only
+    agent_id: Optional[int] = None
+
+class PropertyBulkResult(BaseModel):
+    action: str
+    affected: int
@@ -0,0 +1,114 @@
+"""Measure image serving throughput of StaticFiles against ImageFiles.
+
+Usage: python scripts/bench_image_serving.py [--images 200] [--size-kb 120] [--requests 4000] [--clients 4]
+
+Both are mounted side by side in one app served by uvicorn on a local
+port, over the same directory of content-addressed files, and driven over
+real HTTP by client processes on keep-alive connections. Three kinds of
+traffic are measured: full downloads, revalidations (If-None-Match, as a
+browser or proxy does for files without long-lived caching) and ranged
+reads of the first 16 KiB. With ImageFiles a browser does not revalidate
+blob URLs at all while they are cached, which this benchmark cannot show.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from app.core.image_files import ImageFiles
+
+PORT = 8766
+
+def write_images(directory: Path, count: int, size_kb: int) -> list[str]:
+    paths = []
+    for _ in range(count):
+        data = os.urandom(size_kb * 1024)
+        digest = hashlib.sha256(data).hexdigest()
+        path = directory / "blobs" / digest[:2] / f"{digest}_gallery.webp"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        paths.append(path.relative_to(directory).as_posix())
+    return paths
+
+def fetch(base_url: str, prefix: str, paths: list[str], mode: str, requests: int) -> int:
+    """Issue `requests` requests from one client; returns the bytes received."""
+    received = 0
+    etags = {}
+    with httpx.Client(base_url=base_url, timeout=None) as client:
+        if mode == "revalidate":
+            for path in paths:
+                etags[path] = client.head(f"{prefix}/{path}").headers["etag"]
+        for _ in range(requests):
+            path = random.choice(paths)
+            headers = {}
+            if mode == "revalidate":
+                headers["If-None-Match"] = etags[path]
+            elif mode == "range":
+                headers["Range"] = "bytes=0-16383"
+            res = client.get(f"{prefix}/{path}", headers=headers)
+            expected = {"full": 200, "revalidate": 304, "range": 206 if prefix == "/uploads" else 200}[mode]
+            if res.status_code != expected:
+                raise RuntimeError(f"{prefix} {mode}: got {res.status_code}, expected {expected}")
+            received += len(res.content)
+    return received
+
+def run(base_url: str, prefix: str, paths: list[str], mode: str, requests: int, clients: int) -> tuple[float, float]:
+    with ProcessPoolExecutor(max_workers=clients) as pool:
+        # Warm up the worker processes before timing
+        list(pool.map(fetch, *zip(*[(base_url, prefix, paths[:1], "full", 1)] * clients)))
+        t0 = time.perf_counter()
+        received = sum(pool.map(fetch, *zip(*[(base_url, prefix, paths, mode, requests // clients)] * clients)))
+        elapsed = time.perf_counter() - t0
+    return (requests // clients * clients) / elapsed, received / elapsed / 1024 / 1024
+
+def main(images: int, size_kb: int, requests: int, clients: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_images(Path(directory), images, size_kb)
+        app = Starlette(routes=[
+            Mount("/static", StaticFiles(directory=directory)),
+            Mount("/uploads", ImageFiles(directory=directory)),
+        ])
+        server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning"))
+        thread = threading.Thread(target=server.run)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        base_url = f"http://127.0.0.1:{PORT}"
+        results = []
+        try:
+            for mode in ("full", "revalidate", "range"):
+                for label, prefix in (("StaticFiles", "/static"), ("ImageFiles", "/uploads")):
+                    results.append((mode, label, *run(base_url, prefix, paths, mode, requests, clients)))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    print(f"{images} images x {size_kb} KiB, {requests} requests from {clients} clients")
+    print(f"{'traffic':<12}{'server':<14}{'images/s':>10}{'MiB/s':>10}")
+    for mode, label, rate, throughput in results:
+        print(f"{mode:<12}{label:<14}{rate:>10.0f}{throughput:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=120)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--clients", type=int, default=4)
+    args = parser.parse_args()
+    main(args.images, args.size_kb, args.requests, args.clients)
@@ -0,0 +1,99 @@
+"""Measure bulk import throughput through POST /properties/import.
+
+Usage: python scripts/bench_import.py [--rows 50000] [--format ndjson|csv]
+
+Requests go through the ASGI app in-process against a fresh SQLite database,
+so the numbers cover parsing, validation, inserts, triggers and cluster cells.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.dependencies import get_current_user
+from app.core.db.database import Base, async_get_db
+from app.main import app
+from app.models.user import User, UserRole
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_import.db"
+CITIES = [("New York", 40.71, -74.0), ("Los Angeles", 34.05, -118.24), ("Austin", 30.27, -97.74)]
+FIELDS = ["title", "price", "surface", "city", "property_type", "bedrooms", "bathrooms",
+          "description", "latitude", "longitude", "status"]
+
+def make_rows(count: int) -> list[dict]:
+    rows = []
+    for i in range(count):
+        city, lat, lng = random.choice(CITIES)
+        rows.append({
+            "title": f"Imported Property {i}",
+            "price": random.randrange(50_000, 2_000_000, 500),
+            "surface": random.randrange(30, 400),
+            "city": city,
+            "property_type": random.choice(["house", "apartment", "condo"]),
+            "bedrooms": random.randint(0, 6),
+            "bathrooms": random.randint(1, 4),
+            "description": "Bright family home close to schools and parks.",
+            "latitude": lat + random.uniform(-0.2, 0.2),
+            "longitude": lng + random.uniform(-0.2, 0.2),
+            "status": "published" if i % 4 else "draft",
+        })
+    return rows
+
+def encode(rows: list[dict], body_format: str) -> bytes:
+    if body_format == "ndjson":
+        return "".join(json.dumps(row) + "\n" for row in rows).encode()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+async def main(rows: int, body_format: str) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as session:
+        agent = User(email="bench@realestate.pro", password_hash="x", name="Bench Agent", role=UserRole.AGENT)
+        session.add(agent)
+        await session.commit()
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[async_get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: agent
+    body = encode(make_rows(rows), body_format)
+    async with AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        res = await client.post("/api/v1/properties/import", params={"format": body_format}, content=body)
+        elapsed = time.perf_counter() - t0
+    app.dependency_overrides.clear()
+
+    res.raise_for_status()
+    result = res.json()
+    print(f"{result['created']} created, {result['failed']} failed in {elapsed:.2f}s "
+          f"({result['created'] / elapsed:,.0f} rows/s, {len(body) / 1024 / 1024:.1f} MiB {body_format})")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.format))
@@ -0,0 +1,160 @@
+"""Measure browse latency during a burst of logins, with bcrypt inline and in the pool.
+
+Usage: python scripts/bench_login_load.py [--seconds 10] [--login-clients 8] [--browse-clients 2]
+
+The app is served by uvicorn on a local port and driven over real HTTP by
+client processes: some log in as fast as they can, the others browse the
+published listings. "inline" runs bcrypt on the event loop as before, which
+stalls every other request while a hash is computed; "pool" is the default
+PasswordHasher, which also sheds logins with 503 once its queue is full.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.db.database import Base, async_get_db
+from app.core.security import get_password_hash, password_hasher
+from app.main import app
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_login_load.db"
+PORT = 8767
+USERS = 8
+PASSWORD = "bench-password"
+
+async def populate(session_maker: async_sessionmaker, listings: int) -> None:
+    password_hash = get_password_hash(PASSWORD)
+    async with session_maker() as session:
+        session.add_all([
+            User(email=f"agent{i}@bench.example.com", password_hash=password_hash, name=f"Agent {i}", role=UserRole.AGENT)
+            for i in range(USERS)
+        ])
+        await session.flush()
+        await session.execute(insert(Property), [{
+            "title": f"Bench Property {i}",
+            "price": float(random.randrange(50_000, 2_000_000, 500)),
+            "surface": 100.0,
+            "city": "Austin",
+            "property_type": PropertyType.HOUSE,
+            "status": PropertyStatus.PUBLISHED,
+            "agent_id": 1,
+            "images": [],
+        } for i in range(listings)])
+        await session.commit()
+
+def login_client(base_url: str, seconds: float, client_id: int) -> dict[int, int]:
+    """Log in repeatedly for `seconds`; returns response counts by status."""
+    statuses: dict[int, int] = {}
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(base_url=base_url, timeout=None) as client:
+        while time.perf_counter() < deadline:
+            res = client.post("/api/v1/auth/login", json={"email": f"agent{client_id % USERS}@bench.example.com", "password": PASSWORD})
+            statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+            if res.status_code == 503:
+                time.sleep(0.05)
+    return statuses
+
+def browse_client(base_url: str, seconds: float) -> list[float]:
+    """Fetch listing pages for `seconds`; returns each request's latency."""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(base_url=base_url, timeout=None) as client:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            client.get("/api/v1/properties/published", params={"limit": 20}).raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+    return latencies
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+def run(base_url: str, seconds: float, login_clients: int, browse_clients: int) -> tuple[list[float], dict[int, int]]:
+    with ProcessPoolExecutor(max_workers=login_clients + browse_clients) as pool:
+        logins = [pool.submit(login_client, base_url, seconds, i) for i in range(login_clients)]
+        browses = [pool.submit(browse_client, base_url, seconds) for _ in range(browse_clients)]
+        latencies = [latency for future in browses for latency in future.result()]
+        statuses: dict[int, int] = {}
+        for future in logins:
+            for code, count in future.result().items():
+                statuses[code] = statuses.get(code, 0) + count
+    return latencies, statuses
+
+async def _inline(func, *args):
+    return func(*args)
+
+def main(seconds: float, login_clients: int, browse_clients: int, listings: int) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await populate(session_maker, listings)
+    asyncio.run(setup())
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+    app.dependency_overrides[async_get_db] = override_get_db
+    # A single server process; the shared store would use the app's own database
+    settings.RATE_LIMIT_BACKEND = "memory"
+
+    server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{PORT}"
+    results = []
+    try:
+        for mode in ("idle", "inline", "pool"):
+            # Instance attribute shadows the pooled implementation
+            if mode == "inline":
+                password_hasher._run = _inline
+            else:
+                password_hasher.__dict__.pop("_run", None)
+            latencies, statuses = run(base_url, seconds, 0 if mode == "idle" else login_clients, browse_clients)
+            results.append((mode, latencies, statuses))
+    finally:
+        server.should_exit = True
+        thread.join()
+        app.dependency_overrides.clear()
+        os.remove(BENCH_DATABASE_URL.split("///")[1])
+
+    print(f"{login_clients} login + {browse_clients} browse clients for {seconds:.0f}s each, "
+          f"{password_hasher.workers} hash threads, {password_hasher.max_pending} max pending")
+    print(f"{'bcrypt':<8}{'browse/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'logins/s':>10}{'503/s':>8}")
+    for mode, latencies, statuses in results:
+        print(
+            f"{mode:<8}{len(latencies) / seconds:>10.0f}"
+            f"{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}{percentile(latencies, 0.99):>9.1f}"
+            f"{statuses.get(200, 0) / seconds:>10.1f}{statuses.get(503, 0) / seconds:>8.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--login-clients", type=int, default=8)
+    parser.add_argument("--browse-clients", type=int, default=2)
+    parser.add_argument("--listings", type=int, default=500)
+    args = parser.parse_args()
+    main(args.seconds, args.login_clients, args.browse_clients, args.listings)
@@ -0,0 +1,105 @@
+"""Compare OFFSET and keyset (cursor) pagination on a large published catalogue.
+
+Usage: python scripts/bench_pagination.py [--rows 1000000] [--page 5000] [--page-size 20]
+
+The benchmark database is written to data/bench_pagination.db and reused on
+later runs when it already holds the requested number of rows.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db.database import Base
+from app.crud import crud_property
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_pagination.db"
+
+async def populate(session: AsyncSession, rows: int) -> None:
+    count = await session.scalar(select(func.count(Property.id)))
+    if count == rows:
+        return
+    await session.execute(Property.__table__.delete())
+    await session.execute(User.__table__.delete())
+    agent = User(email="bench@realestate.pro", password_hash="x", name="Bench Agent", role=UserRole.AGENT)
+    session.add(agent)
+    await session.flush()
+
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "title": f"Bench Property {i}",
+            "price": float(random.randrange(50_000, 2_000_000, 500)),
+            "surface": 100.0,
+            "city": random.choice(["New York", "Los Angeles", "Austin", "Chicago"]),
+            "property_type": PropertyType.HOUSE,
+            "status": PropertyStatus.PUBLISHED if i % 10 else PropertyStatus.DRAFT,
+            "agent_id": agent.id,
+            "images": [],
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i),
+        })
+        if len(batch) == 10_000:
+            await session.execute(insert(Property), batch)
+            batch = []
+    if batch:
+        await session.execute(insert(Property), batch)
+    await session.commit()
+
+async def timed(coro_factory, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await coro_factory()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+async def main(rows: int, page: int, page_size: int) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as session:
+        print(f"Populating {rows} rows (skipped if already present)...")
+        await populate(session, rows)
+
+        print(f"{'sort':<12}{'page':>8}{'offset ms':>12}{'keyset ms':>12}")
+        for sort in ("newest", "price_asc", "price_desc"):
+            # Cursor pointing at the last row of the page before the one measured
+            for page_no in (1, page):
+                skip = (page_no - 1) * page_size
+                cursor = None
+                if skip:
+                    previous = await crud_property.get_multi_published(session, sort=sort, skip=skip - 1, limit=1)
+                    cursor = crud_property.next_cursor(previous, sort, 1)
+
+                offset_ms = await timed(lambda: crud_property.get_multi_published(
+                    session, sort=sort, skip=skip, limit=page_size))
+                keyset_ms = await timed(lambda: crud_property.get_multi_published(
+                    session, sort=sort, cursor=cursor, limit=page_size))
+                session.expunge_all()
+                print(f"{sort:<12}{page_no:>8}{offset_ms:>12.2f}{keyset_ms:>12.2f}")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=5_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.page, args.page_size))
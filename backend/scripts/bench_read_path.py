@@ -0,0 +1,103 @@
+"""Compare the ORM + pydantic and Core + orjson read paths for listing pages.
+
+Usage: python scripts/bench_read_path.py [--sizes 100 10000] [--repeat 5]
+
+Each path fetches and serializes one page of published listings. Reports the
+best rows/sec over `repeat` runs and the peak traced memory of a single run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db.database import Base
+from app.crud import crud_property, crud_property_rows
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+from app.schemas.property import PropertyRead
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_read_path.db"
+
+_property_list = TypeAdapter(list[PropertyRead])
+
+async def populate(session: AsyncSession, rows: int) -> None:
+    count = await session.scalar(select(func.count(Property.id)))
+    if count >= rows:
+        return
+    await session.execute(Property.__table__.delete())
+    await session.execute(User.__table__.delete())
+    agent = User(email="bench@realestate.pro", password_hash="x", name="Bench Agent", phone="555-0100", role=UserRole.AGENT)
+    session.add(agent)
+    await session.flush()
+    await session.execute(insert(Property), [{
+        "title": f"Bench Property {i}",
+        "price": float(random.randrange(50_000, 2_000_000, 500)),
+        "surface": 100.0,
+        "city": "Austin",
+        "street": "Congress Ave",
+        "property_type": PropertyType.HOUSE,
+        "bedrooms": 3,
+        "bathrooms": 2,
+        "description": "Bright family home close to schools and parks. " * 10,
+        "images": [f"/uploads/properties/{i}/{n}.jpg" for n in range(5)],
+        "status": PropertyStatus.PUBLISHED,
+        "agent_id": agent.id,
+    } for i in range(rows)])
+    await session.commit()
+
+async def orm_path(session: AsyncSession, limit: int) -> bytes:
+    items = await crud_property.get_multi_published(session, limit=limit)
+    body = _property_list.dump_json(_property_list.validate_python(items, from_attributes=True))
+    session.expunge_all()
+    return body
+
+async def core_path(session: AsyncSession, limit: int) -> bytes:
+    rows = await crud_property_rows.get_multi_published_rows(session, limit=limit)
+    return crud_property_rows.dump_rows(rows)
+
+async def measure(path, session: AsyncSession, limit: int, repeat: int) -> tuple[float, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await path(session, limit)
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    await path(session, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return limit / best, peak / 1024 / 1024
+
+async def main(sizes: list[int], repeat: int) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as session:
+        await populate(session, max(sizes))
+        print(f"{'rows':>8}{'path':>8}{'rows/s':>12}{'peak MiB':>10}")
+        for size in sizes:
+            for name, path in (("orm", orm_path), ("core", core_path)):
+                rate, peak = await measure(path, session, size, repeat)
+                print(f"{size:>8}{name:>8}{rate:>12.0f}{peak:>10.1f}")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
@@ -0,0 +1,108 @@
+"""Measure public read throughput with the response cache on and off.
+
+Usage: python scripts/bench_response_cache.py [--listings 2000] [--requests 2000]
+
+Requests go through the ASGI app in-process, so the numbers cover routing,
+the database and serialization but no network.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.db.database import Base, async_get_db
+from app.core.rate_limit import published_rate_limiter
+from app.main import app
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_response_cache.db"
+CITIES = ["New York", "Los Angeles", "Austin", "Chicago"]
+
+async def populate(session: AsyncSession, listings: int) -> list[int]:
+    agent = User(email="bench@realestate.pro", password_hash="x", name="Bench Agent", role=UserRole.AGENT)
+    session.add(agent)
+    await session.flush()
+    result = await session.execute(insert(Property).returning(Property.id), [{
+        "title": f"Bench Property {i}",
+        "price": float(random.randrange(50_000, 2_000_000, 500)),
+        "surface": 100.0,
+        "city": random.choice(CITIES),
+        "property_type": PropertyType.HOUSE,
+        "status": PropertyStatus.PUBLISHED,
+        "agent_id": agent.id,
+        "images": [],
+    } for i in range(listings)])
+    ids = list(result.scalars())
+    await session.commit()
+    return ids
+
+def request_mix(ids: list[int], count: int) -> list[tuple[str, dict]]:
+    """Skewed traffic: a few popular listings and the first pages of each city."""
+    popular = ids[:50]
+    mix = []
+    for _ in range(count):
+        if random.random() < 0.5:
+            mix.append((f"/api/v1/properties/{random.choice(popular)}", {}))
+        else:
+            mix.append(("/api/v1/properties/published", {"city": random.choice(CITIES), "limit": 20}))
+    return mix
+
+async def run(client: AsyncClient, mix: list[tuple[str, dict]]) -> float:
+    t0 = time.perf_counter()
+    for path, params in mix:
+        res = await client.get(path, params=params)
+        res.raise_for_status()
+    return len(mix) / (time.perf_counter() - t0)
+
+async def main(listings: int, requests: int) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as session:
+        ids = await populate(session, listings)
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[async_get_db] = override_get_db
+    # A single server process; the shared store would use the app's own database
+    settings.RATE_LIMIT_BACKEND = "memory"
+    # Every request comes from one client address
+    published_rate_limiter.max_attempts = 10 ** 9
+    mix = request_mix(ids, requests)
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        response_cache.enabled = False
+        uncached = await run(client, mix)
+        response_cache.enabled = True
+        response_cache.clear()
+        cached = await run(client, mix)
+    app.dependency_overrides.clear()
+
+    stats = response_cache.stats()
+    print(f"cache off: {uncached:8.0f} req/s")
+    print(f"cache on:  {cached:8.0f} req/s  (hit ratio {stats['hit_ratio']:.1%}, {stats['entries']} entries)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.listings, args.requests))
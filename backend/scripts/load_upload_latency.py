@@ -0,0 +1,161 @@
+"""Measure published listing latency with and without concurrent image uploads.
+
+Usage: python scripts/load_upload_latency.py [--uploads 8] [--files 4] [--size-mb 8] [--requests 200]
+
+The app is served by uvicorn on a local port in a background thread and
+driven over real HTTP: uploads from worker processes, listing requests from
+the main thread. Any upload work done on the server's event loop therefore shows
+up as listing latency. The response cache is disabled to keep every listing
+request on the database path. Image derivatives are rendered by the
+server's job worker while the test runs. Uploaded files go to a temporary
+directory.
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from PIL import Image
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.dependencies import get_current_user
+from app.core import storage
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.db.database import Base, async_get_db
+from app.core.jobs import job_worker
+from app.main import app
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./data/bench_uploads.db"
+PORT = 8765
+
+async def populate(engine, listings: int) -> User:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        agent = User(email="bench@realestate.pro", password_hash="x", name="Bench Agent", role=UserRole.AGENT)
+        session.add(agent)
+        await session.flush()
+        await session.execute(insert(Property), [{
+            "title": f"Bench Property {i}", "price": 100_000.0 + i, "surface": 80.0, "city": "Austin",
+            "property_type": PropertyType.HOUSE, "status": PropertyStatus.PUBLISHED,
+            "agent_id": agent.id, "images": [],
+        } for i in range(listings)])
+        await session.commit()
+    # Connections are bound to this loop; the server opens its own
+    await engine.dispose()
+    return agent
+
+def noise_jpeg(size_mb: int) -> bytes:
+    """A JPEG of random pixels, about `size_mb` MiB (noise barely compresses)."""
+    side = int((size_mb * 1024 * 1024 / 0.9) ** 0.5)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def upload(base_url: str, property_id: int, payload: bytes, files: int) -> None:
+    with httpx.Client(base_url=base_url, timeout=None) as client:
+        res = client.post(
+            f"/api/v1/properties/{property_id}/images",
+            files=[("files", (f"{n}.jpg", payload, "image/jpeg")) for n in range(files)],
+        )
+        if res.status_code != 200:
+            raise RuntimeError(f"Upload failed with {res.status_code}: {res.text}")
+
+def listing_latencies(client: httpx.Client, count: int, stop: threading.Event | None = None) -> list[float]:
+    latencies = []
+    while len(latencies) < count or (stop is not None and not stop.is_set()):
+        t0 = time.perf_counter()
+        client.get("/api/v1/properties/published", params={"limit": 20}).raise_for_status()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+def summary(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<18}{len(ordered):>8}{statistics.median(ordered):>10.2f}{p95:>10.2f}{ordered[-1]:>10.2f}")
+
+def main(uploads: int, files: int, size_mb: int, requests: int) -> None:
+    os.makedirs("data", exist_ok=True)
+    engine = create_async_engine(BENCH_DATABASE_URL, echo=False)
+    agent = asyncio.run(populate(engine, max(uploads, 100)))
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[async_get_db] = override_get_db
+    # A single server process; the shared store would use the app's own database
+    settings.RATE_LIMIT_BACKEND = "memory"
+    app.dependency_overrides[get_current_user] = lambda: agent
+    # Derivatives are rendered by the server's job worker, against the bench database
+    job_worker.session_factory = session_maker
+    response_cache.enabled = False
+    base_url = f"http://127.0.0.1:{PORT}"
+    payload = noise_jpeg(size_mb)
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        storage._storage = storage.LocalStorage(Path(upload_dir))
+        server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning"))
+        thread = threading.Thread(target=server.run)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        try:
+            with httpx.Client(base_url=base_url, timeout=None) as client:
+                listing_latencies(client, 20)
+                idle = listing_latencies(client, requests)
+
+                stop = threading.Event()
+
+                def run_uploads() -> float:
+                    t0 = time.perf_counter()
+                    try:
+                        with ProcessPoolExecutor(max_workers=uploads) as pool:
+                            jobs = [(base_url, property_id, payload, files) for property_id in range(1, uploads + 1)]
+                            list(pool.map(upload, *zip(*jobs)))
+                    finally:
+                        stop.set()
+                    return time.perf_counter() - t0
+
+                with ThreadPoolExecutor(max_workers=1) as runner:
+                    done = runner.submit(run_uploads)
+                    loaded = listing_latencies(client, requests, stop)
+                    upload_seconds = done.result()
+        finally:
+            server.should_exit = True
+            thread.join()
+    app.dependency_overrides.clear()
+
+    file_mb = len(payload) / 1024 / 1024
+    print(f"{uploads} uploads x {files} files x {file_mb:.1f} MiB = {uploads * files * file_mb:.0f} MiB in {upload_seconds:.2f}s")
+    print(f"{'listing':<18}{'requests':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    summary("idle", idle)
+    summary("during uploads", loaded)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    main(args.uploads, args.files, args.size_mb, args.requests)
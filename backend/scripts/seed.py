@@ -7,9 +7,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import select
 from app.core.db.database import async_session_maker, create_tables
+from pathlib import Path
+from app.core import images, uploads
+from app.core.jobs import job_worker
+from app.core.storage import LocalStorage, get_storage
+from app.crud import crud_image_blobs, crud_jobs
+from app.jobs import images as image_jobs  # noqa: F401 - registers the render handler
+from app.jobs.names import RENDER_DERIVATIVES
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.models.property import Property, PropertyType, PropertyStatus
+from app.crud.crud_geo_cells import rebuild_geo_cells
 import bcrypt
 import httpx
 import random
@@ -20,7 +28,9 @@ def hash_password(password: str) -> str:
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8')
 
-async def download_image(client: httpx.AsyncClient, path: str, type_str: str):
+DUMMY_JPEG = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x01\x00H\x00H\x00\x00\xff\xdb\x00C\x00\xff\xc0\x00\x0b\x08\x00\x01\x00\x01\x01\x01\x11\x00\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x03\xff\xda\x00\x08\x01\x01\x00\x00\x00?\x00\xff\xd9'
+
+async def download_image(client: httpx.AsyncClient, type_str: str) -> bytes:
     # Use loremflickr or similar for real-looking images
     # keywords: house, architecture, apartment, modern home
     keywords = ["house", "apartment", "home", "modern architecture", "villa"]
@@ -31,15 +41,12 @@ async def download_image(client: httpx.AsyncClient, path: str, type_str: str):
         # Add random parameter to prevent caching identical images
         resp = await client.get(url, follow_redirects=True, params={"random": random.random()})
         if resp.status_code == 200:
-            with open(path, "wb") as f:
-                f.write(resp.content)
-        else:
-            # Fallback to creating a dummy if download fails
-            print(f"Failed download {url}, creating dummy.")
-            with open(path, "wb") as f:
-                 f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x01\x00H\x00H\x00\x00\xff\xdb\x00C\x00\xff\xc0\x00\x0b\x08\x00\x01\x00\x01\x01\x01\x11\x00\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x03\xff\xda\x00\x08\x01\x01\x00\x00\x00?\x00\xff\xd9')
+            return resp.content
+        # Fallback to a dummy if download fails
+        print(f"Failed download {url}, using dummy.")
     except Exception as e:
         print(f"Error downloading {url}: {e}")
+    return DUMMY_JPEG
 
 # Removed create_dummy_images as logic is moved inside seed()
 
@@ -95,10 +102,14 @@ async def seed():
         
         if not existing_property:
             print("Creating 10 properties...")
-            base_upload_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+            storage = get_storage()
+            if isinstance(storage, LocalStorage):
+                storage.root = Path(__file__).resolve().parent.parent / "uploads"
             
             for i in range(1, 11):
                 prop_type = PropertyType.APARTMENT if i % 2 == 0 else PropertyType.HOUSE
+                # Spread listings around the city center so map views have something to show
+                center_lat, center_lng = (40.7128, -74.0060) if i % 2 == 0 else (34.0522, -118.2437)
                 
                 # Create property without images first
                 prop = Property(
@@ -107,6 +118,8 @@ async def seed():
                     surface=80 + (i * 10),
                     city="New York" if i % 2 == 0 else "Los Angeles",
                     address=f"{i}00 Main St, Apt {i}",
+                    latitude=center_lat + (i - 5) * 0.01,
+                    longitude=center_lng + (i % 3 - 1) * 0.01,
                     property_type=prop_type,
                     bedrooms=2 + (i % 3),
                     bathrooms=1 + (i % 2),
@@ -119,26 +132,38 @@ async def seed():
                 await session.flush()
                 await session.refresh(prop)
                 
-                # Create images for this property
-                prop_dir = os.path.join(base_upload_dir, str(prop.id))
-                os.makedirs(prop_dir, exist_ok=True)
-                
-                img_paths = []
+                # Create images for this property; identical downloads (e.g. dummies) are stored once
+                blobs = []
                 async with httpx.AsyncClient() as client:
                     for j in range(1, 4):
-                        img_filename = f"image_{j}.jpg"
-                        img_real_path = os.path.join(prop_dir, img_filename)
                         print(f"Downloading image {j} for property {i}...")
-                        await download_image(client, img_real_path, prop_type.value)
-                        img_paths.append(f"uploads/{prop.id}/{img_filename}")
+                        data = await download_image(client, prop_type.value)
+                        blobs.append(await uploads.write_blob(data, ".jpg"))
                 
-                prop.images = img_paths
+                entries = await crud_image_blobs.add_references(session, blobs)
+                prop.images = [blob.url for blob in blobs]
+                prop.image_meta = {blob.url: entries[blob.digest] for blob in blobs}
                 session.add(prop)
+                # Derivatives are rendered by the same job as for uploads, below
+                unrendered = sorted({blob.digest for blob in blobs if "widths" not in entries[blob.digest]})
+                if unrendered:
+                    await crud_jobs.add_jobs(session, [{
+                        "type": RENDER_DERIVATIVES,
+                        "payload": {"property_id": prop.id, "digests": unrendered},
+                    }])
             
             await session.commit()
             print("10 Properties created successfully.")
+
+            print("Rendering image derivatives...")
+            await job_worker.run_pending()
+
+            print("Building map clusters...")
+            await rebuild_geo_cells(session)
         else:
             print("Properties already exist.")
+    images.shutdown_executor()
+    await get_storage().close()
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
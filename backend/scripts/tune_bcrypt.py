@@ -0,0 +1,36 @@
+"""Choose the bcrypt cost for this machine.
+
+Usage: python scripts/tune_bcrypt.py [--target-ms 100]
+
+Prints how long one hash takes at each cost and the highest cost within the
+target, as the BCRYPT_ROUNDS line to put in .env. Run it on the production
+hardware and give every process the same setting; passwords hashed at
+another cost are rehashed as users log in.
+"""
+import argparse
+import os
+import sys
+
+# Add backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.security import MAX_BCRYPT_ROUNDS, MIN_BCRYPT_ROUNDS, time_bcrypt, tune_bcrypt_rounds
+
+def main(target_ms: float) -> None:
+    print(f"{'rounds':>6}{'ms':>10}")
+    for rounds in range(MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS + 1):
+        elapsed = time_bcrypt(rounds) * 1000
+        print(f"{rounds:>6}{elapsed:>10.1f}")
+        # Each round doubles the time; stop well past the target
+        if elapsed > target_ms * 2:
+            break
+    rounds = tune_bcrypt_rounds(target_ms)
+    if rounds == MIN_BCRYPT_ROUNDS and time_bcrypt(rounds) * 1000 > target_ms:
+        print(f"# even the minimum cost takes more than {target_ms:.0f} ms here")
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=100)
+    args = parser.parse_args()
+    main(args.target_ms)
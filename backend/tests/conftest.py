@@ -1,11 +1,19 @@
+from contextlib import asynccontextmanager
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.main import app
-from app.core.db.database import Base, async_get_db
+from app.core.db.database import Base, async_get_db, async_get_session_maker
 from app.core.config import settings
+from app.core.cache import principal_cache, response_cache
+from app.core.facets import facet_counts
+from app.core.rate_limit import get_rate_limit_store
+from app.core.jobs import JobWorker
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
 
 # Use a separate test database
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./data/test.db"
@@ -13,11 +21,21 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///./data/test.db"
 engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True)
 TestingSessionLocal = async_sessionmaker(expire_on_commit=False, class_=AsyncSession, bind=engine)
 
+# Tests need working hashes, not slow ones
+settings.BCRYPT_ROUNDS = 4
+# Tests run in one process, and the shared store would write through its own connection
+settings.RATE_LIMIT_BACKEND = "memory"
+
 @pytest_asyncio.fixture
 async def db_session():
     """Get a database session for a test."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # In-process caches must not outlive the database they were filled from
+    facet_counts.invalidate()
+    response_cache.clear()
+    principal_cache.clear()
+    await get_rate_limit_store().clear()
     
     async with TestingSessionLocal() as session:
         yield session
@@ -31,7 +49,51 @@ async def client(db_session):
     async def override_get_db():
         yield db_session
     
+    @asynccontextmanager
+    async def session_maker():
+        yield db_session
+
     app.dependency_overrides[async_get_db] = override_get_db
+    app.dependency_overrides[async_get_session_maker] = lambda: session_maker
     async with AsyncClient(app=app, base_url="http://test") as c:
         yield c
     app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def run_jobs(db_session):
+    """Run every due background job against the test session; returns how many ran."""
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    return JobWorker(session_factory, max_workers=1, poll_seconds=0, lease_seconds=60).run_pending
+
+
+@pytest.fixture
+def create_user(db_session):
+    """Add a user straight to the database; returns it."""
+    async def create(email, password="pass", role=UserRole.AGENT, name="Test User"):
+        user = User(email=email, password_hash=get_password_hash(password), name=name, role=role)
+        db_session.add(user)
+        await db_session.commit()
+        await db_session.refresh(user)
+        return user
+    return create
+
+@pytest.fixture
+def login(client):
+    """Log in through the API; returns the Authorization header."""
+    async def log_in(email, password="pass"):
+        res = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+        assert res.status_code == 200, res.text
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+    return log_in
+
+@pytest.fixture
+def auth_headers(create_user, login):
+    """Create a user and log in as them; returns the Authorization header."""
+    async def create_and_log_in(email, role=UserRole.AGENT, password="pass"):
+        await create_user(email, password, role)
+        return await login(email, password)
+    return create_and_log_in
@@ -96,4 +96,171 @@ async def test_get_agents(client, db_session):
     assert len(data) >= 2
     # Ensure all are agents
     for agent in data:
-        assert agent["role"] == "agent"
\ No newline at end of file
+        assert agent["role"] == "agent"
+
+@pytest.mark.asyncio
+async def test_export_properties_streams_and_resumes(client, db_session, monkeypatch):
+    import csv
+    import io
+    import json
+    from app.api.v1 import admin
+    from app.models.property import Property, PropertyStatus, PropertyType
+
+    await create_user(db_session, "admin_export@test.com", "admin123", UserRole.ADMIN)
+    agent = await create_user(db_session, "agent_export@test.com", "123", UserRole.AGENT)
+    for i in range(5):
+        db_session.add(Property(
+            title=f"Export, \"Property\" {i}",
+            price=100000 + i,
+            surface=50,
+            city="Export City",
+            property_type=PropertyType.HOUSE,
+            images=["/uploads/a.jpg", "/uploads/b.jpg"] if i == 0 else [],
+            status=PropertyStatus.PUBLISHED if i % 2 else PropertyStatus.DRAFT,
+            agent_id=agent.id,
+        ))
+    await db_session.commit()
+    # Several chunks even for a handful of rows
+    monkeypatch.setattr(admin, "EXPORT_BATCH_SIZE", 2)
+
+    login_res = await client.post("/api/v1/auth/login", json={"email": "admin_export@test.com", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    res = await client.get("/api/v1/admin/properties/export", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(ids) and len(ids) == 5
+    assert rows[0]["images"] == ["/uploads/a.jpg", "/uploads/b.jpg"]
+    assert rows[0]["agent"]["email"] == "agent_export@test.com"
+
+    res = await client.get("/api/v1/admin/properties/export", params={"after_id": ids[1]}, headers=headers)
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == ids[2:]
+
+    res = await client.get("/api/v1/admin/properties/export", params={"format": "csv", "status": "published"}, headers=headers)
+    assert res.headers["content-type"].startswith("text/csv")
+    records = list(csv.DictReader(io.StringIO(res.text)))
+    assert [int(r["id"]) for r in records] == [ids[1], ids[3]]
+    assert records[0]["title"] == 'Export, "Property" 1'
+    assert records[0]["status"] == "published"
+    assert records[0]["agent_email"] == "agent_export@test.com"
+
+    res = await client.get("/api/v1/admin/properties/export", params={"format": "csv", "after_id": ids[-1]}, headers=headers)
+    assert res.text.splitlines() == [",".join(admin.property_io.CSV_COLUMNS)]
+
+@pytest.mark.asyncio
+async def test_bulk_property_operations(client, db_session, monkeypatch):
+    from sqlalchemy import select
+    from app.crud import crud_geo_cells
+    from app.crud.crud_geo_cells import rebuild_geo_cells
+    from app.models.geo_cell import PropertyGeoCell
+    from app.models.property import Property, PropertyStatus, PropertyType
+
+    await create_user(db_session, "admin_bulk@test.com", "admin123", UserRole.ADMIN)
+    agent_a = await create_user(db_session, "agent_bulk_a@test.com", "123", UserRole.AGENT)
+    agent_b = await create_user(db_session, "agent_bulk_b@test.com", "123", UserRole.AGENT)
+    for i in range(6):
+        db_session.add(Property(
+            title=f"Bulk Property {i}",
+            price=100000 + i * 1000,
+            surface=50,
+            city="Bulk City" if i < 4 else "Other City",
+            property_type=PropertyType.HOUSE,
+            latitude=30.0 + i * 0.01,
+            longitude=-97.0,
+            status=PropertyStatus.DRAFT,
+            agent_id=agent_a.id,
+        ))
+    await db_session.commit()
+    ids = list((await db_session.execute(select(Property.id).order_by(Property.id))).scalars())
+    # Exercise the recompute path for bulk removals
+    monkeypatch.setattr(crud_geo_cells, "REBUILD_THRESHOLD", 1)
+
+    login_res = await client.post("/api/v1/auth/login", json={"email": "admin_bulk@test.com", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    bulk = lambda body: client.post("/api/v1/admin/properties/bulk", json=body, headers=headers)
+
+    res = await bulk({"action": "publish", "filter": {"city": "Bulk City"}})
+    assert res.json() == {"action": "publish", "affected": 4}
+    assert len((await client.get("/api/v1/properties/published")).json()) == 4
+    # Already published listings are not touched again
+    assert (await bulk({"action": "publish", "ids": ids[:2]})).json()["affected"] == 0
+
+    res = await bulk({"action": "unpublish", "ids": ids[:2]})
+    assert res.json()["affected"] == 2
+    published = (await client.get("/api/v1/properties/published")).json()
+    assert sorted(p["id"] for p in published) == ids[2:4]
+    facets = (await client.get("/api/v1/properties/published/facets")).json()
+    assert facets["cities"] == [{"value": "Bulk City", "count": 2}]
+
+    res = await bulk({"action": "reassign", "filter": {"agent_id": agent_a.id, "status": "published"}, "agent_id": agent_b.id})
+    assert res.json()["affected"] == 2
+    assert {p["agent"]["email"] for p in (await client.get("/api/v1/properties/published")).json()} == {"agent_bulk_b@test.com"}
+
+    res = await bulk({"action": "delete", "ids": [ids[2], ids[5]]})
+    assert res.json()["affected"] == 2
+    assert [p["id"] for p in (await client.get("/api/v1/properties/published")).json()] == [ids[3]]
+
+    # Cluster cells match a full rebuild after the bulk writes
+    cells = lambda: db_session.execute(select(PropertyGeoCell).order_by(PropertyGeoCell.zoom, PropertyGeoCell.cell_x, PropertyGeoCell.cell_y))
+    incremental = [(c.zoom, c.cell_x, c.cell_y, c.count, c.min_price) for c in (await cells()).scalars()]
+    await rebuild_geo_cells(db_session)
+    db_session.expunge_all()
+    assert incremental == [(c.zoom, c.cell_x, c.cell_y, c.count, c.min_price) for c in (await cells()).scalars()]
+
+    assert (await bulk({"action": "delete", "filter": {}})).status_code == 400
+    assert (await bulk({"action": "delete", "ids": ids, "filter": {"city": "Bulk City"}})).status_code == 400
+    assert (await bulk({"action": "reassign", "ids": ids})).status_code == 400
+
+    # Deleting an agent moves or deletes their listings, as the admin explicitly asks
+    url = f"/api/v1/admin/agents/{agent_b.id}"
+    assert (await client.delete(url, headers=headers)).status_code == 400
+    res = await client.delete(url, params={"reassign_to": agent_a.id, "delete_listings": True}, headers=headers)
+    assert res.status_code == 400
+    res = await client.delete(url, params={"reassign_to": agent_a.id}, headers=headers)
+    assert res.status_code == 204
+    assert (await client.get("/api/v1/properties/published")).json()[0]["agent"]["email"] == "agent_bulk_a@test.com"
+    res = await client.delete(f"/api/v1/admin/agents/{agent_a.id}", params={"delete_listings": True}, headers=headers)
+    assert res.status_code == 204
+    assert (await db_session.execute(select(Property.id))).all() == []
+
+@pytest.mark.asyncio
+async def test_delete_user_is_one_transaction(db_session, monkeypatch):
+    from sqlalchemy import select
+    from app.crud import crud_users
+    from app.models.property import Property, PropertyStatus, PropertyType
+
+    agent = await create_user(db_session, "agent_atomic@test.com", "123", UserRole.AGENT)
+    db_session.add(Property(
+        title="Atomic Property", price=100000, surface=50, city="Atomic City",
+        property_type=PropertyType.HOUSE, status=PropertyStatus.PUBLISHED, agent_id=agent.id,
+    ))
+    await db_session.commit()
+
+    # The user row fails to go after the listings were deleted
+    async def fail(instance):
+        raise RuntimeError("delete failed")
+    monkeypatch.setattr(db_session, "delete", fail)
+    with pytest.raises(RuntimeError):
+        await crud_users.delete_user(db_session, agent, delete_listings=True)
+    await db_session.rollback()
+    assert (await db_session.execute(select(Property.title))).scalars().all() == ["Atomic Property"]
+
+    # Nothing is deleted while the user still owns listings
+    await db_session.refresh(agent)
+    with pytest.raises(ValueError):
+        await crud_users.delete_user(db_session, agent)
+
+@pytest.mark.asyncio
+async def test_delete_agent_without_listings(client, db_session):
+    await create_user(db_session, "admin_delete@test.com", "admin123", UserRole.ADMIN)
+    agent = await create_user(db_session, "agent_no_listings@test.com", "123", UserRole.AGENT)
+    login_res = await client.post("/api/v1/auth/login", json={"email": "admin_delete@test.com", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    # What the admin dashboard sends: no choice is needed when there is nothing to move
+    res = await client.delete(f"/api/v1/admin/agents/{agent.id}", headers=headers)
+    assert res.status_code == 204
+    res = await client.get("/api/v1/admin/agents", headers=headers)
+    assert [a["email"] for a in res.json()] == []
@@ -169,4 +169,124 @@ async def test_rate_limiting_oauth2_endpoint(client, db_session):
         "username": email,
         "password": "wrongpassword"
     })
-    assert response.status_code == 429
\ No newline at end of file
+    assert response.status_code == 429
+
+@pytest.mark.asyncio
+async def test_password_hasher_sheds_load_beyond_max_pending(monkeypatch):
+    import asyncio
+    import threading
+    from app.core import security
+    from app.core.security import PasswordHasher, PasswordHasherBusy, verify_password
+
+    # Hashes wait for the gate, so the pool stays full while the third call arrives
+    gate = threading.Event()
+    hash_password = security.get_password_hash
+    monkeypatch.setattr(security, "get_password_hash", lambda password: gate.wait(5) and hash_password(password))
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    try:
+        first, second = asyncio.ensure_future(hasher.hash("first")), asyncio.ensure_future(hasher.hash("second"))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("third")
+        assert hasher.pending == 2
+        gate.set()
+        first_hash, second_hash = await asyncio.gather(first, second)
+        assert verify_password("first", first_hash) and verify_password("second", second_hash)
+        assert await hasher.verify("second", second_hash)
+
+        stats = hasher.stats()
+        assert (stats["pending"], stats["completed"], stats["rejected"]) == (0, 3, 1)
+        # One thread: the second hash waited for the first
+        assert stats["queue"]["max_ms"] > 0 and stats["hash"]["max_ms"] > 0
+    finally:
+        gate.set()
+        hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_login_returns_503_while_hashing_is_saturated(client, db_session, monkeypatch):
+    from app.core.rate_limit import login_rate_limiter
+    from app.core.security import password_hasher
+
+    email = "busy@example.com"
+    await create_user(db_session, email, "password123")
+    await create_user(db_session, "admin_busy@example.com", "admin123", role=UserRole.ADMIN)
+    admin_login = await client.post("/api/v1/auth/login", json={"email": "admin_busy@example.com", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {admin_login.json()['access_token']}"}
+
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    rejected = password_hasher.rejected
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    # Shed requests are not failed attempts
+    assert await login_rate_limiter.get_attempt_count(email) == 0
+    monkeypatch.undo()
+
+    response = await client.get("/api/v1/admin/passwords/stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["rejected"] == rejected + 1
+    assert stats["completed"] >= 1 and stats["hash"]["max_ms"] > 0
+
+def test_tune_bcrypt_rounds_fits_the_target(monkeypatch):
+    from app.core import security
+
+    # 10 ms at the minimum cost, doubling with each round
+    monkeypatch.setattr(security, "time_bcrypt", lambda rounds: 0.010 * 2 ** (rounds - security.MIN_BCRYPT_ROUNDS))
+    assert security.tune_bcrypt_rounds(100) == 13
+    assert security.tune_bcrypt_rounds(80) == 13
+    assert security.tune_bcrypt_rounds(79) == 12
+    assert security.tune_bcrypt_rounds(1) == security.MIN_BCRYPT_ROUNDS
+    assert security.tune_bcrypt_rounds(10 ** 9) == security.MAX_BCRYPT_ROUNDS
+
+@pytest.mark.asyncio
+async def test_login_rehashes_password_at_the_current_cost(client, db_session, monkeypatch):
+    import bcrypt
+    from app.core.config import settings
+    from app.core.security import hash_rounds
+
+    email = "rehash@example.com"
+    user = User(
+        email=email,
+        password_hash=bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=5)).decode(),
+        name="Old Hash",
+        role=UserRole.AGENT,
+    )
+    db_session.add(user)
+    await db_session.commit()
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 6)
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 200
+    await db_session.refresh(user)
+    assert hash_rounds(user.password_hash) == 6
+    first_hash = user.password_hash
+
+    # Up to date hashes are left alone, and still verify
+    response = await client.post("/api/v1/auth/access-token", data={"username": email, "password": "password123"})
+    assert response.status_code == 200
+    await db_session.refresh(user)
+    assert user.password_hash == first_hash
+
+    # Failed logins never rehash
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 7)
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": "wrong"})
+    assert response.status_code == 401
+    await db_session.refresh(user)
+    assert user.password_hash == first_hash
+
+    # Lowering the cost brings hashes down to it too
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 200
+    await db_session.refresh(user)
+    assert hash_rounds(user.password_hash) == 4
+
+def test_bcrypt_rounds_setting_is_bounded():
+    from pydantic import ValidationError
+    from app.core.config import Settings
+
+    for rounds in (3, 32):
+        with pytest.raises(ValidationError):
+            Settings(BCRYPT_ROUNDS=rounds)
+    assert Settings(BCRYPT_ROUNDS=31).BCRYPT_ROUNDS == 31
@@ -0,0 +1,123 @@
+import hashlib
+
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.core import image_files
+from app.core.image_files import ImageFiles, RedirectFiles
+
+@pytest.fixture
+def image_dir(tmp_path):
+    data = bytes(range(256)) * 40
+    digest = hashlib.sha256(data).hexdigest()
+    blob = tmp_path / "blobs" / digest[:2] / f"{digest}.jpg"
+    blob.parent.mkdir(parents=True)
+    blob.write_bytes(data)
+    (tmp_path / "7").mkdir()
+    (tmp_path / "7" / "old.png").write_bytes(b"legacy")
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "tmp" / "x.part").write_bytes(b"partial")
+    return tmp_path, f"/uploads/blobs/{digest[:2]}/{digest}.jpg", data
+
+@pytest.mark.asyncio
+async def test_image_files_cache_headers_and_revalidation(image_dir):
+    directory, blob_url, data = image_dir
+    app = Starlette(routes=[Mount("/uploads", ImageFiles(directory=directory))])
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        res = await client.get(blob_url)
+        assert res.status_code == 200
+        assert res.content == data
+        assert res.headers["content-type"] == "image/jpeg"
+        assert res.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert "expires" in res.headers
+        assert res.headers["accept-ranges"] == "bytes"
+        etag = res.headers["etag"]
+
+        res = await client.get(blob_url, headers={"If-None-Match": f'"other", W/{etag}'})
+        assert res.status_code == 304
+        assert res.content == b""
+        assert res.headers["etag"] == etag
+
+        res = await client.head(blob_url)
+        assert (res.status_code, res.content) == (200, b"")
+        assert res.headers["content-length"] == str(len(data))
+
+        # Pre-blob paths can change, so they are revalidated on every use
+        res = await client.get("/uploads/7/old.png")
+        assert res.status_code == 200
+        assert res.headers["cache-control"] == "public, no-cache"
+        res = await client.get("/uploads/7/old.png", headers={"If-None-Match": res.headers["etag"]})
+        assert res.status_code == 304
+
+        assert (await client.get("/uploads/tmp/x.part")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_image_files_byte_ranges(image_dir, monkeypatch):
+    directory, blob_url, data = image_dir
+    monkeypatch.setattr(image_files, "SEND_CHUNK_SIZE", 1000)
+    app = Starlette(routes=[Mount("/uploads", ImageFiles(directory=directory))])
+    size = len(data)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        res = await client.get(blob_url, headers={"Range": "bytes=100-2599"})
+        assert res.status_code == 206
+        assert res.content == data[100:2600]
+        assert res.headers["content-range"] == f"bytes 100-2599/{size}"
+        assert res.headers["content-length"] == "2500"
+
+        res = await client.get(blob_url, headers={"Range": "bytes=-10"})
+        assert (res.status_code, res.content) == (206, data[-10:])
+        res = await client.get(blob_url, headers={"Range": f"bytes={size - 5}-"})
+        assert (res.status_code, res.content) == (206, data[-5:])
+        res = await client.get(blob_url, headers={"Range": f"bytes=0-{size * 2}"})
+        assert (res.status_code, len(res.content)) == (206, size)
+
+        res = await client.get(blob_url, headers={"Range": f"bytes={size}-"})
+        assert res.status_code == 416
+        assert res.headers["content-range"] == f"bytes */{size}"
+
+        # Multiple or malformed ranges, and stale If-Range, get the whole file
+        for headers in ({"Range": "bytes=0-1,5-6"}, {"Range": "lines=1-2"}, {"Range": "bytes=0-1", "If-Range": '"stale"'}):
+            res = await client.get(blob_url, headers=headers)
+            assert (res.status_code, res.content) == (200, data)
+        etag = (await client.head(blob_url)).headers["etag"]
+        res = await client.get(blob_url, headers={"Range": "bytes=0-1", "If-Range": etag})
+        assert (res.status_code, res.content) == (206, data[:2])
+
+        # Servers offering zero-copy send get the file handed over instead of chunks
+        sent = []
+
+        async def receive():
+            return {"type": "http.request"}
+
+        async def send(message):
+            if message["type"] == image_files.ZERO_COPY_SEND:
+                message["file"].seek(message["offset"])
+                message = {**message, "file": message["file"].read(message["count"])}
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": blob_url, "root_path": "", "query_string": b"",
+            "headers": [(b"range", b"bytes=10-19")], "extensions": {image_files.ZERO_COPY_SEND: {}},
+        }
+        await app(scope, receive, send)
+        assert sent[0]["status"] == 206
+        assert sent[1] == {"type": image_files.ZERO_COPY_SEND, "file": data[10:20], "offset": 10, "count": 10}
+
+@pytest.mark.asyncio
+async def test_redirect_files_for_remote_storage():
+    app = Starlette(routes=[Mount("/uploads", RedirectFiles(lambda key: f"https://cdn.test/{key}"))])
+    blob = f"blobs/ab/{'ab' * 32}_card.webp"
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        res = await client.get(f"/uploads/{blob}")
+        assert res.status_code == 301
+        assert res.headers["location"] == f"https://cdn.test/{blob}"
+        assert res.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+        res = await client.head("/uploads/7/old.png")
+        assert res.status_code == 307
+        assert res.headers["location"] == "https://cdn.test/7/old.png"
+        assert "cache-control" not in res.headers
+
+        assert (await client.delete(f"/uploads/{blob}")).status_code == 404
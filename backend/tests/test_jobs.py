@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import jobs
+from app.core.jobs import JobWorker, PermanentJobError, job_handler
+from app.crud import crud_jobs
+from app.models.job import Job, JobStatus
+
+@pytest.fixture
+def job_types(monkeypatch):
+    """Register test handlers without leaking them into other tests."""
+    monkeypatch.setattr(jobs, "_job_types", {})
+
+async def make_due(session, job_id):
+    await session.execute(update(Job).where(Job.id == job_id).values(run_at=datetime.utcnow()))
+    await session.commit()
+
+@pytest.mark.asyncio
+async def test_jobs_retry_with_backoff_then_fail(db_session, run_jobs, job_types):
+    calls = []
+
+    @job_handler("test.flaky")
+    async def flaky(session, payload):
+        calls.append(payload["n"])
+        if len(calls) < 2:
+            raise RuntimeError("temporary")
+
+    @job_handler("test.broken")
+    async def broken(session, payload):
+        raise PermanentJobError("bad payload")
+
+    @job_handler("test.always_fails")
+    async def always_fails(session, payload):
+        raise RuntimeError("still broken")
+
+    flaky_job = await crud_jobs.enqueue_job(db_session, "test.flaky", {"n": 1})
+    broken_job = await crud_jobs.enqueue_job(db_session, "test.broken", {})
+    failing_job = await crud_jobs.enqueue_job(db_session, "test.always_fails", {}, max_attempts=2)
+    assert await run_jobs() == 3
+
+    # The flaky job waits out its backoff before running again
+    job = await crud_jobs.get_job(db_session, flaky_job.id)
+    assert (job.status, job.attempts, job.last_error) == (JobStatus.QUEUED, 1, "RuntimeError: temporary")
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=jobs.retry_delay(1) - 1)
+    job = await crud_jobs.get_job(db_session, broken_job.id)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 1)
+    assert await run_jobs() == 0
+
+    await make_due(db_session, flaky_job.id)
+    await make_due(db_session, failing_job.id)
+    assert await run_jobs() == 2
+    job = await crud_jobs.get_job(db_session, flaky_job.id)
+    assert (job.status, job.attempts, job.last_error) == (JobStatus.SUCCEEDED, 2, None)
+    job = await crud_jobs.get_job(db_session, failing_job.id)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 2)
+    assert calls == [1, 1]
+    assert jobs.retry_delay(2) == 2 * jobs.retry_delay(1)
+    assert jobs.retry_delay(100) == jobs.settings.JOB_RETRY_MAX_SECONDS
+
+@pytest.mark.asyncio
+async def test_jobs_of_dead_workers_are_rerun(db_session, run_jobs, job_types):
+    ran = []
+
+    @job_handler("test.lost")
+    async def lost(session, payload):
+        ran.append(payload)
+
+    # Claimed by a worker that died: rerun only once its lease has expired
+    job = await crud_jobs.enqueue_job(db_session, "test.lost", {"n": 1})
+    await db_session.execute(update(Job).where(Job.id == job.id).values(
+        status=JobStatus.RUNNING, attempts=1, started_at=datetime.utcnow(),
+    ))
+    await db_session.commit()
+    assert await run_jobs() == 0
+    await db_session.execute(update(Job).where(Job.id == job.id).values(
+        started_at=datetime.utcnow() - timedelta(seconds=120),
+    ))
+    await db_session.commit()
+    assert await run_jobs() == 1
+    job = await crud_jobs.get_job(db_session, job.id)
+    assert (job.status, job.attempts) == (JobStatus.SUCCEEDED, 2)
+
+    # Jobs of unknown types are left for a worker that has their handler
+    await crud_jobs.enqueue_job(db_session, "test.unregistered", {})
+    assert await run_jobs() == 0
+
+@pytest.mark.asyncio
+async def test_worker_limits_concurrency_per_type_and_requeues_on_stop(db_session, job_types):
+    running = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0}
+    release = asyncio.Event()
+
+    def tracked(name):
+        async def handler(session, payload):
+            running[name] += 1
+            peak[name] = max(peak[name], running[name])
+            try:
+                await release.wait()
+            finally:
+                running[name] -= 1
+        return handler
+
+    job_handler("test.slow", concurrency=2)(tracked("slow"))
+    job_handler("test.fast", concurrency=3)(tracked("fast"))
+    for _ in range(4):
+        await crud_jobs.enqueue_job(db_session, "test.slow", {})
+        await crud_jobs.enqueue_job(db_session, "test.fast", {})
+
+    async def wait_for(condition):
+        for _ in range(200):
+            if await condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("timed out")
+
+    def running_jobs(count):
+        async def condition():
+            return sum(running.values()) == count
+        return condition
+
+    # The worker runs its jobs concurrently, so it needs sessions of its own
+    sessions = async_sessionmaker(db_session.bind, expire_on_commit=False)
+    worker = JobWorker(sessions, max_workers=4, poll_seconds=0.01, lease_seconds=60)
+    worker.start()
+    await wait_for(running_jobs(4))
+    # Oldest first: two of each type, then "slow" is at its limit and the worker is full
+    await asyncio.sleep(0.05)
+    assert running == {"slow": 2, "fast": 2}
+
+    # Stopping requeues interrupted jobs without using up an attempt
+    await worker.stop()
+    db_session.expire_all()
+    queued = (await db_session.execute(Job.__table__.select())).all()
+    assert [(job.status, job.attempts) for job in queued] == [(JobStatus.QUEUED, 0)] * 8
+
+    async def all_done():
+        counts = await crud_jobs.count_jobs(db_session)
+        return counts["test.slow"]["succeeded"] + counts["test.fast"]["succeeded"] == 8
+
+    # With room in the worker, each type runs up to its own limit
+    worker = JobWorker(sessions, max_workers=8, poll_seconds=0.01, lease_seconds=60)
+    worker.start()
+    await wait_for(running_jobs(5))
+    await asyncio.sleep(0.05)
+    assert running == {"slow": 2, "fast": 3}
+    release.set()
+    await wait_for(all_done)
+    await worker.stop()
+    assert peak == {"slow": 2, "fast": 3}
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.db.database import Base
+from app.models.property import SQLITE_AUX_TABLE_NAMES
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+INITIAL_REVISION = "3c1f0a9b2d41"
+
+@pytest.fixture
+def migrate(tmp_path, monkeypatch):
+    """Run alembic commands against an empty SQLite file; returns a sync engine on it."""
+    path = tmp_path / "migrations.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    engine = create_engine(f"sqlite:///{path}")
+    yield config, engine
+    engine.dispose()
+
+# SQLite cannot reflect the full-text expression index
+@pytest.mark.filterwarnings("ignore:autogenerate skipping")
+def test_migrations_match_the_models(migrate):
+    config, engine = migrate
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": lambda name, type_, parents: not (
+            type_ == "table" and name.startswith(SQLITE_AUX_TABLE_NAMES)
+        )})
+        diff = compare_metadata(context, Base.metadata)
+    # Only the PostgreSQL spatial index is missing here, as it should be
+    assert [(op[0], op[1].name) for op in diff] == [("add_index", "ix_properties_status_lat_lng")]
+
+    command.downgrade(config, "base")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE name LIKE 'properties%'")).all() == []
+
+def test_upgrade_keeps_existing_listings_searchable(migrate):
+    config, engine = migrate
+    command.upgrade(config, INITIAL_REVISION)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash, name, role) VALUES (1, 'a@test.com', 'x', 'A', 'AGENT')"))
+        conn.execute(text(
+            "INSERT INTO properties (title, price, surface, city, property_type, status, agent_id) "
+            "VALUES ('Old Villa', 100000, 50, 'Austin', 'HOUSE', 'PUBLISHED', 1)"
+        ))
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT rowid FROM properties_fts WHERE properties_fts MATCH 'villa'")).all() == [(1,)]
+        assert conn.execute(text("SELECT image_meta, latitude FROM properties")).all() == [(None, None)]
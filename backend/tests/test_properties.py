@@ -1,6 +1,29 @@
+import base64
+import hashlib
+import io
+import json
+import struct
+import zlib
+from datetime import datetime
+
 import pytest
-from app.models.user import User, UserRole
+from httpx import AsyncClient
+from PIL import Image
+from pydantic import TypeAdapter
+from sqlalchemy import event, select, update
+
+from app.api.v1 import properties
+from app.core import images, property_io, storage, uploads
 from app.core.security import get_password_hash
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.crud import crud_property, crud_property_rows
+from app.crud.crud_geo_cells import rebuild_geo_cells
+from app.models.geo_cell import PropertyGeoCell
+from app.models.image_blob import ImageBlob
+from app.models.job import Job
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.models.user import User, UserRole
+from app.schemas.property import PropertyRead
 
 # Helper
 async def create_user(db_session, email, password, role):
@@ -49,3 +72,498 @@ async def test_create_property_success(client, db_session):
     assert data["status"] == "draft"
     assert "id" in data
     assert data["images"] == []
+
+@pytest.mark.asyncio
+async def test_published_cursor_pagination(client, db_session):
+    agent = await create_user(db_session, "agent_cursor@test.com", "123", UserRole.AGENT)
+    # Duplicate prices make sure the id tie-breaker keeps pages disjoint
+    for i in range(7):
+        db_session.add(Property(
+            title=f"Cursor Property {i}",
+            price=100000 + (i % 3) * 1000,
+            surface=50,
+            city="Cursor City",
+            property_type=PropertyType.HOUSE,
+            status=PropertyStatus.PUBLISHED,
+            agent_id=agent.id,
+        ))
+    await db_session.commit()
+
+    for sort in ("price_asc", "price_desc", None):
+        seen = []
+        params = {"limit": 3}
+        if sort:
+            params["sort"] = sort
+        while True:
+            res = await client.get("/api/v1/properties/published", params=params)
+            assert res.status_code == 200
+            seen.extend(p["id"] for p in res.json())
+            next_cursor = res.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            params["cursor"] = next_cursor
+
+        offset_res = await client.get("/api/v1/properties/published", params={"limit": 100, **({"sort": sort} if sort else {})})
+        assert seen == [p["id"] for p in offset_res.json()]
+        assert len(set(seen)) == 7
+
+    res = await client.get("/api/v1/properties/published", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+
+@pytest.mark.asyncio
+async def test_published_sparse_fieldsets(client, db_session):
+    agent = await create_user(db_session, "agent_fields@test.com", "123", UserRole.AGENT)
+    db_session.add(Property(
+        title="Fields Property",
+        price=100000,
+        surface=50,
+        city="Fields City",
+        property_type=PropertyType.HOUSE,
+        description="x" * 5000,
+        images=["/uploads/properties/1/a.jpg", "/uploads/properties/1/b.jpg"],
+        status=PropertyStatus.PUBLISHED,
+        agent_id=agent.id,
+    ))
+    await db_session.commit()
+    db_session.expunge_all()
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", capture)
+    try:
+        res = await client.get("/api/v1/properties/published", params={"fields": "summary"})
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", capture)
+    assert res.status_code == 200
+    assert res.json() == [{
+        "id": res.json()[0]["id"],
+        "title": "Fields Property",
+        "price": 100000.0,
+        "surface": 50.0,
+        "city": "Fields City",
+        "property_type": "house",
+        "bedrooms": None,
+        "bathrooms": None,
+        "thumbnail": "/uploads/properties/1/a.jpg",
+        "thumbnail_width": None,
+        "thumbnail_height": None,
+        "thumbnail_placeholder": None,
+        "created_at": res.json()[0]["created_at"],
+    }]
+    page_query = statements[-1]
+    assert "description" not in page_query
+    assert "users" not in page_query
+
+    res = await client.get("/api/v1/properties/published", params={"fields": "id,agent"})
+    assert res.json() == [{"id": res.json()[0]["id"], "agent": {
+        "id": agent.id, "name": agent.name, "email": agent.email, "phone": None,
+    }}]
+
+    res = await client.get("/api/v1/properties/published", params={"fields": "id,secret"})
+    assert res.status_code == 400
+
+@pytest.mark.asyncio
+async def test_row_read_path_matches_orm_serialization(db_session):
+    agent = await create_user(db_session, "agent_rows@test.com", "123", UserRole.AGENT)
+    for i in range(3):
+        db_session.add(Property(
+            title=f"Rows Property {i}",
+            price=100000.5 + i,
+            surface=50,
+            city="Rows City",
+            street="Main St" if i else None,
+            property_type=PropertyType.CONDO,
+            bedrooms=i,
+            description="Line one\nline \"two\"",
+            latitude=40.7 if i else None,
+            longitude=-74.0 if i else None,
+            images=[f"/uploads/properties/{i}/a.jpg"] if i else [],
+            status=PropertyStatus.PUBLISHED,
+            agent_id=agent.id,
+        ))
+    await db_session.commit()
+
+    adapter = TypeAdapter(list[PropertyRead])
+    for sort in (None, "price_asc"):
+        items = await crud_property.get_multi_published(db_session, sort=sort, limit=2)
+        rows = await crud_property_rows.get_multi_published_rows(db_session, sort=sort, limit=2)
+        assert crud_property_rows.dump_rows(rows) == adapter.dump_json(adapter.validate_python(items))
+        sort_key = crud_property.published_sort_key(sort)
+        assert crud_property.next_cursor(rows, sort_key, 2) == crud_property.next_cursor(items, sort_key, 2)
+
+    # Listings whose agent is gone are read with no agent on both paths
+    db_session.add(Property(
+        title="Orphaned Property", price=1, surface=1, city="Rows City", property_type=PropertyType.LAND,
+        agent_id=agent.id + 1000,
+    ))
+    await db_session.commit()
+    items = await crud_property.get_multi(db_session)
+    rows = await crud_property_rows.get_multi_rows(db_session)
+    assert crud_property_rows.dump_rows(rows) == adapter.dump_json(adapter.validate_python(items))
+    assert [item["agent"] for item in json.loads(crud_property_rows.dump_rows(rows)) if item["title"] == "Orphaned Property"] == [None]
+
+@pytest.mark.asyncio
+async def test_bulk_import_ndjson_and_csv(client, db_session, monkeypatch):
+    await create_user(db_session, "agent_import@test.com", "123", UserRole.AGENT)
+    login_res = await client.post("/api/v1/auth/login", json={"email": "agent_import@test.com", "password": "123"})
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    # Several batches even for a handful of rows
+    monkeypatch.setattr(properties, "IMPORT_BATCH_SIZE", 2)
+
+    valid = {"title": "Imported Home", "price": 200000, "surface": 90, "city": "Import City", "property_type": "house"}
+    lines = [
+        json.dumps({**valid, "status": "published", "latitude": 30.27, "longitude": -97.74}),
+        json.dumps({**valid, "price": -1}),
+        "{not json",
+        "",
+        json.dumps({**valid, "title": "Imported Flat", "property_type": "apartment"}),
+        json.dumps({**valid, "title": "Imported Land", "property_type": "land", "status": "published"}),
+    ]
+    res = await client.post("/api/v1/properties/import", content="\n".join(lines).encode(), headers=headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert data["created"] == 3
+    assert data["failed"] == 2
+    assert [e["row"] for e in data["errors"]] == [2, 3]
+    assert data["errors"][0]["errors"][0].startswith("price:")
+
+    csv_body = (
+        "title,price,surface,city,property_type,description,bedrooms\n"
+        'CSV Imported Home,150000,80,Import City,condo,"Two lines,\nwith ""quotes""",2\n'
+        "CSV Broken Row,abc,80,Import City,condo,,\n"
+    )
+    res = await client.post("/api/v1/properties/import", params={"format": "csv"}, content=csv_body.encode(), headers=headers)
+    assert res.json()["created"] == 1
+    assert res.json()["errors"] == [{"row": 2, "errors": [res.json()["errors"][0]["errors"][0]]}]
+    assert res.json()["errors"][0]["errors"][0].startswith("price:")
+
+    res = await client.get("/api/v1/properties/mine", headers=headers)
+    listings = {p["title"]: p for p in res.json()}
+    assert set(listings) == {"Imported Home", "Imported Flat", "Imported Land", "CSV Imported Home"}
+    assert listings["CSV Imported Home"]["description"] == 'Two lines,\nwith "quotes"'
+    assert listings["CSV Imported Home"]["bedrooms"] == 2
+
+    # Imported listings reach the public views and the map clusters
+    res = await client.get("/api/v1/properties/published/facets")
+    assert {"value": "Import City", "count": 2} in res.json()["cities"]
+    res = await client.get("/api/v1/properties/search", params={"q": "imported"})
+    assert len(res.json()) == 2
+    cells = lambda: db_session.execute(select(PropertyGeoCell).order_by(PropertyGeoCell.zoom, PropertyGeoCell.cell_x, PropertyGeoCell.cell_y))
+    incremental = [(c.zoom, c.cell_x, c.cell_y, c.count) for c in (await cells()).scalars()]
+    await rebuild_geo_cells(db_session)
+    db_session.expunge_all()
+    assert incremental == [(c.zoom, c.cell_x, c.cell_y, c.count) for c in (await cells()).scalars()]
+    assert incremental
+
+    # Only admins may import on behalf of another agent
+    res = await client.post("/api/v1/properties/import", params={"agent_id": 9999}, content=b"", headers=headers)
+    assert res.status_code == 403
+
+@pytest.mark.asyncio
+async def test_bulk_import_limits(client, auth_headers, monkeypatch):
+    headers = await auth_headers("agent_import_limits@test.com")
+    row = json.dumps({"title": "Limited Home", "price": 200000, "surface": 90, "city": "Limit City", "property_type": "house"})
+    url = "/api/v1/properties/import"
+
+    # A line or CSV record that never ends is refused once over the record length
+    monkeypatch.setattr(property_io, "MAX_RECORD_LENGTH", 1000)
+    res = await client.post(url, content=(row + "\n" + "x" * 5000).encode(), headers=headers)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Row longer than 1000 characters"
+    csv_body = 'title,description\nOpen Quote,"' + "never closed\n" * 200
+    res = await client.post(url, params={"format": "csv"}, content=csv_body.encode(), headers=headers)
+    assert res.status_code == 400
+
+    monkeypatch.setattr(properties, "MAX_IMPORT_ROWS", 2)
+    res = await client.post(url, content="\n".join([row] * 3).encode(), headers=headers)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Import has more than 2 rows"
+
+    # Bodies over the byte limit are refused on Content-Length, or as they stream in
+    monkeypatch.setattr(properties, "MAX_IMPORT_BYTES", len(row) * 2)
+    res = await client.post(url, content="\n".join([row] * 2).encode(), headers=headers)
+    assert res.status_code == 413
+    async def chunked():
+        for _ in range(3):
+            yield (row + "\n").encode()
+    res = await client.post(url, content=chunked(), headers=headers)
+    assert res.status_code == 413
+
+def image_bytes(width, height, image_format):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, image_format)
+    return buffer.getvalue()
+
+def png_header(width, height):
+    """A PNG that declares `width` x `height` pixels but holds no image data."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IEND", b"")
+
+LARGE = image_bytes(1600, 1200, "JPEG")
+SMALL = image_bytes(300, 200, "PNG")
+
+def blob_files(root):
+    return sorted(p for p in (root / "blobs").rglob("*") if p.is_file())
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "_storage", storage.LocalStorage(tmp_path))
+    monkeypatch.setattr(properties, "MAX_FILE_SIZE", len(LARGE))
+    return tmp_path
+
+@pytest.fixture
+def create_listing(client):
+    async def create(headers, title="Upload Home"):
+        res = await client.post("/api/v1/properties", headers=headers, json={
+            "title": title, "price": 100000, "surface": 50, "city": "Upload City", "property_type": "house",
+        })
+        return res.json()["id"]
+    return create
+
+async def upload_large_and_small(client, headers, property_id):
+    return await client.post(f"/api/v1/properties/{property_id}/images", headers=headers, files=[
+        ("files", ("a.jpg", LARGE, "image/jpeg")),
+        ("files", ("b.png", SMALL, "image/png")),
+    ])
+
+@pytest.mark.asyncio
+async def test_upload_images_stores_originals_by_content_hash(client, auth_headers, create_listing, local_storage):
+    headers = await auth_headers("agent_upload@test.com")
+    res = await upload_large_and_small(client, headers, await create_listing(headers))
+    assert res.status_code == 200
+    first = res.json()["images"][0]
+
+    # Originals are stored by content hash, with an extension taken from the content
+    originals = blob_files(local_storage)
+    assert sorted(p.read_bytes() for p in originals) == sorted([LARGE, SMALL])
+    assert {(p.parent.name, p.name) for p in originals} == {
+        (hashlib.sha256(LARGE).hexdigest()[:2], f"{hashlib.sha256(LARGE).hexdigest()}.jpg"),
+        (hashlib.sha256(SMALL).hexdigest()[:2], f"{hashlib.sha256(SMALL).hexdigest()}.png"),
+    }
+    assert first.startswith("uploads/blobs/") and not list((local_storage / "tmp").iterdir())
+
+    # Until the derivatives are rendered the originals are served, with dimensions read from their headers
+    assert res.json()["image_sets"][0] == {
+        "src": first, "webp_srcset": "", "jpeg_srcset": "", "width": 1600, "height": 1200, "placeholder": None,
+    }
+
+@pytest.mark.asyncio
+async def test_upload_images_renders_derivatives_in_background(client, auth_headers, create_listing, run_jobs, local_storage):
+    headers = await auth_headers("agent_render@test.com")
+    property_id = await create_listing(headers)
+    res = await upload_large_and_small(client, headers, property_id)
+    first, second = res.json()["images"]
+
+    job_url = f"/api/v1/jobs/{res.headers['X-Job-Id']}"
+    res = await client.get(job_url, headers=headers)
+    assert res.json()["status"] == "queued"
+    assert await run_jobs() == 1
+    res = await client.get(job_url, headers=headers)
+    assert (res.json()["status"], res.json()["attempts"]) == ("succeeded", 1)
+    data = (await client.get(f"/api/v1/properties/{property_id}", headers=headers)).json()
+
+    # WebP and JPEG derivatives at every width up to the original's, and an inline placeholder
+    stem = first.rsplit(".", 1)[0]
+    placeholder = data["image_sets"][0]["placeholder"]
+    assert data["image_sets"][0] == {
+        "src": f"{stem}_gallery.jpg",
+        "webp_srcset": f"{stem}_card.webp 400w, {stem}_gallery.webp 1024w, {stem}_full.webp 1600w",
+        "jpeg_srcset": f"{stem}_card.jpg 400w, {stem}_gallery.jpg 1024w, {stem}_full.jpg 1600w",
+        "width": 1600,
+        "height": 1200,
+        "placeholder": placeholder,
+    }
+    assert placeholder.startswith("data:image/webp;base64,") and len(placeholder) < 400
+    with Image.open(io.BytesIO(base64.b64decode(placeholder.split(",", 1)[1]))) as preview:
+        assert preview.size == (16, 12)
+    small_stem = second.rsplit(".", 1)[0]
+    assert data["image_sets"][1]["webp_srcset"] == f"{small_stem}_card.webp 300w"
+    assert (data["image_sets"][1]["width"], data["image_sets"][1]["height"]) == (300, 200)
+    name = f"{stem.rsplit('/', 1)[1]}_card.jpg"
+    with Image.open(local_storage / "blobs" / name[:2] / name) as card:
+        assert card.size == (400, 300)
+    assert len(blob_files(local_storage)) == 2 + 2 * 3 * 2
+
+    res = await client.get("/api/v1/properties/mine", params={"fields": "summary"}, headers=headers)
+    card = res.json()[0]
+    assert card["thumbnail"] == f"{stem}_card.jpg"
+    assert (card["thumbnail_width"], card["thumbnail_height"], card["thumbnail_placeholder"]) == (400, 300, placeholder)
+
+def test_derivatives_are_replaced_whole(tmp_path, monkeypatch):
+    original = tmp_path / "photo.jpg"
+    original.write_bytes(LARGE)
+    card = tmp_path / "photo_card.webp"
+    card.write_bytes(b"rendered before")
+
+    # A render that fails halfway through a file leaves the served derivative as it was
+    def save_partly(image, out, **options):
+        out.write(b"partial")
+        raise OSError("disk full")
+    monkeypatch.setattr(Image.Image, "save", save_partly)
+    with pytest.raises(OSError):
+        images.render_derivatives(str(original))
+    assert card.read_bytes() == b"rendered before"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["photo.jpg", "photo_card.webp"]
+
+@pytest.mark.asyncio
+async def test_upload_images_rejects_oversized_or_invalid_files(client, auth_headers, create_listing, local_storage):
+    headers = await auth_headers("agent_reject@test.com")
+    url = f"/api/v1/properties/{await create_listing(headers)}/images"
+
+    # An oversized or undecodable file fails the whole request and leaves nothing behind
+    res = await client.post(url, headers=headers, files=[
+        ("files", ("c.png", SMALL, "image/png")),
+        ("files", ("d.jpg", LARGE + b"z", "image/jpeg")),
+    ])
+    assert res.status_code == 413
+    res = await client.post(url, headers=headers, files=[
+        ("files", ("c.png", SMALL, "image/png")),
+        ("files", ("d.jpg", b"not an image", "image/jpeg")),
+    ])
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Not a valid image: d.jpg"
+    res = await client.post(url, headers=headers, files=[("files", ("e.gif", b"g", "image/gif"))])
+    assert res.status_code == 400
+    assert blob_files(local_storage) == []
+    assert not list((local_storage / "tmp").iterdir())
+
+@pytest.mark.asyncio
+async def test_upload_images_rejects_decompression_bombs(client, auth_headers, create_listing, local_storage):
+    headers = await auth_headers("agent_bomb@test.com")
+    url = f"/api/v1/properties/{await create_listing(headers)}/images"
+
+    # A few hundred bytes that would decode to 400 megapixels
+    res = await client.post(url, headers=headers, files=[
+        ("files", ("c.png", SMALL, "image/png")),
+        ("files", ("bomb.png", png_header(20000, 20000), "image/png")),
+    ])
+    assert res.status_code == 413
+    assert res.json()["detail"] == "Image dimensions too large: bomb.png"
+    assert blob_files(local_storage) == []
+    assert not list((local_storage / "tmp").iterdir())
+
+@pytest.mark.asyncio
+async def test_upload_images_storage_failure_leaves_nothing_behind(client, db_session, auth_headers, create_listing, run_jobs, local_storage, monkeypatch):
+    headers = await auth_headers("agent_failure@test.com")
+    property_id = await create_listing(headers)
+    put_file = storage.LocalStorage.put_file
+    calls = []
+    async def put_once(self, key, path, content_type=None):
+        calls.append(key)
+        if len(calls) > 1:
+            raise storage.StorageError("bucket unavailable")
+        await put_file(self, key, path, content_type)
+    monkeypatch.setattr(storage.LocalStorage, "put_file", put_once)
+
+    res = await upload_large_and_small(client, headers, property_id)
+    assert res.status_code == 503
+    assert not list((local_storage / "tmp").iterdir())
+    assert (await client.get(f"/api/v1/properties/{property_id}", headers=headers)).json()["images"] == []
+
+    # The file stored before the failure is collected after the usual delay
+    assert [p.name for p in blob_files(local_storage)] == [calls[0].rsplit("/", 1)[1]]
+    assert await run_jobs() == 0
+    await db_session.execute(update(Job).values(run_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await run_jobs() == 1
+    assert blob_files(local_storage) == []
+    assert (await db_session.execute(select(ImageBlob))).first() is None
+
+@pytest.mark.asyncio
+async def test_upload_images_deduplicates_across_listings(client, db_session, auth_headers, create_listing, run_jobs, local_storage):
+    headers = await auth_headers("agent_dedupe@test.com")
+    res = await upload_large_and_small(client, headers, await create_listing(headers))
+    first = res.json()["images"][0]
+    await run_jobs()
+    written = len(blob_files(local_storage))
+
+    # The same photo on another listing is stored once and reuses its derivatives
+    res = await client.post(f"/api/v1/properties/{await create_listing(headers, 'Second Home')}/images", headers=headers, files=[
+        ("files", ("copy.jpg", LARGE, "image/jpeg")),
+    ])
+    assert res.status_code == 200
+    assert "X-Job-Id" not in res.headers
+    assert res.json()["images"] == [first]
+    assert res.json()["image_sets"][0]["src"] == f"{first.rsplit('.', 1)[0]}_gallery.jpg"
+    assert len(blob_files(local_storage)) == written
+    refcounts = dict((await db_session.execute(select(ImageBlob.digest, ImageBlob.refcount))).all())
+    assert refcounts == {hashlib.sha256(LARGE).hexdigest(): 2, hashlib.sha256(SMALL).hexdigest(): 1}
+
+@pytest.mark.asyncio
+async def test_unreferenced_images_are_collected_after_delay(client, db_session, auth_headers, create_listing, run_jobs, local_storage):
+    headers = await auth_headers("agent_collect@test.com")
+    property_id, other_id = await create_listing(headers), await create_listing(headers, "Second Home")
+    res = await upload_large_and_small(client, headers, property_id)
+    first = res.json()["images"][0]
+    await client.post(f"/api/v1/properties/{other_id}/images", headers=headers, files=[
+        ("files", ("copy.jpg", LARGE, "image/jpeg")),
+    ])
+    await run_jobs()
+
+    # Files are only collected once no listing references them, after a delay
+    res = await client.delete(f"/api/v1/properties/{property_id}", headers=headers)
+    assert res.status_code == 200
+    assert await run_jobs() == 0
+    await db_session.execute(update(Job).values(run_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await run_jobs() == 1
+    assert [p.name for p in blob_files(local_storage) if "_" not in p.name] == [first.rsplit("/", 1)[1]]
+    assert len(blob_files(local_storage)) == 1 + 3 * 2
+
+    await client.delete(f"/api/v1/properties/{other_id}", headers=headers)
+    await db_session.execute(update(Job).values(run_at=datetime.utcnow()))
+    await db_session.commit()
+    assert await run_jobs() == 1
+    assert blob_files(local_storage) == []
+    assert (await db_session.execute(select(ImageBlob))).first() is None
+
+@pytest.mark.asyncio
+async def test_images_collected_during_an_upload_of_the_same_content_keep_a_file(client, db_session, auth_headers, create_listing, run_jobs, local_storage, monkeypatch):
+    headers = await auth_headers("agent_collect_race@test.com")
+    property_id, other_id = await create_listing(headers), await create_listing(headers, "Second Home")
+    await client.post(f"/api/v1/properties/{property_id}/images", headers=headers, files=[
+        ("files", ("photo.jpg", LARGE, "image/jpeg")),
+    ])
+    await run_jobs()
+    await client.delete(f"/api/v1/properties/{property_id}", headers=headers)
+    await db_session.execute(update(Job).values(run_at=datetime.utcnow()))
+    await db_session.commit()
+
+    # The collector runs after the upload found the file in place, before it references the blob
+    store_blob = uploads.store_blob
+    async def store_then_collect(path, blob):
+        stored = await store_blob(path, blob)
+        if not stored and await run_jobs() == 0:
+            raise AssertionError("collection did not run")
+        return stored
+    monkeypatch.setattr(uploads, "store_blob", store_then_collect)
+
+    res = await client.post(f"/api/v1/properties/{other_id}/images", headers=headers, files=[
+        ("files", ("copy.jpg", LARGE, "image/jpeg")),
+    ])
+    assert res.status_code == 200
+    assert "X-Job-Id" in res.headers
+    assert [p.name for p in blob_files(local_storage)] == [res.json()["images"][0].rsplit("/", 1)[1]]
+    assert not list((local_storage / "tmp").iterdir())
+    refcounts = dict((await db_session.execute(select(ImageBlob.digest, ImageBlob.refcount))).all())
+    assert refcounts == {hashlib.sha256(LARGE).hexdigest(): 1}
+
+@pytest.mark.asyncio
+async def test_upload_size_limit_middleware_refuses_oversized_multipart():
+    async def echo(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    # Oversized multipart bodies are refused before they are parsed; other bodies pass through
+    async with AsyncClient(app=UploadSizeLimitMiddleware(echo, max_body_size=500), base_url="http://test") as limited:
+        res = await limited.post("/", files=[("files", ("f.jpg", b"f" * 600, "image/jpeg"))])
+        assert res.status_code == 413
+        res = await limited.post("/", files=[("files", ("f.jpg", b"f" * 10, "image/jpeg"))])
+        assert res.status_code == 200
+        res = await limited.post("/", content=b"n" * 600)
+        assert res.status_code == 200
@@ -67,3 +67,122 @@ async def test_public_details_logic(client, db_session):
     
     res = await client.get(f"/api/v1/properties/{draft_prop.id}", headers={"Authorization": f"Bearer {token2}"})
     assert res.status_code == 404, "Other agent should NOT see draft"
+
+@pytest.mark.asyncio
+async def test_public_reads_are_cached_until_listing_changes(client, db_session):
+    from app.core.cache import response_cache
+
+    agent = await create_user(db_session, "cache_agent@test.com", "pass", UserRole.AGENT)
+    await create_user(db_session, "cache_admin@test.com", "pass", UserRole.ADMIN)
+    prop = await create_property(db_session, agent.id, PropertyStatus.PUBLISHED)
+
+    res = await client.get("/api/v1/properties/published")
+    assert [p["title"] for p in res.json()] == [prop.title]
+    res = await client.get(f"/api/v1/properties/{prop.id}")
+    assert res.json()["title"] == prop.title
+    assert response_cache.stats()["entries"] == 2
+
+    # Second reads are served from the cache
+    hits = response_cache.hits
+    assert (await client.get("/api/v1/properties/published")).json()[0]["title"] == prop.title
+    assert (await client.get(f"/api/v1/properties/{prop.id}")).json()["title"] == prop.title
+    assert response_cache.hits == hits + 2
+
+    # A listing write drops every cached response that may contain it
+    login_res = await client.post("/api/v1/auth/login", json={"email": "cache_agent@test.com", "password": "pass"})
+    agent_headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    res = await client.patch(f"/api/v1/properties/{prop.id}", json={"title": "Renamed"}, headers=agent_headers)
+    assert res.status_code == 200
+    assert (await client.get("/api/v1/properties/published")).json()[0]["title"] == "Renamed"
+    assert (await client.get(f"/api/v1/properties/{prop.id}")).json()["title"] == "Renamed"
+
+    # So does an agent profile change, since listings embed the agent
+    login_res = await client.post("/api/v1/auth/login", json={"email": "cache_admin@test.com", "password": "pass"})
+    admin_headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    res = await client.put(f"/api/v1/admin/agents/{agent.id}", json={"name": "Renamed Agent"}, headers=admin_headers)
+    assert res.status_code == 200
+    assert (await client.get(f"/api/v1/properties/{prop.id}")).json()["agent"]["name"] == "Renamed Agent"
+
+    # Unpublishing removes the listing from the public views
+    await client.patch(f"/api/v1/properties/{prop.id}", json={"status": "draft"}, headers=agent_headers)
+    assert (await client.get("/api/v1/properties/published")).json() == []
+    assert (await client.get(f"/api/v1/properties/{prop.id}")).status_code == 404
+
+    res = await client.get("/api/v1/admin/cache/stats", headers=admin_headers)
+    assert res.status_code == 200
+    assert res.json()["hits"] >= 2
+    assert res.json()["invalidations"] > 0
+
+@pytest.mark.asyncio
+async def test_reads_racing_a_write_are_not_cached(client, db_session, monkeypatch):
+    from app.core.cache import response_cache
+    from app.crud import crud_property, crud_property_rows
+
+    agent = await create_user(db_session, "race_agent@test.com", "pass", UserRole.AGENT)
+    prop = await create_property(db_session, agent.id, PropertyStatus.PUBLISHED)
+
+    # A write that commits and invalidates while the response is being built
+    def during_query(load):
+        async def wrapper(*args, **kwargs):
+            result = await load(*args, **kwargs)
+            response_cache.invalidate_tags({f"property:{prop.id}"})
+            return result
+        return wrapper
+    monkeypatch.setattr(crud_property_rows, "get_multi_published_rows", during_query(crud_property_rows.get_multi_published_rows))
+    monkeypatch.setattr(crud_property, "get_property", during_query(crud_property.get_property))
+
+    assert (await client.get("/api/v1/properties/published")).status_code == 200
+    assert (await client.get(f"/api/v1/properties/{prop.id}")).status_code == 200
+    assert response_cache.stats()["entries"] == 0
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_304_until_listing_changes(client, db_session):
+    from app.core.cache import response_cache
+
+    agent = await create_user(db_session, "etag_agent@test.com", "pass", UserRole.AGENT)
+    await create_user(db_session, "etag_admin@test.com", "pass", UserRole.ADMIN)
+    prop = await create_property(db_session, agent.id, PropertyStatus.PUBLISHED)
+    login_res = await client.post("/api/v1/auth/login", json={"email": "etag_agent@test.com", "password": "pass"})
+    agent_headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    urls = [
+        (f"/api/v1/properties/{prop.id}", {}),
+        ("/api/v1/properties/published", {}),
+        ("/api/v1/properties/mine", agent_headers),
+    ]
+    etags = []
+    for url, headers in urls:
+        res = await client.get(url, headers=headers)
+        assert res.status_code == 200
+        assert res.headers["Last-Modified"]
+        etags.append(res.headers["ETag"])
+
+        res = await client.get(url, headers={**headers, "If-None-Match": etags[-1]})
+        assert res.status_code == 304
+        assert res.content == b""
+        assert res.headers["ETag"] == etags[-1]
+
+    # Revalidation also works when the response cache is cold
+    response_cache.clear()
+    for (url, headers), etag in zip(urls, etags):
+        res = await client.get(url, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 304
+
+    res = await client.get(urls[0][0], headers={"If-Modified-Since": res.headers["Last-Modified"]})
+    assert res.status_code == 304
+
+    # Listing writes change every validator
+    await client.patch(f"/api/v1/properties/{prop.id}", json={"price": 120000}, headers=agent_headers)
+    for (url, headers), etag in zip(urls, etags):
+        res = await client.get(url, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
+
+    # So does a change to the agent details embedded in the listing
+    etag = (await client.get(urls[0][0])).headers["ETag"]
+    login_res = await client.post("/api/v1/auth/login", json={"email": "etag_admin@test.com", "password": "pass"})
+    admin_headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    await client.put(f"/api/v1/admin/agents/{agent.id}", json={"phone": "555-0100"}, headers=admin_headers)
+    res = await client.get(urls[0][0], headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["agent"]["phone"] == "555-0100"
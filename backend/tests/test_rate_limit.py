@@ -0,0 +1,111 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.rate_limit import (
+    DatabaseRateLimitStore, MemoryRateLimitStore, RateLimiter, create_rate_limit_store, get_rate_limit_store,
+    login_rate_limiter, published_rate_limiter,
+)
+from app.main import app
+from app.models.rate_limit import RateLimitCounter
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def session_factory(db_session):
+    @asynccontextmanager
+    async def factory():
+        yield db_session
+    return factory
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, session_factory):
+    if request.param == "memory":
+        return MemoryRateLimitStore(max_keys=1000)
+    return DatabaseRateLimitStore(session_factory)
+
+@pytest.mark.asyncio
+async def test_sliding_window_counts(store):
+    clock = FakeClock(6000.0)
+    limiter = RateLimiter("test", max_attempts=3, window_seconds=60, store=store, clock=clock)
+
+    assert [await limiter.hit("a") for _ in range(4)] == [True, True, True, False]
+    assert await limiter.get_attempt_count("a") == 4
+    assert await limiter.is_rate_limited("a")
+    assert limiter.retry_after() == 60
+    # Keys and limiters are counted separately
+    assert await limiter.get_attempt_count("b") == 0
+    assert await RateLimiter("other", 3, 60, store=store, clock=clock).get_attempt_count("a") == 0
+
+    # Half way through the next window, half of the previous window still counts
+    clock.now += 90
+    assert await limiter.get_attempt_count("a") == 2
+    assert not await limiter.is_rate_limited("a")
+    assert await limiter.hit("a")
+    assert not await limiter.hit("a")
+    assert limiter.retry_after() == 30
+
+    # Two windows on, nothing counts any more
+    clock.now += 120
+    assert await limiter.get_attempt_count("a") == 0
+
+    await limiter.record_failed_attempt("a")
+    assert await limiter.get_attempt_count("a") == 1
+    await limiter.reset_attempts("a")
+    assert await limiter.get_attempt_count("a") == 0
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_used_keys():
+    store = MemoryRateLimitStore(max_keys=32)
+    limiter = RateLimiter("test", max_attempts=10 ** 6, window_seconds=60, store=store)
+    for i in range(1000):
+        await limiter.hit("busy")
+        await limiter.hit(f"client-{i}")
+    assert len(store) <= 32
+    assert await limiter.get_attempt_count("busy") == 1000
+    assert await limiter.get_attempt_count("client-0") == 0
+
+@pytest.mark.asyncio
+async def test_database_store_is_shared_and_cleaned_up(db_session, session_factory, monkeypatch):
+    clock = FakeClock(6000.0)
+    # Two processes, each with its own store on the same database
+    first = RateLimiter("login", 5, 60, store=DatabaseRateLimitStore(session_factory), clock=clock)
+    second = RateLimiter("login", 5, 60, store=DatabaseRateLimitStore(session_factory), clock=clock)
+    for limiter in (first, second, first, second, first):
+        await limiter.record_failed_attempt("shared@example.com")
+    assert await second.is_rate_limited("shared@example.com")
+
+    # Rows outlive their window by one window, then go with the next cleanup
+    monkeypatch.setattr(DatabaseRateLimitStore, "CLEANUP_EVERY", 1)
+    clock.now += 120
+    await first.record_failed_attempt("other@example.com")
+    keys = (await db_session.execute(select(RateLimitCounter.key, func.sum(RateLimitCounter.count)).group_by(RateLimitCounter.key))).all()
+    assert keys == [("login:other@example.com", 1)]
+
+def test_counters_are_shared_between_workers_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", type(settings).model_fields["RATE_LIMIT_BACKEND"].default)
+    assert isinstance(create_rate_limit_store(), DatabaseRateLimitStore)
+    # Every limiter counts in the configured store
+    assert published_rate_limiter.store is login_rate_limiter.store is get_rate_limit_store()
+
+@pytest.mark.asyncio
+async def test_published_listings_are_limited_per_client(client, monkeypatch):
+    monkeypatch.setattr(published_rate_limiter, "max_attempts", 3)
+    for _ in range(3):
+        assert (await client.get("/api/v1/properties/published")).status_code == 200
+    res = await client.get("/api/v1/properties/published")
+    assert res.status_code == 429
+    assert 0 < int(res.headers["retry-after"]) <= 60
+    # Other routes and other clients are not affected
+    assert (await client.get("/api/v1/properties/published/facets")).status_code == 200
+    transport = ASGITransport(app=app, client=("203.0.113.7", 4321))
+    async with AsyncClient(transport=transport, base_url="http://test") as other:
+        assert (await other.get("/api/v1/properties/published")).status_code == 200
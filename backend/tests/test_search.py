@@ -0,0 +1,246 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+
+from app.crud.crud_geo_cells import rebuild_geo_cells
+from app.crud.crud_property import build_search_query, normalize_search_filters
+from app.models.geo_cell import PropertyGeoCell
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.schemas.property import PropertySearchFilters
+
+async def create_listings(db_session, agent_id):
+    listings = [
+        ("Small Flat", 90000, 45, "Austin", PropertyType.APARTMENT, 1, 1, PropertyStatus.PUBLISHED),
+        ("Family House", 350000, 180, "Austin", PropertyType.HOUSE, 4, 2, PropertyStatus.PUBLISHED),
+        ("Big Villa", 900000, 400, "Austin", PropertyType.HOUSE, 6, 4, PropertyStatus.PUBLISHED),
+        ("Downtown Condo", 250000, 80, "Dallas", PropertyType.CONDO, 2, 1, PropertyStatus.PUBLISHED),
+        ("Draft House", 300000, 150, "Austin", PropertyType.HOUSE, 4, 2, PropertyStatus.DRAFT),
+    ]
+    for title, price, surface, city, prop_type, bedrooms, bathrooms, status in listings:
+        db_session.add(Property(
+            title=title,
+            price=price,
+            surface=surface,
+            city=city,
+            property_type=prop_type,
+            bedrooms=bedrooms,
+            bathrooms=bathrooms,
+            status=status,
+            agent_id=agent_id,
+        ))
+    await db_session.commit()
+
+@pytest.mark.asyncio
+async def test_search_combines_filters(client, db_session, create_user):
+    agent = await create_user("search_agent@test.com")
+    await create_listings(db_session, agent.id)
+
+    res = await client.get("/api/v1/properties/search", params={
+        "city": "Austin",
+        "price_min": 100000,
+        "price_max": 1000000,
+        "bedrooms_min": 3,
+        "property_type": ["house", "condo"],
+        "sort": "price_asc",
+    })
+    assert res.status_code == 200
+    assert [p["title"] for p in res.json()] == ["Family House", "Big Villa"]
+
+    res = await client.get("/api/v1/properties/search", params={"surface_max": 100, "sort": "price_desc"})
+    assert [p["title"] for p in res.json()] == ["Downtown Condo", "Small Flat"]
+
+@pytest.mark.asyncio
+async def test_search_rejects_contradictory_ranges(client, db_session):
+    res = await client.get("/api/v1/properties/search", params={"price_min": 500, "price_max": 100})
+    assert res.status_code == 400
+
+def test_normalize_drops_no_op_filters():
+    filters = normalize_search_filters(PropertySearchFilters(
+        price_min=0,
+        bedrooms_min=0,
+        property_types=list(PropertyType),
+    ))
+    assert filters.price_min is None
+    assert filters.bedrooms_min is None
+    assert filters.property_types is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters,sort,index", [
+    (PropertySearchFilters(), "newest", "ix_properties_status_created_at_id"),
+    (PropertySearchFilters(city="Austin", price_min=1, price_max=5), "newest", "ix_properties_status_created_at_id"),
+    (PropertySearchFilters(bedrooms_min=2, surface_min=50, surface_max=80), "newest", "ix_properties_status_created_at_id"),
+    (PropertySearchFilters(price_min=1, surface_min=50), "price_asc", "ix_properties_status_price_id"),
+    (PropertySearchFilters(property_types=[PropertyType.HOUSE], bedrooms_min=2), "price_desc", "ix_properties_status_price_id"),
+])
+async def test_search_query_uses_covering_index(db_session, filters, sort, index):
+    stmt = build_search_query(normalize_search_filters(filters), sort, None, 20)
+    sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    plan = (await db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    details = " ".join(row[3] for row in plan)
+    # Filters are checked on index entries read in sort order: no row reads, no sort
+    assert f"COVERING INDEX {index}" in details
+    assert "SCAN properties" not in details
+    assert "TEMP B-TREE" not in details
+
+@pytest.mark.asyncio
+async def test_keyword_search_ranks_and_highlights(client, db_session, create_user):
+    agent = await create_user("search_agent@test.com")
+    await create_listings(db_session, agent.id)
+
+    res = await client.get("/api/v1/properties/search", params={"q": "villa"})
+    assert res.status_code == 200
+    data = res.json()
+    assert [p["title"] for p in data] == ["Big Villa"]
+    assert "<mark>Villa</mark>" in data[0]["snippet"]
+
+    # Prefix match on the last word; title hits outrank other columns
+    res = await client.get("/api/v1/properties/search", params={"q": "hou", "city": "Austin"})
+    assert [p["title"] for p in res.json()] == ["Family House"]
+
+    # Relevance order pages with cursors like every other sort
+    seen, params = [], {"q": "austin", "limit": 1}
+    while True:
+        res = await client.get("/api/v1/properties/search", params=params)
+        seen.extend(p["title"] for p in res.json())
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+    assert sorted(seen) == ["Big Villa", "Family House", "Small Flat"]
+
+@pytest.mark.asyncio
+async def test_keyword_index_follows_writes(client, db_session, create_user, login):
+    agent = await create_user("search_agent@test.com")
+    headers = await login("search_agent@test.com")
+
+    res = await client.post("/api/v1/properties", headers=headers, json={
+        "title": "Lakeside Cabin",
+        "price": 200000,
+        "surface": 70,
+        "city": "Austin",
+        "property_type": "house",
+        "description": "Quiet <b>retreat</b> by the water",
+        "status": "published",
+    })
+    prop_id = res.json()["id"]
+
+    res = await client.get("/api/v1/properties/search", params={"q": "retreat"})
+    assert [p["id"] for p in res.json()] == [prop_id]
+    assert "&lt;b&gt;<mark>retreat</mark>&lt;/b&gt;" in res.json()[0]["snippet"]
+
+    await client.patch(f"/api/v1/properties/{prop_id}", headers=headers, json={"description": "Mountain views"})
+    res = await client.get("/api/v1/properties/search", params={"q": "retreat"})
+    assert res.json() == []
+    res = await client.get("/api/v1/properties/search", params={"q": "mountain"})
+    assert [p["id"] for p in res.json()] == [prop_id]
+
+    await client.delete(f"/api/v1/properties/{prop_id}", headers=headers)
+    res = await client.get("/api/v1/properties/search", params={"q": "mountain"})
+    assert res.json() == []
+
+@pytest.mark.asyncio
+async def test_geo_search_radius_and_bbox(client, db_session, create_user):
+    agent = await create_user("search_agent@test.com")
+    # Austin downtown, ~3 km north, ~30 km south-west, and a draft downtown
+    points = [
+        ("Downtown Loft", 30.2672, -97.7431, PropertyStatus.PUBLISHED),
+        ("Hyde Park Home", 30.2949, -97.7279, PropertyStatus.PUBLISHED),
+        ("Dripping Springs Ranch", 30.1902, -98.0867, PropertyStatus.PUBLISHED),
+        ("Downtown Draft", 30.2670, -97.7430, PropertyStatus.DRAFT),
+    ]
+    for title, lat, lng, status in points:
+        db_session.add(Property(
+            title=title, price=300000, surface=100, city="Austin", property_type=PropertyType.HOUSE,
+            latitude=lat, longitude=lng, status=status, agent_id=agent.id,
+        ))
+    await db_session.commit()
+
+    res = await client.get("/api/v1/properties/published/geo", params={
+        "lat": 30.2672, "lng": -97.7431, "radius_km": 5,
+    })
+    assert res.status_code == 200
+    data = res.json()
+    assert [p["title"] for p in data] == ["Downtown Loft", "Hyde Park Home"]
+    assert data[0]["distance_km"] == 0
+    assert 3 < data[1]["distance_km"] < 4
+
+    res = await client.get("/api/v1/properties/published/geo", params={
+        "min_lat": 30.0, "min_lng": -98.2, "max_lat": 30.25, "max_lng": -97.9,
+    })
+    assert [p["title"] for p in res.json()] == ["Dripping Springs Ranch"]
+
+    res = await client.get("/api/v1/properties/published/geo", params={"lat": 30.2})
+    assert res.status_code == 400
+
+@pytest.mark.asyncio
+async def test_map_clusters_follow_publish_and_unpublish(client, db_session, create_user, login):
+    await create_user("search_agent@test.com")
+    headers = await login("search_agent@test.com")
+
+    ids = []
+    for price, lat, lng in [(100000, 30.26, -97.74), (500000, 30.27, -97.75), (900000, 30.28, -97.73)]:
+        res = await client.post("/api/v1/properties", headers=headers, json={
+            "title": "Clustered Home", "price": price, "surface": 90, "city": "Austin",
+            "property_type": "house", "latitude": lat, "longitude": lng, "status": "published",
+        })
+        ids.append(res.json()["id"])
+    # A listing in Dallas lands in another cluster when zoomed out to the state
+    res = await client.post("/api/v1/properties", headers=headers, json={
+        "title": "Dallas Home", "price": 300000, "surface": 90, "city": "Dallas",
+        "property_type": "house", "latitude": 32.78, "longitude": -96.80, "status": "published",
+    })
+    dallas_id = res.json()["id"]
+
+    texas = {"min_lat": 25.8, "min_lng": -106.6, "max_lat": 36.5, "max_lng": -93.5, "zoom": 5}
+    res = await client.get("/api/v1/properties/published/clusters", params=texas)
+    assert res.status_code == 200
+    clusters = sorted(res.json(), key=lambda c: c["count"])
+    assert [c["count"] for c in clusters] == [1, 3]
+    assert clusters[1]["min_price"] == 100000 and clusters[1]["max_price"] == 900000
+    assert clusters[1]["latitude"] == pytest.approx(30.27)
+
+    # Unpublishing the most expensive listing shrinks the price range
+    await client.patch(f"/api/v1/properties/{ids[2]}", headers=headers, json={"status": "draft"})
+    await client.delete(f"/api/v1/properties/{dallas_id}", headers=headers)
+    res = await client.get("/api/v1/properties/published/clusters", params=texas)
+    assert [(c["count"], c["min_price"], c["max_price"]) for c in res.json()] == [(2, 100000, 500000)]
+
+    # Incremental maintenance matches a full rebuild
+    def snapshot(rows):
+        return sorted((c.zoom, c.cell_x, c.cell_y, c.count, round(c.lat_sum, 6), c.min_price, c.max_price) for c in rows)
+
+    incremental = snapshot((await db_session.execute(select(PropertyGeoCell))).scalars().all())
+    await rebuild_geo_cells(db_session)
+    db_session.expire_all()
+    rebuilt = snapshot((await db_session.execute(select(PropertyGeoCell))).scalars().all())
+    assert incremental == rebuilt
+
+@pytest.mark.asyncio
+async def test_facets_follow_listing_writes(client, db_session, create_user, login):
+    agent = await create_user("search_agent@test.com")
+    await create_listings(db_session, agent.id)
+    headers = await login("search_agent@test.com")
+
+    res = await client.get("/api/v1/properties/published/facets")
+    assert res.status_code == 200
+    facets = res.json()
+    assert facets["cities"] == [{"value": "Austin", "count": 3}, {"value": "Dallas", "count": 1}]
+    assert {f["value"]: f["count"] for f in facets["property_types"]} == {"house": 2, "apartment": 1, "condo": 1}
+    buckets = {b["min"]: b["count"] for b in facets["price_buckets"]}
+    assert buckets[0] == 1 and buckets[250000] == 2 and buckets[750000] == 1
+
+    # Writes through the API update the cached counts without a reload
+    res = await client.post("/api/v1/properties", headers=headers, json={
+        "title": "New Dallas Condo", "price": 260000, "surface": 70, "city": "Dallas",
+        "property_type": "condo", "status": "published",
+    })
+    new_id = res.json()["id"]
+    await client.patch(f"/api/v1/properties/{new_id}", headers=headers, json={"price": 1500000})
+
+    facets = (await client.get("/api/v1/properties/published/facets")).json()
+    assert facets["cities"] == [{"value": "Austin", "count": 3}, {"value": "Dallas", "count": 2}]
+    buckets = {b["min"]: b["count"] for b in facets["price_buckets"]}
+    assert buckets[250000] == 2 and buckets[1000000] == 1
+
+    await client.delete(f"/api/v1/properties/{new_id}", headers=headers)
+    facets = (await client.get("/api/v1/properties/published/facets")).json()
+    assert {f["value"]: f["count"] for f in facets["property_types"]} == {"house": 2, "apartment": 1, "condo": 1}
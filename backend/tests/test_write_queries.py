@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.core.cache import principal_cache
+from app.core.security import Principal
+from app.crud import crud_property, crud_users
+from app.models.user import UserRole
+from app.schemas.property import PropertyCreate, PropertyUpdate
+from app.schemas.user import UserCreate, UserUpdate
+
+@contextmanager
+def count_statements(db_session):
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+LISTING = {"title": "Query Count Home", "price": 250000, "surface": 120, "city": "Austin", "property_type": "house"}
+
+@pytest.mark.asyncio
+async def test_crud_writes_use_one_statement(db_session):
+    with count_statements(db_session) as statements:
+        agent = await crud_users.create_user(db_session, UserCreate(
+            email="writes@test.com", password="secret123", name="Write Agent"
+        ))
+    assert len(statements) == 1 and "RETURNING" in statements[0]
+
+    with count_statements(db_session) as statements:
+        prop = await crud_property.create_property(db_session, PropertyCreate(**LISTING), agent.id)
+    # The agent comes from the identity map
+    assert len(statements) == 1 and statements[0].startswith("INSERT")
+    assert prop.agent.email == "writes@test.com"
+
+    created_at = prop.updated_at
+    with count_statements(db_session) as statements:
+        prop = await crud_property.update_property(db_session, prop, PropertyUpdate(title="Renamed Query Home"))
+    assert len(statements) == 1 and statements[0].startswith("UPDATE")
+    assert prop.title == "Renamed Query Home"
+    assert prop.updated_at > created_at
+
+    with count_statements(db_session) as statements:
+        agent = await crud_users.update_user(db_session, agent, UserUpdate(password="other-secret"))
+    assert len(statements) == 1
+
+    # Profile changes also touch the agent's listings
+    with count_statements(db_session) as statements:
+        agent = await crud_users.update_user(db_session, agent, UserUpdate(name="Renamed Agent"))
+    assert len(statements) == 2
+    assert agent.name == "Renamed Agent"
+
+    with count_statements(db_session) as statements:
+        assert await crud_property.delete_property(db_session, prop.id)
+    assert len(statements) == 1 and statements[0].startswith("DELETE")
+
+@pytest.mark.asyncio
+async def test_write_endpoints_statement_budget(client, db_session, auth_headers):
+    headers = await auth_headers("budget@test.com")
+
+    # Authentication is one statement the first time (then cached), the write one more,
+    # and loading the agent embedded in the response a third
+    with count_statements(db_session) as statements:
+        res = await client.post("/api/v1/properties", json=LISTING, headers=headers)
+    assert res.status_code == 201
+    assert res.json()["agent"]["email"] == "budget@test.com"
+    assert len(statements) == 3
+    prop_id = res.json()["id"]
+
+    # Existing listings: the permission check load and the write
+    with count_statements(db_session) as statements:
+        res = await client.patch(f"/api/v1/properties/{prop_id}", json={"price": 260000}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["price"] == 260000
+    assert len(statements) == 2
+
+    with count_statements(db_session) as statements:
+        res = await client.delete(f"/api/v1/properties/{prop_id}", headers=headers)
+    assert res.status_code == 200
+    assert len(statements) == 2
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_reuse_cached_principal(client, db_session, auth_headers):
+    admin_headers = await auth_headers("principal_admin@test.com", UserRole.ADMIN)
+    headers = await auth_headers("principal@test.com")
+    res = await client.get("/api/v1/users/me", headers=headers)
+    assert res.json()["name"] == "Test User"
+    agent_id = res.json()["id"]
+    # Only what authorization needs is cached, never the password hash
+    assert principal_cache.get(agent_id) == Principal(agent_id, UserRole.AGENT, "Test User")
+
+    # Authentication costs no statement; only the handler loads the full row
+    with count_statements(db_session) as statements:
+        res = await client.get("/api/v1/users/me", headers=headers)
+    assert res.status_code == 200
+    assert len(statements) == 1 and "password_hash" in statements[0]
+    with count_statements(db_session) as statements:
+        res = await client.get("/api/v1/jobs/999", headers=headers)
+    assert res.status_code == 404
+    assert not any("FROM users" in statement for statement in statements)
+
+    # Profile changes are seen by the next request
+    res = await client.patch("/api/v1/users/me", json={"name": "Renamed Principal"}, headers=headers)
+    assert res.status_code == 200
+    assert principal_cache.get(agent_id) is None
+    res = await client.get("/api/v1/users/me", headers=headers)
+    assert res.json()["name"] == "Renamed Principal"
+    assert principal_cache.get(agent_id).name == "Renamed Principal"
+
+    # Deleted users' tokens stop working at once
+    res = await client.delete(f"/api/v1/admin/agents/{agent_id}", params={"delete_listings": True}, headers=admin_headers)
+    assert res.status_code == 204
+    res = await client.get("/api/v1/users/me", headers=headers)
+    assert res.status_code == 401
@@ -20,7 +20,7 @@ export interface Property {
   status: 'draft' | 'published';
   images: string[];
   agent_id: number;
-  agent: PropertyAgent;
+  agent: PropertyAgent | null;
   created_at: string;
   updated_at: string;
 }